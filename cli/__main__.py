@@ -5,7 +5,6 @@ This module acts as the CLI entry point for the program
 """
 import sys
 from .parser import build_parser
-from .commands import run_commands
 
 def main(argv=None):
 	"""
@@ -16,6 +15,12 @@ def main(argv=None):
 	"""
 	parser = build_parser()
 	args = parser.parse_args(argv)
+
+	# Imported after parsing, so '-h' and argument errors do not load the LED stack
+	if args.daemon:
+		from .daemon import serve
+		return serve()
+	from .commands import run_commands
 	return run_commands(args)
 
 
@@ -0,0 +1,98 @@
+"""
+client.py
+
+Client for the LED daemon's control protocol.
+
+Requests and replies are single lines of JSON sent over a Unix domain
+socket. A request carries the parsed CLI arguments, and the reply carries
+the exit status and the output of validating and starting the command.
+When the command asked for '--stats', the reply is marked "more", and a
+second message carries the rest of its output once its effect finishes.
+"""
+import json
+import os
+import socket
+from led.config import SOCKET_PATH
+from .exit_codes import ExitCode
+
+TIMEOUT = 5
+"""The time in seconds to wait for the daemon to reply before giving up"""
+
+PATH_ARGS = ("record", "play", "stream")
+"""The arguments holding file paths, which are made absolute before they are sent, as the daemon runs in its own working directory"""
+
+def encode_message(message) -> bytes:
+	"""
+	Returns a message encoded as one line of JSON
+
+	Keyword arguments:
+	message -- a dict of JSON serializable values
+	"""
+	return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+def read_message(stream):
+	"""
+	Reads one line of JSON from a binary stream and returns the decoded message, or None if the stream closed
+
+	Keyword arguments:
+	stream -- a binary file-like object, such as one returned by socket.makefile("rb")
+	"""
+	line = stream.readline()
+	if not line:
+		return None
+	return json.loads(line)
+
+def resolve_paths(args) -> dict:
+	"""
+	Returns a copy of parsed command-line arguments with each path in PATH_ARGS made absolute
+
+	Keyword arguments:
+	args -- a dict of the parsed command line arguments
+	"""
+	resolved = dict(args)
+	for name in PATH_ARGS:
+		if resolved.get(name) is not None and resolved[name] != "-":	# "-" streams from stdin rather than a file
+			resolved[name] = os.path.abspath(resolved[name])
+	return resolved
+
+def send_command(args, path=SOCKET_PATH):
+	"""
+	Sends parsed command-line arguments to the LED daemon and prints its reply
+
+	The daemon replies once the command has been validated and started, so this
+	returns without waiting for an effect to finish, unless the command asked for
+	'--stats', which are printed once the effect finishes.
+
+	Keyword arguments:
+	args -- Parsed command line arguments
+	path -- the path of the daemon's Unix domain socket
+
+	Returns:
+	the exit status replied by the daemon, or None if no daemon is listening
+	"""
+	if not os.path.exists(path):
+		return None
+
+	try:
+		with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+			sock.settimeout(TIMEOUT)
+			sock.connect(path)
+			sock.sendall(encode_message({"args": resolve_paths(vars(args))}))
+			with sock.makefile("rb") as stream:
+				reply = read_message(stream)
+				if reply is not None and reply.get("more"):
+					print(reply["output"], end="", flush=True)
+					sock.settimeout(None)	# The rest of the output is sent once the effect finishes, however long it runs
+					rest = read_message(stream)
+					reply["output"] = rest["output"] if rest is not None else ""
+	except (ConnectionRefusedError, FileNotFoundError):
+		return None
+	except OSError as e:	# Includes TimeoutError, when the daemon does not reply within TIMEOUT
+		print(f"[ERROR] Could not reach the LED daemon: {e}")
+		return ExitCode.INVALID_INPUT
+
+	if reply is None:
+		print("[ERROR] The LED daemon closed the connection without replying")
+		return ExitCode.INVALID_INPUT
+	print(reply["output"], end="")
+	return ExitCode(reply["status"])
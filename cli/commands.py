@@ -5,22 +5,34 @@ Command dispatcher for the LED control system.
 
 This module translates parsed CLI arguments into
 LED actions by calling effects and controller functions. 
+When the LED daemon is running, commands are sent to it
+to be run, otherwise they are run in this process.
 """
-from led import effects
-from led.controller import power_off, set_brightness
+import functools
+import inspect
+import os
+import shlex
+from led.config import IDLE_MA
+from led.controller import get_strip_names, get_strip_count, power_off, set_brightness, set_color_correction, set_power_limit, get_power_stats
 from led.colors import resolve_color, OFF
+from led.correction import white_point_from_kelvin
 from led.color_palette import ColorPalette
 from led.pixel_range import PixelRange
+from led.timer import JITTER_BUCKETS
 from .exit_codes import ExitCode
+from .parser import build_parser
+from . import client
 
 def run_commands(args=None):
 	"""
 	Executes LED operations based on parsed command-line arguments
 
-	This function interprets passed argparse input and
-	executes the effect or function associated with the
-	command. This effectively serves as a user input 
-	command routing layer.
+	This function sends the command to the LED daemon if one is running,
+	which validates it, starts it, and replies without waiting for the
+	effect to finish. Otherwise, or with '--local', the command is run
+	in this process. Streams read from stdin are always run in this
+	process, as the daemon cannot read it, and so are recordings, which
+	are rendered offline without touching the strip.
 
 	Keyowrd arguments:
 	args -- Parsed command line arguments. If None are provided, polled through sys.argv.
@@ -28,35 +40,328 @@ def run_commands(args=None):
 	Returns:
 	int value representing exit status code (0 for success, non-zero for failiure)
 	"""
+	if not getattr(args, "local", False) and getattr(args, "stream", None) != "-" and getattr(args, "record", None) is None:
+		status = client.send_command(args)
+		if status is not None:
+			return status
+	return execute_commands(args)
+
+def execute_commands(args, cancel=None):
+	"""
+	Validates and runs LED operations based on parsed command-line arguments in this process
+
+	Keyword arguments:
+	args -- Parsed command line arguments
+	cancel -- A threading.Event which, once set, stops a running effect
+
+	Returns:
+	int value representing exit status code (0 for success, non-zero for failiure)
+	"""
+	status, action = prepare_commands(args, cancel=cancel)
+	if action is not None:
+		action()
+	return status
+
+def prepare_commands(args, cancel=None, engine=None, out=None):
+	"""
+	Validates parsed command-line arguments and builds the LED operation they describe
+
+	This function interprets passed argparse input and
+	prepares the effect or function associated with the
+	command. This effectively serves as a user input 
+	command routing layer.
+
+	Keyword arguments:
+	args -- Parsed command line arguments
+	cancel -- A threading.Event which, once set, stops the effect the operation runs
+	engine -- An engine.Engine to run the effect on, in which case the operation applies the
+	          settings and returns the coroutine of the effect to start on it, rather than running it
+	out -- A text stream to print messages to, including the statistics printed once the effect
+	       finishes, defaults to sys.stdout
+
+	Returns:
+	a tuple of the exit status code, and a function taking no arguments which runs the
+	operation (or None if the arguments were invalid)
+	"""
+	if args.strip is not None and args.strip not in get_strip_names():
+		print(f"[ERROR] Unknown strip '{args.strip}'. See options: {tuple(get_strip_names())}", file=out)
+		return ExitCode.INVALID_INPUT, None
+
 	# --- POWER OFF ----
 
 	if args.off:
-		print("Off")
-		power_off()
-		return ExitCode.SUCCESS
+		print("Off", file=out)
+		return ExitCode.SUCCESS, functools.partial(power_off, strip=args.strip)
+
+	selection = build_selection(args, out=out)
+	if selection is None:
+		return ExitCode.INVALID_INPUT, None
+
+	colors = build_palette(args, out=out)
+	if colors is None:
+		return ExitCode.INVALID_INPUT, None
+
+	# ---- OPTION ARGS ----
+
+	if args.interval is not None and args.interval <= 0:
+		print(f"Interval {args.interval} is invalid, interval must be greater than 0 seconds", file=out)
+		return ExitCode.INVALID_INPUT, None
+
+	if args.duration is not None and args.duration <= 0:
+		print(f"Duration {args.duration} is invalid, duration must be greater than 0 seconds", file=out)
+		return ExitCode.INVALID_INPUT, None
+
+	if args.seek < 0:
+		print(f"Seek {args.seek} is invalid, seek must be 0 seconds or more", file=out)
+		return ExitCode.INVALID_INPUT, None
+
+	if args.play is not None and not os.path.isfile(args.play):
+		print(f"[ERROR] Recording '{args.play}' does not exist", file=out)
+		return ExitCode.INVALID_INPUT, None
+
+	if args.record is not None and not (args.blink or args.progressive or args.chase or args.gradient):
+		print("[ERROR] --record requires a timed effect (--blink, --progressive, --chase or --gradient)", file=out)
+		return ExitCode.INVALID_INPUT, None
+
+	if args.fps is not None and args.fps <= 0:
+		print(f"FPS {args.fps} is invalid, fps must be greater than 0", file=out)
+		return ExitCode.INVALID_INPUT, None
+
+	if args.fade is not None and args.fade < 0:
+		print(f"Fade {args.fade} is invalid, fade must be 0 seconds or more", file=out)
+		return ExitCode.INVALID_INPUT, None
+
+	if args.gamma is not None and args.gamma <= 0:
+		print(f"Gamma {args.gamma} is invalid, gamma must be greater than 0", file=out)
+		return ExitCode.INVALID_INPUT, None
+
+	if args.power_limit is not None and args.power_limit <= IDLE_MA * get_strip_count(args.strip):
+		print(f"Power limit {args.power_limit} is invalid, the power limit must be more than the {IDLE_MA * get_strip_count(args.strip)} mA the strip draws while dark", file=out)
+		return ExitCode.INVALID_INPUT, None
+
+	white_point = None
+	if args.temperature is not None:
+		try:
+			white_point = white_point_from_kelvin(args.temperature)
+		except ValueError as e:
+			print(f"[ERROR] {e}", file=out)
+			return ExitCode.INVALID_INPUT, None
+
+	brightness = None
+	if args.brightness is not None:
+		if(args.brightness >= 0 and args.brightness <= 1):
+			brightness = args.brightness
+		else:
+			print("Use a valid brightness between 0-1", file=out)
+
+	# ---- EFFECT ARGS ----
+
+	from led import effects	# Imported here, so '--off' and invalid input do not load the render stack
+
+	effect = None
+	report = print_stats
+
+	if args.chase:
+		print("Chase", file=out)
+		if args.interval is None:
+			print("No --interval provided. Using default interval of 0.1 seconds.", file=out)
+		if args.duration is None:
+			print("No --duration provided. Using default duration of 10 seconds.", file=out)
+		effect = functools.partial(effects.chase_fill,
+			palette=colors,
+			interval=args.interval,
+			duration=args.duration,
+			sel=selection,
+			mode=args.chase_mode,
+			cancel=cancel,
+			transition=args.fade,
+			easing=args.easing
+		)
+
+	if args.progressive:
+		print("Progressive", file=out)
+		if args.interval is not None and args.duration is not None:
+			print("Note: Both --interval and --duration were provided. --duration takes precedence and will override --interval.", file=out)
+		elif args.interval is None and args.duration is None:
+			print("No --interval or --duration specified. Using default interval: 1 second.", file=out)
+		effect = functools.partial(effects.progressive_fill,
+			palette=colors,
+			interval=args.interval,
+			duration=args.duration,
+			sel=selection,
+			cancel=cancel,
+			transition=args.fade,
+			easing=args.easing
+		)
+
+	if args.blink:
+		print("Blinking", file=out)
+		if args.interval is None:
+			print("No --interval provided. Using default interval of 1 second.", file=out)
+		if args.duration is None:
+			print("No --duration provided. Using default duration of 10 seconds.", file=out)
+
+		effect = functools.partial(effects.blink_color,
+			palette=colors,
+			interval=args.interval,
+			duration=args.duration,
+			sel=selection,
+			cancel=cancel,
+			fade=args.fade,
+			transition=args.fade,
+			easing=args.easing
+		)
+
+	if args.gradient is not None:
+		from led import gradient
+		print(f"Gradient {args.gradient}", file=out)
+		if args.interval is None:
+			print("No --interval provided. Using default interval of 0.05 seconds.", file=out)
+		if args.duration is None:
+			print("No --duration provided. Using default duration of 10 seconds.", file=out)
+		effect = functools.partial(effects.gradient_fill,
+			palette=gradient.GRADIENTS[args.gradient],
+			interval=args.interval,
+			duration=args.duration,
+			sel=selection,
+			cancel=cancel,
+			transition=args.fade,
+			easing=args.easing
+		)
 
-	# Create a range object to store data
+	if args.stream is not None:
+		from led import stream
+		print(f"Streaming from {'stdin' if args.stream == '-' else args.stream}", file=out)
+		effect = functools.partial(stream.stream_frames,
+			source=args.stream,
+			fps=args.fps if args.fps is not None else stream.DEFAULT_FPS,
+			pixel_order=args.pixel_order,
+			duration=args.duration,
+			cancel=cancel,
+			strip=args.strip
+		)
+
+	if args.receive is not None:
+		from led import receiver
+		print(f"Receiving {args.receive} on UDP port {receiver.PORTS[args.receive]}", file=out)
+		effect = functools.partial(receiver.UniverseReceiver(args.receive, universe=args.universe, strip=args.strip).serve,
+			duration=args.duration,
+			cancel=cancel
+		)
+		report = print_receiver_stats
+
+	if args.play is not None:
+		from led import recording
+		print(f"Playing {args.play}", file=out)
+		effect = functools.partial(recording.play, args.play,
+			start=args.seek,
+			cancel=cancel,
+			strip=args.strip
+		)
+
+	if args.layer is not None:
+		composition = build_composition(args, out=out)
+		if composition is None:
+			return ExitCode.INVALID_INPUT, None
+		comp, fps = composition
+		print(f"Compositing {len(comp.layers)} layers", file=out)
+		if args.duration is None:
+			print("No --duration provided. Using default duration of 10 seconds.", file=out)
+		effect = functools.partial(comp.run,
+			fps=fps,
+			duration=args.duration if args.duration is not None else 10,
+			cancel=cancel,
+			transition=args.fade,
+			easing=args.easing
+		)
+
+	if args.fill:
+		print("Filled", file=out)
+		effect = functools.partial(effects.apply_fill,
+			palette=colors,
+			sel=selection,
+			cancel=cancel,
+			transition=args.fade,
+			easing=args.easing
+		)
+
+	if args.record is not None:
+		from led import recording
+		print(f"Recording to {args.record}", file=out)
+		effect = functools.partial(recording.record, effect.func, args.record, **effect.keywords)
+		report = print_recorded
+	elif engine is not None and effect is not None:
+		effect = functools.partial(effect, engine=engine)	# Recordings render offline, so they never run on the engine
+
+	def print_report(stats):
+		if args.stats and stats is not None:
+			report(stats, out=out)
+		if args.stats:
+			print_power_stats(get_power_stats(strip=args.strip), out=out)
+
+	async def finish(running):
+		stats = None
+		try:
+			stats = await running
+		finally:
+			print_report(stats)	# A preempted effect has no statistics of its own, but the strip's power figures still apply
+
+	def action():
+		if brightness is not None:
+			set_brightness(brightness, strip=args.strip)
+		if args.gamma is not None or white_point is not None:
+			set_color_correction(gamma=args.gamma, white_point=white_point, strip=args.strip)
+		if args.power_limit is not None:
+			set_power_limit(args.power_limit, strip=args.strip)
+		stats = effect() if effect is not None else None
+		if inspect.iscoroutine(stats):
+			return finish(stats)
+		print_report(stats)
+
+	return ExitCode.SUCCESS, action
+
+def build_selection(args, out=None):
+	"""
+	Builds the PixelRange described by parsed command-line arguments
+
+	Keyword arguments:
+	args -- Parsed command line arguments
+	out -- A text stream to print errors to, defaults to sys.stdout
+
+	Returns:
+	the PixelRange, or None if the arguments were invalid
+	"""
 	try:
-		selection = PixelRange(
+		return PixelRange(
 			start=args.range[0] if args.range else None,
 			end=args.range[1] if args.range else None,
 			span=args.span if args.span else None,
 			spacing=args.spacing if args.spacing else None,
-			invert=args.invert
+			invert=args.invert,
+			strip=args.strip
 		)
 	except TypeError as e:
-		print(f"[ERROR] {e}")
-		return ExitCode.INVALUD_INPUT
+		print(f"[ERROR] {e}", file=out)
+		return None
+
+def build_palette(args, out=None):
+	"""
+	Builds the ColorPalette described by parsed command-line arguments
 
-	# ---- COLOR ARGS ----
+	Keyword arguments:
+	args -- Parsed command line arguments
+	out -- A text stream to print the colors and errors to, defaults to sys.stdout
 
+	Returns:
+	the ColorPalette, or None if the arguments were invalid
+	"""
 	if args.color is not None:
 		try:
 			primary_color = resolve_color(args.color)
 		except ValueError as e:
-			print(f"[ERROR] [PRIMARY-COL]: {e}")
-			return ExitCode.INVALID_INPUT
-		print(f"Primary color: {primary_color}")
+			print(f"[ERROR] [PRIMARY-COL]: {e}", file=out)
+			return None
+		print(f"Primary color: {primary_color}", file=out)
 	else:
 		primary_color = OFF
 
@@ -64,9 +369,9 @@ def run_commands(args=None):
 		try:
 			secondary_color = resolve_color(args.secondary_color)
 		except ValueError as e:
-			print(f"[ERROR] [SECONDARY-COL]: {e}")
-			return ExitCode.INVALID_INPUT
-		print(f"Secondary color: {secondary_color}")
+			print(f"[ERROR] [SECONDARY-COL]: {e}", file=out)
+			return None
+		print(f"Secondary color: {secondary_color}", file=out)
 	else:
 		secondary_color = OFF
 
@@ -74,9 +379,9 @@ def run_commands(args=None):
 		try:
 			spacing_color = resolve_color(args.spacing_color)
 		except ValueError as e:
-			print(f"[ERROR] [SPACING-PRIMARY-COL]: {e}")
-			return ExitCode.INVALID_INPUT
-		print(f"Spacing color: {spacing_color}")
+			print(f"[ERROR] [SPACING-PRIMARY-COL]: {e}", file=out)
+			return None
+		print(f"Spacing color: {spacing_color}", file=out)
 	else:
 		spacing_color = OFF
 
@@ -84,83 +389,139 @@ def run_commands(args=None):
 		try:
 			spacing_color_secondary = resolve_color(args.spacing_color_secondary)
 		except ValueError as e:
-			print(f"[ERROR] [SPACING-SECONDARY-COL]: {e}")
-			return ExitCode.INVALID_INPUT
-		print(f"Spacing secondary color: {spacing_color_secondary}")
+			print(f"[ERROR] [SPACING-SECONDARY-COL]: {e}", file=out)
+			return None
+		print(f"Spacing secondary color: {spacing_color_secondary}", file=out)
 	else:
 		spacing_color_secondary = OFF
 
 	# Construct the Color Palette
 	try:
-		colors = ColorPalette(
+		return ColorPalette(
 			span_primary=primary_color,
 			span_secondary=secondary_color,
 			spacing_primary=spacing_color,
 			spacing_secondary=spacing_color_secondary
 		)
 	except ValueError as e:
-		print(f"[ERROR]: {e}")
-		return ExitCode.INVALID_INPUT
+		print(f"[ERROR]: {e}", file=out)
+		return None
 
-	# ---- OPTION ARGS ----
+def build_composition(args, out=None):
+	"""
+	Builds a Compositor with a layer for each '--layer' of parsed command-line arguments
 
-	if args.interval is not None and args.interval <= 0:
-		print(f"Interval {args.interval} is invalid, interval must be greater than 0 seconds")
-		return ExitCode.INVALID_INPUT
+	Each layer is parsed as its own command line, naming one effect ('--fill', '--blink',
+	'--progressive', '--chase' or '--gradient') with its colors, range, interval, '--blend' and '--opacity'.
+	Layers are stacked in the order given, on the strip of the command.
 
-	if args.duration is not None and args.duration <= 0:
-		print(f"Duration {args.duration} is invalid, duration must be greater than 0 seconds")
-		return ExitCode.INVALID_INPUT
+	Keyword arguments:
+	args -- Parsed command line arguments
+	out -- A text stream to print errors to, defaults to sys.stdout
 
-	if args.brightness is not None:
-		if(args.brightness >= 0 and args.brightness <= 1):
-			set_brightness(args.brightness)
+	Returns:
+	a tuple of the Compositor and the fps to run it at, or None if a layer was invalid
+	"""
+	from led import compositor, effects, gradient
+
+	parser = build_parser()
+	comp = compositor.Compositor(strip=args.strip)
+	rates = []
+
+	for spec in args.layer:
+		try:
+			layer_args = parser.parse_args(shlex.split(spec))
+		except SystemExit:
+			print(f"[ERROR] Invalid layer '{spec}'", file=out)
+			return None
+		layer_args.strip = args.strip
+
+		if layer_args.interval is not None and layer_args.interval <= 0:
+			print(f"[ERROR] Layer '{spec}': interval must be greater than 0 seconds", file=out)
+			return None
+		if layer_args.duration is not None and layer_args.duration <= 0:
+			print(f"[ERROR] Layer '{spec}': duration must be greater than 0 seconds", file=out)
+			return None
+		if not 0 <= layer_args.opacity <= 1:
+			print(f"[ERROR] Layer '{spec}': opacity must be between 0 and 1", file=out)
+			return None
+
+		selection = build_selection(layer_args, out=out)
+		colors = build_palette(layer_args, out=out)
+		if selection is None or colors is None:
+			return None
+
+		interval = layer_args.interval
+		if layer_args.chase:
+			frames = effects.chase_frames(palette=colors, sel=selection, mode=layer_args.chase_mode, base=comp.blank())
+			interval = interval if interval is not None else 0.1
+		elif layer_args.blink:
+			frames = effects.blink_frames(palette=colors, sel=selection, base=comp.blank())
+			interval = interval if interval is not None else 1
+		elif layer_args.progressive:
+			frames = effects.progressive_frames(palette=colors, sel=selection, base=comp.blank())
+			if layer_args.duration is not None:
+				interval = layer_args.duration / max(1, len(effects.lit_indices(colors, selection)))
+			elif interval is None:
+				interval = 1
+		elif layer_args.gradient is not None:
+			frames = effects.gradient_frames(palette=gradient.GRADIENTS[layer_args.gradient], sel=selection, base=comp.blank())
+			interval = interval if interval is not None else 0.05
+		elif layer_args.fill:
+			frame = comp.blank()
+			effects.render_pixels(frame, span_col=colors.get_span_primary(), space_col=colors.get_space_primary(), sel=selection)
+			frames = [frame]
+			interval = None
 		else:
-			print("Use a valid brightness between 0-1")
+			print(f"[ERROR] Layer '{spec}' needs an effect (--fill, --blink, --progressive, --chase or --gradient)", file=out)
+			return None
 
-	# ---- EFFECT ARGS ----
+		fps = 1 / interval if interval is not None else None
+		if fps is not None:
+			rates.append(fps)
+		comp.add_layer(compositor.Layer(frames, sel=selection, mode=layer_args.blend, opacity=layer_args.opacity, fps=fps))
 
-	if args.chase:
-		print("Chase")
-		effects.chase_fill(
-			palette=colors,
-			interval=args.interval,
-			duration=args.duration,
-			sel=selection
-		)
+	# The composition runs at the rate of its fastest layer, slower layers repeat their frames
+	return comp, args.fps if args.fps is not None else max(rates, default=1)
 
-	if args.progressive:
-		print("Progressive")
-		if args.interval is not None and args.duration is not None:
-			print("Note: Both --interval and --duration were provided. --duration takes precedence and will override --interval.")
-		elif args.interval is None and args.duration is None:
-			print("No --interval or --duration specified. Using default interval: 1 second.")
-		effects.progressive_fill( 
-			palette=colors,
-			interval=args.interval,
-			duration=args.duration,
-			sel=selection
-		)
+def print_stats(stats, out=None):
+	"""
+	Prints the timing statistics of the frame scheduler that ran an effect
 
-	if args.blink:
-		print("Blinking")
-		if args.interval is None:
-			print("No --interval provided. Using default interval of 1 second.")
-		if args.duration is None:
-			print("No --duration provided. Using default duration of 10 seconds.")
+	Keyword arguments:
+	stats -- The SchedulerStats returned by a timed effect
+	out -- A text stream to print to, defaults to sys.stdout
+	"""
+	print(f"Frames: {stats.frames}, Missed deadlines: {stats.missed}, Skipped: {stats.skipped}, Max lateness: {stats.max_lateness * 1000:.3f} ms", file=out)
+	bounds = [f"<{bound * 1000:g} ms" for bound in JITTER_BUCKETS] + [f">={JITTER_BUCKETS[-1] * 1000:g} ms"]
+	print("Jitter: " + ", ".join(f"{bound}: {count}" for bound, count in zip(bounds, stats.jitter)), file=out)
 
-		effects.blink_color(
-			palette=colors,
-			interval=args.interval,
-			duration=args.duration,
-			sel=selection
-		)
+def print_power_stats(stats, out=None):
+	"""
+	Prints the estimated current draw of the last frame pushed to a strip
 
-	if args.fill:
-		print("Filled")
-		effects.apply_fill(
-			palette=colors,
-			sel=selection
-		)
+	Keyword arguments:
+	stats -- The PowerStats of the strip
+	out -- A text stream to print to, defaults to sys.stdout
+	"""
+	print(f"Estimated draw: {stats.estimated_ma:.0f} mA, Limited draw: {stats.limited_ma:.0f} mA, Peak: {stats.peak_ma:.0f} mA, Scale: {stats.scale:.2f}, Frames limited: {stats.limited}", file=out)
 
-	return ExitCode.SUCCESS
+def print_receiver_stats(stats, out=None):
+	"""
+	Prints the counts of packets handled by a network receiver
+
+	Keyword arguments:
+	stats -- The ReceiverStats returned by a receiver
+	out -- A text stream to print to, defaults to sys.stdout
+	"""
+	print(f"Packets: {stats.packets}, Frames: {stats.frames}, Late: {stats.late}, Ignored: {stats.ignored}, Incomplete syncs: {stats.incomplete}", file=out)
+
+def print_recorded(frames, out=None):
+	"""
+	Prints the number of frames recorded to a file
+
+	Keyword arguments:
+	frames -- The number of frames returned by recording.record
+	out -- A text stream to print to, defaults to sys.stdout
+	"""
+	print(f"Frames recorded: {frames}", file=out)
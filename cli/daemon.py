@@ -0,0 +1,183 @@
+"""
+daemon.py
+
+Resident LED daemon for the LED control system.
+
+The daemon owns the LED controller for as long as it runs, so the hardware
+is only set up once. It listens on a Unix domain socket for commands sent
+by the CLI, replies as soon as a command has been validated and started,
+and runs the command's effect in the background. A new command preempts
+the effect running on the same strip, which stops before its next frame,
+while effects on other strips keep running.
+
+Everything runs on the event loop of one engine.Engine: the control socket
+and its connections, network receivers and stream sources are read on the
+loop, and each effect is a task of the engine, so the daemon needs no
+threads beyond the output threads pushing each strip.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import socket
+from led import controller
+from led.config import SOCKET_PATH
+from led.engine import Engine, DEFAULT_FPS
+from .client import TIMEOUT, encode_message
+from .commands import prepare_commands
+from .exit_codes import ExitCode
+
+class LedDaemon:
+	"""
+	Represents the resident process which owns the LED strip and runs commands sent to it
+
+	This object:
+		- Listens for requests on a Unix domain socket, read on the engine's event loop
+		- Validates each command and replies with its exit status and output
+		- Runs each valid command as a task of the engine, preempting the command running on the same strip
+	"""
+	def __init__(self, path=SOCKET_PATH, fps=DEFAULT_FPS):
+		"""
+		Initialize the daemon, it does not listen until served
+
+		Keyword arguments:
+		path -- the path of the Unix domain socket to listen on
+		fps -- the number of ticks per second the engine shows the strips at
+		"""
+		self.path = path
+		self.engine = Engine(fps=fps)
+		self.loop = None
+		self.server = None
+
+	def handle(self, request, send=None) -> dict:
+		"""
+		Validates and starts the command in a request and returns the reply
+
+		This runs on the engine's event loop, so no effect renders a frame while the
+		command is validated and its settings are applied. Only a command which starts
+		an effect, or '--off', stops the effect running on its strip, so a command which
+		only changes settings (e.g. '--brightness') applies them to the running effect.
+
+		Keyword arguments:
+		request -- a decoded request holding the parsed CLI arguments under "args"
+		send -- a function taking a message, which is sent the rest of the command's output once its
+		        effect finishes when the command asked for '--stats', in which case the reply has "more" set
+		"""
+		args = argparse.Namespace(**request["args"])
+
+		output = io.StringIO()	# Each command prints to its own output, so replies never carry another command's output
+		status, action = prepare_commands(args, engine=self.engine, out=output)
+		task = None
+		if action is not None:
+			if args.off:
+				self.engine.stop(args.strip)
+			effect = action()
+			if effect is not None:
+				task = self.engine.start(effect, strip=args.strip)
+
+		reply = {"status": int(status), "output": output.getvalue()}
+		if task is not None and args.stats and send is not None:
+			sent = len(reply["output"])
+			task.add_done_callback(lambda task: send({"output": output.getvalue()[sent:]}))
+			reply["more"] = True
+		return reply
+
+	def accept(self):
+		"""
+		Accepts a connection to the control socket, and reads its request on the event loop
+		"""
+		try:
+			conn, _ = self.server.accept()
+		except BlockingIOError:
+			return
+		conn.setblocking(False)
+		received = bytearray()
+
+		def send(message, more=False):
+			try:
+				conn.sendall(encode_message(message))
+			except OSError:
+				pass	# The client gave up waiting, the command still runs
+			if not more:
+				conn.close()
+
+		def receive():
+			try:
+				data = conn.recv(4096)
+			except BlockingIOError:
+				return
+			except OSError:
+				data = b""
+			received.extend(data)
+			if data and b"\n" not in data:
+				return
+
+			self.engine.remove_reader(conn)
+			if b"\n" not in received:
+				conn.close()	# The client closed the connection without sending a whole request
+				return
+			conn.settimeout(TIMEOUT)
+			try:
+				reply = self.handle(json.loads(received[:received.index(b"\n")]), send=send)
+			except Exception:
+				conn.close()	# The client reports the daemon closed the connection, the loop reports the error
+				raise
+			send(reply, more=reply.get("more", False))
+
+		self.engine.add_reader(conn, receive)
+
+	async def run(self):
+		"""
+		Listens for and handles requests on the engine's event loop until shut down
+		"""
+		if os.path.exists(self.path):
+			os.unlink(self.path)	# Remove the socket left behind by a daemon that did not shut down cleanly
+
+		for strip in controller.get_strip_names():
+			controller.start_output_thread(strip=strip)	# Each strip pushes from its own thread, in parallel
+		self.loop = asyncio.get_running_loop()
+		with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+			try:
+				server.bind(self.path)
+				server.listen()
+				server.setblocking(False)
+				self.server = server
+				self.engine.add_reader(server, self.accept)
+				await self.engine.run(forever=True)
+			finally:
+				for strip in controller.get_strip_names():
+					controller.stop_output_thread(strip=strip)
+				os.unlink(self.path)
+
+	def serve_forever(self):
+		"""
+		Listens for and handles requests until shut down
+		"""
+		asyncio.run(self.run())
+
+	def shutdown(self):
+		"""
+		Stops listening for requests and cancels every effect, causing serve_forever to return
+
+		This may be called from any thread.
+		"""
+		if self.loop is not None:
+			self.loop.call_soon_threadsafe(self.engine.shutdown)
+
+def serve(path=SOCKET_PATH):
+	"""
+	Runs the LED daemon until it is interrupted
+
+	Keyword arguments:
+	path -- the path of the Unix domain socket to listen on
+
+	Returns:
+	int value representing exit status code
+	"""
+	print(f"LED daemon listening on {path}")
+	try:
+		LedDaemon(path=path).serve_forever()
+	except KeyboardInterrupt:
+		pass
+	return ExitCode.SUCCESS
@@ -28,13 +28,31 @@ def build_parser():
 		help="Turn the lights off. Usage: '--off'"
 	)
 
+	parser.add_argument(
+		"--daemon",
+		action='store_true',
+		help="Runs the resident LED daemon, which keeps the strip set up and runs commands sent from other CLI calls without blocking them. Usage: '--daemon'"
+	)
+
+	parser.add_argument(
+		"--local",
+		action='store_true',
+		help="Runs the command in this process even if the LED daemon is running. Usage: '--fill --color r --local'"
+	)
+
+	parser.add_argument(
+		"--strip",
+		metavar="NAME",
+		help="Specifies the name of the strip to act on, as configured in STRIPS. Defaults to DEFAULT_STRIP. Usage: '--fill --color r --strip left'"
+	)
+
 	parser.add_argument(
 		"-c",
 		"--color",
 		nargs="+",
 		metavar="COLOR",
 		default=None,
-		help="Primary color (span color): name/letter (r, red) or RGB (255,0,0). Usage: '--color r' '--color 255 0 0'. Color options: (red, blue, green, yellow, magenta, cyan, white)"
+		help="Primary color (span color): name/letter (r, red, orange), hex (#ff8800, #f80), RGB (255 0 0), hsv(H, S%%, V%%), hsl(H, S%%, L%%) or a temperature (2700K). Usage: '--color r' '--color 255 0 0' '--color "#f80"' '--color "hsv(120, 100%%, 50%%)"'. Names are those of CSS, with red, green, blue, yellow, magenta, cyan and white at full brightness"
 	)
 
 	parser.add_argument(
@@ -42,7 +60,7 @@ def build_parser():
 		nargs="+",
 		metavar="COLOR",
 		default=None,
-		help="Secondary color if supported: name/letter (r, red) or RGB (255,0,0). Usage: '--secondary-color r' '--secondary-color 255 0 0'"
+		help="Secondary color if supported, in any format --color takes. Usage: '--secondary-color r' '--secondary-color 255 0 0'"
 	)
 
 	parser.add_argument(
@@ -50,7 +68,7 @@ def build_parser():
 		metavar="COLOR",
 		nargs="+",
 		default=None,
-		help="Spacing color (fills in non span spacing): name/letter (r, red) or RGB (255,0,0). Usage: '--spacing-color r' '--spacing-color 255 0 0'"
+		help="Spacing color (fills in non span spacing), in any format --color takes. Usage: '--spacing-color r' '--spacing-color 255 0 0'"
 	)
 
 	parser.add_argument(
@@ -58,7 +76,7 @@ def build_parser():
 		metavar="COLOR",
 		nargs="+",
 		default=None,
-		help="Secondary spacing color (if secondary color is supported): name/letter (r, red) or RGB (255,0,0). Usage: '--spacing-color-secondary r' '--spacing-color-secondary 255 0 0'"
+		help="Secondary spacing color (if secondary color is supported), in any format --color takes. Usage: '--spacing-color-secondary r' '--spacing-color-secondary 255 0 0'"
 	)
 
 	action_group = parser.add_mutually_exclusive_group()
@@ -88,7 +106,93 @@ def build_parser():
 		"-C",
 		"--chase",
 		action='store_true',
-		help="Creates a bar of span length to chase itself back and forth on the LED strip. Usage: '--chase'"
+		help="Creates a bar of span length to chase itself back and forth on the LED strip, moving one LED every 0.1 seconds for 10 seconds by default, to edit see '--interval', '--duration' and '--chase-mode'. Usage: '--chase'"
+	)
+
+	action_group.add_argument(
+		"--gradient",
+		choices=("rainbow", "fire", "heatmap"),
+		help="Spreads a gradient over the LED strip and scrolls it along, one step every 0.05 seconds for 10 seconds by default, to edit see '--interval' and '--duration'. Usage: '--gradient rainbow'"
+	)
+
+	action_group.add_argument(
+		"--stream",
+		nargs="?",
+		const="-",
+		metavar="SOURCE",
+		help="Shows raw frames of LED_COUNT * 3 bytes read from a file or FIFO, or from stdin if no source is given, until the stream ends. Always runs locally when reading stdin. Usage: 'ffmpeg ... -f rawvideo -pix_fmt rgb24 - | python -m cli --stream' '--stream /tmp/led.fifo'"
+	)
+
+	action_group.add_argument(
+		"--receive",
+		choices=("e131", "artnet", "ddp"),
+		help="Shows frames received over UDP from lighting software with sACN (e131), Art-Net or DDP until stopped or the '--duration' ends. Usage: '--receive e131'"
+	)
+
+	action_group.add_argument(
+		"--play",
+		metavar="PATH",
+		help="Plays back a recording made with '--record', showing each frame at the time it was recorded. Usage: '--play show.led' '--play show.led --seek 30'"
+	)
+
+	action_group.add_argument(
+		"--layer",
+		action="append",
+		metavar="EFFECT",
+		help="Runs an effect in a layer, given as its own quoted flags, so several effects run at once. Layers stack in the order given, each restricted to its '--range' and mixed onto those beneath by its '--blend' and '--opacity'. Runs for '--duration'. Usage: '--layer \"--blink --color r --range 0 20\" --layer \"--chase --color b --range 30 60 --blend add\"'"
+	)
+
+	parser.add_argument(
+		"--blend",
+		choices=("replace", "add", "multiply", "max", "alpha"),
+		default="replace",
+		help="Specifies how a '--layer' mixes onto the layers beneath it: replace, add, multiply or max its pixels, or alpha blend them by '--opacity'. Defaults to replace. Usage: '--layer \"--fill --color w --blend multiply\"'"
+	)
+
+	parser.add_argument(
+		"--opacity",
+		type=float,
+		default=1.0,
+		help="Specifies the opacity (0 to 1) a '--layer' is mixed in with. Defaults to 1. Usage: '--layer \"--chase --color b --opacity 0.5\"'"
+	)
+
+	parser.add_argument(
+		"--seek",
+		type=float,
+		default=0.0,
+		help="Specifies the time in seconds into the recording '--play' starts from. Defaults to 0. Usage: '--play show.led --seek 30'"
+	)
+
+	parser.add_argument(
+		"--record",
+		metavar="PATH",
+		help="Records a timed effect ('--blink', '--progressive', '--chase' or '--gradient') to a file instead of showing it, rendering it as fast as possible. Usage: '--chase --color r --record show.led'"
+	)
+
+	parser.add_argument(
+		"--universe",
+		type=int,
+		help="Specifies the sACN or Art-Net universe mapped to the first pixel of the strip, following universes map to the next 170 pixels each. Defaults to 1 for sACN and 0 for Art-Net. Usage: '--receive e131 --universe 5'"
+	)
+
+	parser.add_argument(
+		"--pixel-order",
+		choices=("RGB", "RBG", "GRB", "GBR", "BRG", "BGR"),
+		default="RGB",
+		help="Specifies the channel order of the pixels read by '--stream'. Defaults to RGB. Usage: '--stream --pixel-order BGR'"
+	)
+
+	parser.add_argument(
+		"--fps",
+		type=float,
+		help="Specifies the maximum number of frames '--stream' shows per second, older frames arriving faster are skipped. Defaults to 60. Usage: '--stream --fps 30'"
+	)
+
+	parser.add_argument(
+		"--chase-mode",
+		choices=("bounce", "wrap"),
+		default="bounce",
+		help="Specifies how '--chase' moves: 'bounce' slides the bar back and forth, 'wrap' scrolls it off the end and around to the start. Defaults to bounce. Usage: '--chase --chase-mode wrap'"
 	)
 
 	parser.add_argument(
@@ -133,6 +237,46 @@ def build_parser():
 		help="Sets the brightness of the light strip to a value between 0 and 1. Usage: '--brightness 0.5'"
 	)
 
+	parser.add_argument(
+		"--fade",
+		type=float,
+		metavar="SECONDS",
+		help="Crossfades from the light strip's current colors into '--fill', '--blink', '--progressive', '--chase', '--gradient' or '--layer' over a time in seconds, rather than snapping to it. A '--blink' also crossfades between its colors. Usage: '--fill --color b --fade 2'"
+	)
+
+	parser.add_argument(
+		"--easing",
+		choices=("linear", "ease-in", "ease-out", "ease-in-out"),
+		default="linear",
+		help="Specifies the easing curve '--fade' follows. Defaults to linear. Usage: '--fill --color b --fade 2 --easing ease-in-out'"
+	)
+
+	parser.add_argument(
+		"--gamma",
+		type=float,
+		help="Sets the gamma curve colors are corrected by before being sent to the light strip, so dim colors step evenly. 1 turns correction off. Defaults to GAMMA (2.2). Usage: '--gamma 2.5'"
+	)
+
+	parser.add_argument(
+		"--temperature",
+		type=float,
+		metavar="KELVIN",
+		help="Sets the color temperature (1000-40000 K) white is shown at, balancing the channels. Lower is warmer, 6600 is full white. Usage: '--temperature 4000'"
+	)
+
+	parser.add_argument(
+		"--power-limit",
+		type=float,
+		metavar="MA",
+		help="Sets the current in mA the light strip's power supply can provide. Frames which would draw more are dimmed evenly to fit. Defaults to POWER_LIMIT_MA. Usage: '--fill --color w --power-limit 4000'"
+	)
+
+	parser.add_argument(
+		"--stats",
+		action='store_true',
+		help="Prints the frame timing statistics (missed deadlines, lateness, jitter) of a timed effect, and the strip's estimated current draw, when it finishes. Usage: '--blink --stats'"
+	)
+
 	parser.add_argument(
 		"-R",
 		"--range",
@@ -0,0 +1,387 @@
+"""
+backends.py
+
+Output backends for the LED controller system.
+
+This module defines the interface that the controller draws pixels through,
+along with a backend that drives a physical NeoPixel strip and a backend that
+simulates a strip in memory so the led package can run off of a Raspberry Pi.
+"""
+import threading
+from dataclasses import dataclass
+from .config import PIN, LED_COUNT, PIXEL_ORDER, DEFAULT_BRIGHTNESS, GAMMA, WHITE_POINT, POWER_LIMIT_MA
+from .clock import MONOTONIC
+from . import render
+from .colors import color_bytes
+from .correction import ColorCorrection
+from .power import PowerLimiter
+
+@dataclass(slots=True)
+class ShowStats:
+	"""
+	Represents the counts of frames pushed to, and skipped for, a strip
+	"""
+	pushed: int = 0			# The number of show() calls that pushed a frame to the strip
+	skipped: int = 0		# The number of show() calls skipped because nothing changed
+	dropped: int = 0		# The number of frames replaced by a newer frame before the output thread pushed them
+	pixels_pushed: int = 0		# The total number of pixels sent to the strip
+
+class OutputBackend:
+	"""
+	Represents a strip of pixels that the controller can draw to
+
+	This object:
+		- Holds the current frame as a bytearray of packed RGB values, three bytes per pixel
+		- Can fill, set, and read pixels in the frame
+		- Stores the brightness, gamma and white point of the strip as a ColorCorrection
+		- Estimates the current each pushed frame draws, dimming frames which would draw more than the strip's power limit
+		- Guards the correction and power limiter with a lock, so a frame is never sent through half updated tables
+		- Tracks the span of pixels changed since the last show, and skips shows when nothing changed
+		- Pushes frames from the calling thread, or hands them to an OutputThread when one is attached
+		- Leaves pushing the frame out to the strip to subclasses through push()
+	"""
+	def __init__(self, count=LED_COUNT, brightness=DEFAULT_BRIGHTNESS, gamma=GAMMA, white_point=WHITE_POINT, power_limit=POWER_LIMIT_MA):
+		"""
+		Initialize the backend with a blank frame
+
+		Keyword arguments:
+		count -- the number of pixels on the strip
+		brightness -- the float value (0 to 1) to determine the brightness of the LEDs
+		gamma -- the gamma curve exponent colors are corrected by, 1 leaves them linear
+		white_point -- the RGB int tuple full white is sent as
+		power_limit -- the current in mA the strip's supply can provide, or None to not limit
+		"""
+		self.count = count
+		self.buf = bytearray(count * 3)
+		self.brightness = brightness
+		self.correction = ColorCorrection(brightness=brightness, gamma=gamma, white_point=white_point)
+		self.power = PowerLimiter(count, limit=power_limit)
+		self.lock = threading.Lock()	# Held while the correction or power limiter is changed, or a frame is sent through them
+		self.dirty = (0, count)		# The (start, stop) span of pixels changed since the last show, or None
+		self.stats = ShowStats()
+		self.output = None		# The OutputThread frames are handed to, or None to push synchronously
+
+	def __len__(self):
+		return self.count
+
+	def fill(self, color):
+		"""
+		Sets every pixel in the frame to a specified color
+
+		Keyword arguments:
+		color -- an RGB int tuple or packed int to fill the frame with
+		"""
+		frame = color_bytes(color) * self.count
+		if self.buf != frame:
+			self.buf[:] = frame
+			self.mark_dirty(0, self.count)
+
+	def set_pixel(self, index, color):
+		"""
+		Sets a single pixel in the frame to a specified color
+
+		Keyword arguments:
+		index -- the index of the pixel on the strip (0-count)
+		color -- an RGB int tuple or packed int to set the pixel to
+		"""
+		offset = self.check_index(index) * 3
+		col = color_bytes(color)
+		if self.buf[offset:offset + 3] != col:
+			self.buf[offset:offset + 3] = col
+			self.mark_dirty(index, index + 1)
+
+	def get_pixel(self, index) -> tuple[int, int, int]:
+		"""
+		Returns the RGB int tuple currently held for a pixel in the frame
+
+		Keyword arguments:
+		index -- the index of the pixel on the strip (0-count)
+		"""
+		offset = self.check_index(index) * 3
+		return tuple(self.buf[offset:offset + 3])
+
+	def write(self, data, start=0):
+		"""
+		Copies a block of packed RGB values into the frame with a single slice assignment
+
+		Keyword arguments:
+		data -- a C-contiguous bytes-like object of packed RGB values, three bytes per pixel (e.g. an (n, 3) uint8 array)
+		start -- the index of the pixel on the strip to write the first color to
+		"""
+		data = memoryview(data).cast("B")
+		size = data.nbytes
+		if size % 3 != 0:
+			raise ValueError(f"Frame data must hold three bytes per pixel, got {size} bytes")
+		if start < 0 or start + size // 3 > self.count:
+			raise IndexError(f"Frame of {size // 3} pixels at index {start} does not fit on a strip of {self.count} LEDs")
+		if self.buf[start * 3:start * 3 + size] != data:
+			self.buf[start * 3:start * 3 + size] = data
+			self.mark_dirty(start, start + size // 3)
+
+	def read(self, start=0, stop=None) -> bytes:
+		"""
+		Returns a copy of the packed RGB values held for a range of pixels in the frame
+
+		Keyword arguments:
+		start -- the index of the first pixel to read
+		stop -- the index after the last pixel to read, defaults to the end of the strip
+		"""
+		if stop is None:
+			stop = self.count
+		return bytes(self.buf[start * 3:stop * 3])
+
+	def set_brightness(self, val):
+		"""
+		Sets the brightness applied to the entire strip
+
+		Keyword arguments:
+		val -- the float value (0 to 1) to determine the brightness of the LEDs
+		"""
+		if val != self.brightness:
+			self.brightness = val
+			with self.lock:
+				self.correction.set_brightness(val)
+			self.mark_dirty(0, self.count)
+
+	def set_correction(self, gamma=None, white_point=None):
+		"""
+		Sets the gamma curve and white point colors are corrected by before being sent to the strip
+
+		Keyword arguments:
+		gamma -- the gamma curve exponent, or None to leave it as it is
+		white_point -- the RGB int tuple full white is sent as, or None to leave it as it is
+		"""
+		before = (self.correction.gamma, self.correction.white_point)
+		with self.lock:
+			if gamma is not None:
+				self.correction.set_gamma(gamma)
+			if white_point is not None:
+				self.correction.set_white_point(white_point)
+		if (self.correction.gamma, self.correction.white_point) != before:
+			self.mark_dirty(0, self.count)
+
+	def set_power_limit(self, limit):
+		"""
+		Sets the current the strip's supply can provide, frames which would draw more are dimmed to fit
+
+		Keyword arguments:
+		limit -- the current in mA, or None to not limit
+		"""
+		if limit != self.power.limit:
+			with self.lock:
+				self.power.set_limit(limit)
+			self.mark_dirty(0, self.count)
+
+	def mark_dirty(self, start, stop):
+		"""
+		Marks a span of pixels as changed since the last show
+
+		Keyword arguments:
+		start -- the index of the first changed pixel
+		stop -- the index after the last changed pixel
+		"""
+		if self.dirty is None:
+			self.dirty = (start, stop)
+		else:
+			self.dirty = (min(start, self.dirty[0]), max(stop, self.dirty[1]))
+
+	def is_dirty(self) -> bool:
+		"""
+		Returns true if any pixel has changed since the last show
+		"""
+		return self.dirty is not None
+
+	def show(self):
+		"""
+		Pushes the current frame out to the strip if any pixel has changed since the last show
+
+		When an output thread is attached the frame is copied to it and this returns
+		without waiting for the frame to be sent.
+
+		Returns true if the frame was pushed, or false if the show was skipped
+		"""
+		if self.dirty is None:
+			self.stats.skipped += 1
+			return False
+
+		stop = self.dirty[1]
+		self.dirty = None
+		if self.output is not None:
+			self.output.submit(self.buf, stop)
+		else:
+			self.send(self.buf, stop)
+		return True
+
+	def send(self, frame, stop):
+		"""
+		Pushes a frame out to the strip and counts it
+
+		This runs on the output thread when one is attached, so the correction and power
+		limiter are only read and updated under the backend's lock, which the setters
+		called from other threads take too.
+
+		Keyword arguments:
+		frame -- a bytes-like object of packed RGB values for the whole strip
+		stop -- the index after the last pixel that must be sent
+		"""
+		with self.lock:
+			scale = self.power.update(frame, self.correction.get_tables())
+			if scale != self.correction.limit:
+				self.correction.set_limit(scale)
+				stop = self.count	# A new scale changes every pixel sent
+			self.push(frame, stop)
+		self.stats.pushed += 1
+		self.stats.pixels_pushed += stop
+
+	def push(self, frame, stop):
+		"""
+		Writes a frame out to the strip
+
+		ws2812b pixels keep their color until new data reaches them, so only the
+		pixels up to the last changed pixel need to be sent.
+
+		Keyword arguments:
+		frame -- a bytes-like object of packed RGB values for the whole strip
+		stop -- the index after the last pixel that must be sent
+		"""
+		raise NotImplementedError(f"{type(self).__name__} does not implement push()")
+
+	def check_index(self, index) -> int:
+		"""
+		Returns the index provided if it is on the strip, else raises an IndexError
+		"""
+		if not 0 <= index < self.count:
+			raise IndexError(f"Pixel index {index} is out of range for a strip of {self.count} LEDs")
+		return index
+
+class SimulatedBackend(OutputBackend):
+	"""
+	Represents an LED strip held entirely in memory
+
+	This object:
+		- Keeps a copy of the last frame that was shown
+		- Counts the number of frames pushed by show()
+		- Never touches GPIO, so rendering can be run and timed on any machine
+		- Keeps the colors drawn as they are, without color correction or power limiting, so shown frames can be compared
+	"""
+	def __init__(self, count=LED_COUNT, brightness=DEFAULT_BRIGHTNESS, gamma=GAMMA, white_point=WHITE_POINT, power_limit=POWER_LIMIT_MA):
+		super().__init__(count=count, brightness=brightness, gamma=gamma, white_point=white_point, power_limit=power_limit)
+		self.shown = bytes(self.buf)
+		self.show_count = 0
+
+	def push(self, frame, stop):
+		"""
+		Records the pixels sent as the shown frame
+		"""
+		self.shown = bytes(frame[:stop * 3]) + self.shown[stop * 3:]
+		self.show_count += 1
+
+class FrameSinkBackend(OutputBackend):
+	"""
+	Represents an LED strip whose pushed frames are handed to a sink instead of hardware
+
+	This object:
+		- Passes every pushed frame to a sink along with the time it was pushed
+		- Timestamps frames from a clock, so effects run on a virtual clock can be rendered offline
+		- Collects frames into a list of (timestamp, frame) pairs when no sink is provided
+		- Hands over the colors drawn as they are, without color correction or power limiting, so frames can be recorded and replayed on any strip
+	"""
+	def __init__(self, count=LED_COUNT, brightness=DEFAULT_BRIGHTNESS, sink=None, clock=None, gamma=GAMMA, white_point=WHITE_POINT, power_limit=POWER_LIMIT_MA):
+		"""
+		Initialize the backend with a blank frame
+
+		Keyword arguments:
+		count -- the number of pixels on the strip
+		brightness -- the float value (0 to 1) to determine the brightness of the LEDs
+		sink -- a callable taking (timestamp, frame) for each pushed frame, defaults to collecting frames
+		clock -- the clock to timestamp frames with, defaults to the monotonic wall clock
+		gamma -- the gamma curve exponent of the strip, see OutputBackend
+		white_point -- the RGB int tuple full white is sent as, see OutputBackend
+		power_limit -- the current in mA the strip's supply can provide, see OutputBackend
+		"""
+		super().__init__(count=count, brightness=brightness, gamma=gamma, white_point=white_point, power_limit=power_limit)
+		self.frames = []
+		self.sink = sink if sink is not None else lambda timestamp, frame: self.frames.append((timestamp, frame))
+		self.clock = clock if clock is not None else MONOTONIC
+
+	def push(self, frame, stop):
+		"""
+		Hands a copy of the whole frame to the sink
+		"""
+		self.sink(self.clock.now(), bytes(frame))
+
+class NeoPixelBackend(OutputBackend):
+	"""
+	Represents a physical ws2812b strip driven through the NeoPixel library
+
+	The board and neopixel libraries are imported when the backend is created,
+	so they are only required on a machine with a strip attached. Brightness is
+	applied through the backend's color correction tables rather than by the
+	library, which would scale every pixel in Python on each show.
+	"""
+	def __init__(self, count=LED_COUNT, brightness=DEFAULT_BRIGHTNESS, pin=PIN, pixel_order=PIXEL_ORDER, gamma=GAMMA, white_point=WHITE_POINT, power_limit=POWER_LIMIT_MA):
+		"""
+		Initialize the backend and the NeoPixel strip it drives
+
+		Keyword arguments:
+		count -- the number of pixels on the strip
+		brightness -- the float value (0 to 1) to determine the brightness of the LEDs
+		pin -- the board pin, or the name of the board pin (e.g. "D18"), connected to the data wire
+		pixel_order -- the order the strip expects color channels in (e.g. "RGB", "GRB")
+		gamma -- the gamma curve exponent colors are corrected by, 1 leaves them linear
+		white_point -- the RGB int tuple full white is sent as
+		power_limit -- the current in mA the strip's supply can provide, or None to not limit
+		"""
+		import board
+		import neopixel
+
+		super().__init__(count=count, brightness=brightness, gamma=gamma, white_point=white_point, power_limit=power_limit)
+		if isinstance(pin, str):
+			pin = getattr(board, pin)
+		self.pixels = neopixel.NeoPixel(pin, count, brightness=1.0, pixel_order=pixel_order, auto_write=False)
+
+	def push(self, frame, stop):
+		"""
+		Corrects a frame, copies it into the NeoPixel buffer and writes it to the strip
+
+		The NeoPixel library always sends its entire buffer, so every pixel is written.
+		Pixels are handed over as packed ints, which the library takes as colors too,
+		rather than building a tuple per pixel on every show.
+		"""
+		frame = self.correction.apply(frame)
+		self.pixels[0:self.count] = render.packed_pixels(frame)
+		self.pixels.show()
+
+BACKENDS = {
+	"neopixel": NeoPixelBackend,
+	"simulated": SimulatedBackend,
+	"sink": FrameSinkBackend,
+}
+
+def create_backend(name="auto", count=LED_COUNT, brightness=DEFAULT_BRIGHTNESS, pin=PIN, pixel_order=PIXEL_ORDER, gamma=GAMMA, white_point=WHITE_POINT, power_limit=POWER_LIMIT_MA) -> OutputBackend:
+	"""
+	Creates an output backend by name
+
+	The "auto" backend tries to drive a NeoPixel strip and falls back to a
+	simulated strip when the hardware libraries are not available.
+
+	Keyword arguments:
+	name -- the name of the backend ("auto", "neopixel", "simulated", or "sink")
+	count -- the number of pixels on the strip
+	brightness -- the float value (0 to 1) to determine the brightness of the LEDs
+	pin -- the name of the board pin connected to the data wire, used by NeoPixel strips
+	pixel_order -- the order the strip expects color channels in, used by NeoPixel strips
+	gamma -- the gamma curve exponent colors are corrected by
+	white_point -- the RGB int tuple full white is sent as
+	power_limit -- the current in mA the strip's supply can provide, or None to not limit
+	"""
+	if name == "auto":
+		try:
+			return NeoPixelBackend(count=count, brightness=brightness, pin=pin, pixel_order=pixel_order, gamma=gamma, white_point=white_point, power_limit=power_limit)
+		except (ImportError, NotImplementedError):
+			return SimulatedBackend(count=count, brightness=brightness, gamma=gamma, white_point=white_point, power_limit=power_limit)
+	if name == "neopixel":
+		return NeoPixelBackend(count=count, brightness=brightness, pin=pin, pixel_order=pixel_order, gamma=gamma, white_point=white_point, power_limit=power_limit)
+	if name not in BACKENDS:
+		raise ValueError(f"Unknown backend '{name}'. See options: {tuple(BACKENDS)}")
+	return BACKENDS[name](count=count, brightness=brightness, gamma=gamma, white_point=white_point, power_limit=power_limit)
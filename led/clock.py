@@ -0,0 +1,121 @@
+"""
+clock.py
+
+This module defines the clocks which effects are timed against
+
+The monotonic clock follows wall-clock time through time.monotonic and
+time.sleep. The virtual clock only moves when something waits on it, and
+jumps straight to the time waited for, so an effect timed against it runs
+as fast as it can be rendered.
+
+Both clocks can also be awaited from an asyncio event loop (see engine.py),
+without blocking the other tasks on the loop.
+"""
+import time
+
+class MonotonicClock:
+	"""
+	Represents the real passage of time, as measured by time.monotonic
+	"""
+	def now(self) -> float:
+		"""
+		Returns the current time in seconds
+		"""
+		return time.monotonic()
+
+	def sleep(self, seconds):
+		"""
+		Blocks for a number of seconds
+
+		Keyword arguments:
+		seconds -- the time in seconds to sleep for
+		"""
+		if seconds > 0:
+			time.sleep(seconds)
+
+	def wait_until(self, deadline, spin=0.0, cancel=None):
+		"""
+		Blocks until a deadline, sleeping for most of the wait and spinning through the end of it
+
+		Keyword arguments:
+		deadline -- the time to wait until
+		spin -- the time in seconds before the deadline to stop sleeping and spin
+		cancel -- a threading.Event which, once set, ends the wait early
+		"""
+		remaining = deadline - time.monotonic()
+		if remaining > spin:
+			if cancel is None:
+				time.sleep(remaining - spin)
+			elif cancel.wait(remaining - spin):
+				return
+		while time.monotonic() < deadline:
+			if cancel is not None and cancel.is_set():
+				return
+
+	async def sleep_until(self, deadline):
+		"""
+		Suspends the awaiting task until a deadline, leaving the event loop free to run other tasks
+
+		The loop's own timer accuracy applies, as spinning would hold up every other task.
+
+		Keyword arguments:
+		deadline -- the time to wait until
+		"""
+		import asyncio	# Imported here, so effects which never await a clock do not load asyncio
+		await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+
+class VirtualClock:
+	"""
+	Represents a simulated passage of time which advances instantly
+
+	This object:
+		- Starts at a given time and only moves forward when slept on, waited on, or advanced
+		- Never blocks, so timed effects can be rendered offline as fast as the CPU allows
+	"""
+	def __init__(self, start=0.0):
+		"""
+		Initialize the virtual clock
+
+		Keyword arguments:
+		start -- the time in seconds the clock starts at
+		"""
+		self.time = start
+
+	def now(self) -> float:
+		"""
+		Returns the current virtual time in seconds
+		"""
+		return self.time
+
+	def advance(self, seconds):
+		"""
+		Moves the clock forward by a number of seconds
+
+		Keyword arguments:
+		seconds -- the time in seconds to move forward, negative values are ignored
+		"""
+		if seconds > 0:
+			self.time += seconds
+
+	def sleep(self, seconds):
+		"""
+		Moves the clock forward by a number of seconds without blocking
+		"""
+		self.advance(seconds)
+
+	def wait_until(self, deadline, spin=0.0, cancel=None):
+		"""
+		Moves the clock forward to a deadline without blocking
+		"""
+		self.advance(deadline - self.time)
+
+	async def sleep_until(self, deadline):
+		"""
+		Moves the clock forward to a deadline, yielding to the event loop once so other tasks can run
+		"""
+		import asyncio	# Imported here, so effects which never await a clock do not load asyncio
+		self.advance(deadline - self.time)
+		await asyncio.sleep(0)
+
+MONOTONIC = MonotonicClock()
+"""The shared wall-clock instance used when no clock is provided"""
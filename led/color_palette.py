@@ -15,6 +15,7 @@ class ColorPalette:
 	This object:
 		- Stores data on the selection of colors for the LED display
 		- Holds four colors, a primary and secondary for the span of the led strip, and the spacing between
+		- Takes each color as an RGB int tuple or a packed 24-bit int
 		- Validates all colors passed are valid else sets defaults
 		- Can return each color
 	"""
@@ -57,6 +58,7 @@ class ColorPalette:
 		return self.spacing_secondary
 
 	@staticmethod
-	def validate_color(name: str, color: tuple[int, int, int]):
-		if not is_valid_color(color):
+	def validate_color(name: str, color: tuple[int, int, int] | int):
+		valid = 0 <= color <= 0xFFFFFF if isinstance(color, int) else is_valid_color(color)
+		if not valid:
 			raise ValueError(f"Invalid color for {name}: {color}")
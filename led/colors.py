@@ -7,7 +7,21 @@ This module defines a dictionary of color mappings that contains both their
 first letter and full name as a key, as well as tools to properly create and
 verify integer tuples for setting colors.
 
+Colors are RGB int tuples at the API edge, where they are read from the
+command line or handed back to the caller. Internally a color may also be a
+packed 24-bit int (0xRRGGBB), see pack_color, which is a single small object
+rather than a tuple of three. Both forms are turned into the 3 bytes written
+into a frame by color_bytes.
+
+Colors from the command line are parsed by parse_color, which also knows the
+CSS named colors, hex colors, hsv(...), hsl(...) and color temperatures, and
+remembers the strings it has parsed.
 """
+import colorsys
+import functools
+import re
+from .correction import white_point_from_kelvin
+
 COLORS = {
 	"r": (255, 0, 0),
 	"red": (255, 0, 0),
@@ -35,6 +49,170 @@ COLORS = {
 
 OFF = COLORS["off"]
 
+CSS_COLORS = {
+	"aliceblue": 0xF0F8FF,
+	"antiquewhite": 0xFAEBD7,
+	"aqua": 0x00FFFF,
+	"aquamarine": 0x7FFFD4,
+	"azure": 0xF0FFFF,
+	"beige": 0xF5F5DC,
+	"bisque": 0xFFE4C4,
+	"black": 0x000000,
+	"blanchedalmond": 0xFFEBCD,
+	"blue": 0x0000FF,
+	"blueviolet": 0x8A2BE2,
+	"brown": 0xA52A2A,
+	"burlywood": 0xDEB887,
+	"cadetblue": 0x5F9EA0,
+	"chartreuse": 0x7FFF00,
+	"chocolate": 0xD2691E,
+	"coral": 0xFF7F50,
+	"cornflowerblue": 0x6495ED,
+	"cornsilk": 0xFFF8DC,
+	"crimson": 0xDC143C,
+	"cyan": 0x00FFFF,
+	"darkblue": 0x00008B,
+	"darkcyan": 0x008B8B,
+	"darkgoldenrod": 0xB8860B,
+	"darkgray": 0xA9A9A9,
+	"darkgreen": 0x006400,
+	"darkgrey": 0xA9A9A9,
+	"darkkhaki": 0xBDB76B,
+	"darkmagenta": 0x8B008B,
+	"darkolivegreen": 0x556B2F,
+	"darkorange": 0xFF8C00,
+	"darkorchid": 0x9932CC,
+	"darkred": 0x8B0000,
+	"darksalmon": 0xE9967A,
+	"darkseagreen": 0x8FBC8F,
+	"darkslateblue": 0x483D8B,
+	"darkslategray": 0x2F4F4F,
+	"darkslategrey": 0x2F4F4F,
+	"darkturquoise": 0x00CED1,
+	"darkviolet": 0x9400D3,
+	"deeppink": 0xFF1493,
+	"deepskyblue": 0x00BFFF,
+	"dimgray": 0x696969,
+	"dimgrey": 0x696969,
+	"dodgerblue": 0x1E90FF,
+	"firebrick": 0xB22222,
+	"floralwhite": 0xFFFAF0,
+	"forestgreen": 0x228B22,
+	"fuchsia": 0xFF00FF,
+	"gainsboro": 0xDCDCDC,
+	"ghostwhite": 0xF8F8FF,
+	"gold": 0xFFD700,
+	"goldenrod": 0xDAA520,
+	"gray": 0x808080,
+	"green": 0x008000,
+	"greenyellow": 0xADFF2F,
+	"grey": 0x808080,
+	"honeydew": 0xF0FFF0,
+	"hotpink": 0xFF69B4,
+	"indianred": 0xCD5C5C,
+	"indigo": 0x4B0082,
+	"ivory": 0xFFFFF0,
+	"khaki": 0xF0E68C,
+	"lavender": 0xE6E6FA,
+	"lavenderblush": 0xFFF0F5,
+	"lawngreen": 0x7CFC00,
+	"lemonchiffon": 0xFFFACD,
+	"lightblue": 0xADD8E6,
+	"lightcoral": 0xF08080,
+	"lightcyan": 0xE0FFFF,
+	"lightgoldenrodyellow": 0xFAFAD2,
+	"lightgray": 0xD3D3D3,
+	"lightgreen": 0x90EE90,
+	"lightgrey": 0xD3D3D3,
+	"lightpink": 0xFFB6C1,
+	"lightsalmon": 0xFFA07A,
+	"lightseagreen": 0x20B2AA,
+	"lightskyblue": 0x87CEFA,
+	"lightslategray": 0x778899,
+	"lightslategrey": 0x778899,
+	"lightsteelblue": 0xB0C4DE,
+	"lightyellow": 0xFFFFE0,
+	"lime": 0x00FF00,
+	"limegreen": 0x32CD32,
+	"linen": 0xFAF0E6,
+	"magenta": 0xFF00FF,
+	"maroon": 0x800000,
+	"mediumaquamarine": 0x66CDAA,
+	"mediumblue": 0x0000CD,
+	"mediumorchid": 0xBA55D3,
+	"mediumpurple": 0x9370DB,
+	"mediumseagreen": 0x3CB371,
+	"mediumslateblue": 0x7B68EE,
+	"mediumspringgreen": 0x00FA9A,
+	"mediumturquoise": 0x48D1CC,
+	"mediumvioletred": 0xC71585,
+	"midnightblue": 0x191970,
+	"mintcream": 0xF5FFFA,
+	"mistyrose": 0xFFE4E1,
+	"moccasin": 0xFFE4B5,
+	"navajowhite": 0xFFDEAD,
+	"navy": 0x000080,
+	"oldlace": 0xFDF5E6,
+	"olive": 0x808000,
+	"olivedrab": 0x6B8E23,
+	"orange": 0xFFA500,
+	"orangered": 0xFF4500,
+	"orchid": 0xDA70D6,
+	"palegoldenrod": 0xEEE8AA,
+	"palegreen": 0x98FB98,
+	"paleturquoise": 0xAFEEEE,
+	"palevioletred": 0xDB7093,
+	"papayawhip": 0xFFEFD5,
+	"peachpuff": 0xFFDAB9,
+	"peru": 0xCD853F,
+	"pink": 0xFFC0CB,
+	"plum": 0xDDA0DD,
+	"powderblue": 0xB0E0E6,
+	"purple": 0x800080,
+	"rebeccapurple": 0x663399,
+	"red": 0xFF0000,
+	"rosybrown": 0xBC8F8F,
+	"royalblue": 0x4169E1,
+	"saddlebrown": 0x8B4513,
+	"salmon": 0xFA8072,
+	"sandybrown": 0xF4A460,
+	"seagreen": 0x2E8B57,
+	"seashell": 0xFFF5EE,
+	"sienna": 0xA0522D,
+	"silver": 0xC0C0C0,
+	"skyblue": 0x87CEEB,
+	"slateblue": 0x6A5ACD,
+	"slategray": 0x708090,
+	"slategrey": 0x708090,
+	"snow": 0xFFFAFA,
+	"springgreen": 0x00FF7F,
+	"steelblue": 0x4682B4,
+	"tan": 0xD2B48C,
+	"teal": 0x008080,
+	"thistle": 0xD8BFD8,
+	"tomato": 0xFF6347,
+	"turquoise": 0x40E0D0,
+	"violet": 0xEE82EE,
+	"wheat": 0xF5DEB3,
+	"white": 0xFFFFFF,
+	"whitesmoke": 0xF5F5F5,
+	"yellow": 0xFFFF00,
+	"yellowgreen": 0x9ACD32,
+}
+"""The CSS named colors as packed ints, names in COLORS take precedence over these (CSS green is half brightness)"""
+
+COLOR_CACHE_SIZE = 256
+"""The number of distinct color strings whose parsed color is remembered"""
+
+COLOR_FORMATS = "a color name (red, r, orange, ...), #rrggbb, #rgb, R G B, hsv(H, S%, V%), hsl(H, S%, L%) or a temperature (2700K)"
+"""Describes the formats a color can be given in, for error and help messages"""
+
+HEX_DIGITS = frozenset("0123456789abcdef")
+"""The digits of a lowercase hex color"""
+
+COLOR_FUNCTION = re.compile(r"(hsv|hsl)\(\s*([^,\s]+?)(?:deg)?\s*,\s*([^,\s]+?)%?\s*,\s*([^,\s]+?)%?\s*\)")
+"""Matches an hsv(...) or hsl(...) color, capturing the function, hue, and the two percentages"""
+
 def is_valid_color(color) -> bool:
 	"""
 	Determines if a given color is a valid tuple of 3 int rgb values
@@ -50,35 +228,126 @@ def is_valid_color(color) -> bool:
 	return False
 
 
-def resolve_color(color: str | list[int, int, int] | None) -> tuple[int, int, int]:
+def pack_color(color) -> int:
 	"""
-	Takes a list of input values and returns a vaild rgb tuple if within parameters
+	Returns a color packed into a 24-bit int (0xRRGGBB)
 
-	Takes a list of input values and parses them to determine if it is a string
-	contained in the COLORS dictionary and returns a tuple, OR if it is an RGB value, 
-	parses and verifies that it is valid and returns the tuple.
+	Keyword arguments:
+	color -- an RGB int tuple, or an already packed int which is returned as is
+	"""
+	if isinstance(color, int):
+		if not 0 <= color <= 0xFFFFFF:
+			raise ValueError(f"Packed colors must be between 0 and 0xFFFFFF, got {color}")
+		return color
+	red, green, blue = color
+	return red << 16 | green << 8 | blue
+
+def unpack_color(color) -> tuple[int, int, int]:
+	"""
+	Returns a color as an RGB int tuple
+
+	Keyword arguments:
+	color -- a packed 24-bit int, or an RGB int tuple which is returned as is
+	"""
+	if isinstance(color, int):
+		return (color >> 16 & 0xFF, color >> 8 & 0xFF, color & 0xFF)
+	return tuple(color)
+
+def color_bytes(color) -> bytes:
+	"""
+	Returns the 3 packed RGB bytes a color is written into a frame as
 
 	Keyword arguments:
-	color -- a value representing a color through string or RGB.
-	"""
-	if color is not None:
-		if isinstance(color, list) and len(color) == 1 and isinstance(color[0], str):
-			# Check one string values
-			name = color[0].lower()
-			if name in COLORS:
-				return tuple(COLORS[name])
-			else:
-				raise ValueError(f"Unknown color '{name}'. See options: ('red', 'green', 'blue', 'white', 'yellow', 'magenta', 'cyan')")
-		elif isinstance(color, list) and len(color) == 3 and all(isinstance(x, str) for x in color):
-			# Check RGB values
-			try:
-				rgb_tuple = tuple(int(x) for x in color)
-			except(ValueError):
-				raise ValueError("RGB Values must be integers.")
-
-			if not is_valid_color(rgb_tuple):
-				raise ValueError("RGB Values must be between 0 and 255.")
-
-			return rgb_tuple
+	color -- an RGB int tuple, or a packed 24-bit int
+	"""
+	if isinstance(color, int):
+		return pack_color(color).to_bytes(3, "big")
+	return bytes(color)
+
+def resolve_color(color: str | list[str] | None) -> tuple[int, int, int]:
+	"""
+	Takes a color given on the command line and returns a valid rgb tuple if within parameters
+
+	The values given are joined into one string, so 'hsv(120, 100%, 50%)' may
+	be given whole or split on its spaces, and parsed by parse_color, which
+	remembers the colors it has parsed.
+
+	Keyword arguments:
+	color -- a string, or a list of strings, representing a color in one of COLOR_FORMATS
+	"""
+	if isinstance(color, str):
+		return parse_color(color)
+	if isinstance(color, list) and color and all(isinstance(x, str) for x in color):
+		return parse_color(" ".join(color))
+	raise ValueError(f"No color provided or Invalid color format: {color}")
+
+@functools.lru_cache(maxsize=COLOR_CACHE_SIZE)
+def parse_color(text: str) -> tuple[int, int, int]:
+	"""
+	Returns the rgb tuple of a color string, raising a ValueError if it is not in one of COLOR_FORMATS
+
+	Results are kept in a bounded LRU cache, so a string resolved again, as
+	the daemon and network paths do with every command, is not parsed twice.
+
+	Keyword arguments:
+	text -- the color string, case and surrounding whitespace are ignored
+	"""
+	spec = text.strip().lower()
+	if spec in COLORS:
+		return COLORS[spec]
+	if spec in CSS_COLORS:
+		return unpack_color(CSS_COLORS[spec])
+	if spec.startswith("#"):
+		return parse_hex(spec)
+	match = COLOR_FUNCTION.fullmatch(spec)
+	if match is not None:
+		return parse_color_function(*match.groups())
+	if spec.endswith("k") and spec[:-1].isdigit():
+		return white_point_from_kelvin(int(spec[:-1]))
+
+	values = re.split(r"[\s,]+", spec)
+	if len(values) == 3:
+		try:
+			rgb_tuple = tuple(int(x) for x in values)
+		except ValueError:
+			raise ValueError("RGB Values must be integers.")
+		if not all(0 <= x <= 255 for x in rgb_tuple):
+			raise ValueError("RGB Values must be between 0 and 255.")
+		return rgb_tuple
+	raise ValueError(f"Unknown color '{text}'. See options: {COLOR_FORMATS}")
+
+def parse_hex(spec) -> tuple[int, int, int]:
+	"""
+	Returns the rgb tuple of a #rrggbb or #rgb hex color
+
+	Keyword arguments:
+	spec -- the hex color, including its leading '#'
+	"""
+	digits = spec[1:]
+	if len(digits) == 3:
+		digits = "".join(d * 2 for d in digits)
+	if len(digits) != 6 or not all(d in HEX_DIGITS for d in digits):
+		raise ValueError(f"Hex colors must be #rrggbb or #rgb, got '{spec}'")
+	return unpack_color(int(digits, 16))
+
+def parse_color_function(function, hue, first, second) -> tuple[int, int, int]:
+	"""
+	Returns the rgb tuple of an hsv(...) or hsl(...) color
+
+	Keyword arguments:
+	function -- 'hsv' or 'hsl'
+	hue -- the hue in degrees, wrapped to 0 to 360
+	first -- the saturation percentage (0 to 100)
+	second -- the value or lightness percentage (0 to 100)
+	"""
+	try:
+		h, a, b = float(hue), float(first), float(second)
+	except ValueError:
+		raise ValueError(f"{function}() values must be numbers, got {function}({hue}, {first}, {second})")
+	if not (0 <= a <= 100 and 0 <= b <= 100):
+		raise ValueError(f"{function}() percentages must be between 0 and 100, got {function}({hue}, {first}, {second})")
+	if function == "hsv":
+		rgb = colorsys.hsv_to_rgb(h % 360 / 360, a / 100, b / 100)
 	else:
-		raise ValueError(f"No color provided or Invalid color format: {color}")
+		rgb = colorsys.hls_to_rgb(h % 360 / 360, b / 100, a / 100)
+	return tuple(round(c * 255) for c in rgb)
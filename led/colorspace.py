@@ -0,0 +1,249 @@
+"""
+colorspace.py
+
+Whole frame color space conversions for the LED controller system.
+
+This module converts frames between RGB and HSV or HSL, so hue, saturation
+and lightness effects work on whole frames rather than calling colorsys per
+pixel. An HSV or HSL frame is held like an RGB frame, one byte per channel:
+hue runs 0 to 255 around the color wheel (256 being a full turn), saturation,
+value and lightness run 0 to 255.
+
+Each conversion is fixed in integer arithmetic, rounding half up, and stays
+within one step of colorsys. With NumPy the formulas run as array operations
+over the whole frame, otherwise they run per pixel in pure Python with the
+products looked up in tables rather than divided. Both paths produce
+bit-identical frames.
+
+Converting back to RGB goes through the chroma of each pixel: its highest
+channel, lowest channel, and the channel between them which rises or falls
+with the hue across each sixth of the wheel. HSV and HSL only differ in how
+the highest and lowest channels are found.
+"""
+from . import render
+
+HUE_STEPS = 256
+"""The number of hues around the color wheel"""
+
+SCALE = bytes((a * b * 2 + 255) // 510 for a in range(256) for b in range(256))
+"""a * b / 255 rounded, for channel values a and b, at index a << 8 | b"""
+
+RAMP = bytes((a * f + 128) >> 8 for a in range(256) for f in range(256))
+"""a * f / 256 rounded, for a channel value a and a fraction f of a sixth of the wheel, at index a << 8 | f"""
+
+HIGH = (0, 1, 1, 2, 2, 0)
+"""The channel holding the highest value in each sixth of the wheel"""
+
+MIDDLE = (1, 0, 2, 1, 0, 2)
+"""The channel which rises (even sixths) or falls (odd sixths) with the hue in each sixth of the wheel"""
+
+LOW = (2, 2, 0, 0, 1, 1)
+"""The channel holding the lowest value in each sixth of the wheel"""
+
+def rgb_to_hsv(frame):
+	"""
+	Returns a frame of the hue, saturation and value of each pixel of an RGB frame, of the same type
+
+	Keyword arguments:
+	frame -- the RGB frame to convert
+	"""
+	if render.is_array(frame):
+		np = render.np
+		r, g, b = (frame[:, c].astype(np.int32) for c in range(3))
+		high = np.maximum(np.maximum(r, g), b)
+		delta = high - np.minimum(np.minimum(r, g), b)
+		out = np.empty_like(frame)
+		out[:, 0] = rgb_hues(r, g, b, high, delta)
+		out[:, 1] = (delta * 510 + high) // np.maximum(high * 2, 1)
+		out[:, 2] = high
+		return out
+
+	out = bytearray(len(frame))
+	for j, r, g, b in zip(range(0, len(frame), 3), frame[0::3], frame[1::3], frame[2::3]):
+		high = max(r, g, b)
+		delta = high - min(r, g, b)
+		if delta:
+			out[j] = rgb_hue(r, g, b, high, delta)
+			out[j + 1] = (delta * 510 + high) // (high * 2)
+		out[j + 2] = high
+	return out
+
+def rgb_to_hsl(frame):
+	"""
+	Returns a frame of the hue, saturation and lightness of each pixel of an RGB frame, of the same type
+
+	Keyword arguments:
+	frame -- the RGB frame to convert
+	"""
+	if render.is_array(frame):
+		np = render.np
+		r, g, b = (frame[:, c].astype(np.int32) for c in range(3))
+		high = np.maximum(np.maximum(r, g), b)
+		low = np.minimum(np.minimum(r, g), b)
+		delta = high - low
+		total = high + low
+		span = np.maximum(np.where(total <= 255, total, 510 - total), 1)
+		out = np.empty_like(frame)
+		out[:, 0] = rgb_hues(r, g, b, high, delta)
+		out[:, 1] = (delta * 510 + span) // (span * 2)
+		out[:, 2] = (total + 1) >> 1
+		return out
+
+	out = bytearray(len(frame))
+	for j, r, g, b in zip(range(0, len(frame), 3), frame[0::3], frame[1::3], frame[2::3]):
+		high = max(r, g, b)
+		low = min(r, g, b)
+		delta = high - low
+		total = high + low
+		if delta:
+			span = total if total <= 255 else 510 - total
+			out[j] = rgb_hue(r, g, b, high, delta)
+			out[j + 1] = (delta * 510 + span) // (span * 2)
+		out[j + 2] = (total + 1) >> 1
+	return out
+
+def rgb_hue(r, g, b, high, delta) -> int:
+	"""
+	Returns the hue (0 to 255) of an RGB color, 0 for grays
+
+	Keyword arguments:
+	r, g, b -- the channel values of the color
+	high -- the highest channel value
+	delta -- the highest channel value less the lowest
+	"""
+	if delta == 0:
+		return 0
+	if high == r:
+		turn = g - b
+	elif high == g:
+		turn = b - r + delta * 2
+	else:
+		turn = r - g + delta * 4
+	return (turn * HUE_STEPS * 2 + delta * 6) // (delta * 12) % HUE_STEPS
+
+def rgb_hues(r, g, b, high, delta):
+	"""
+	Returns the hue (0 to 255) of every pixel, as rgb_hue does for one, for the channels of an array frame
+
+	Keyword arguments:
+	r, g, b -- int32 arrays of the channel values
+	high -- an int32 array of the highest channel values
+	delta -- an int32 array of the highest channel values less the lowest
+	"""
+	np = render.np
+	turn = np.where(high == r, g - b, np.where(high == g, b - r + delta * 2, r - g + delta * 4))
+	wheel = (turn * HUE_STEPS * 2 + delta * 6) // np.maximum(delta * 12, 1) % HUE_STEPS
+	return np.where(delta == 0, 0, wheel)
+
+def hsv_to_rgb(frame):
+	"""
+	Returns an RGB frame of the colors of a frame of hue, saturation and value, of the same type
+
+	Keyword arguments:
+	frame -- the HSV frame to convert
+	"""
+	if render.is_array(frame):
+		np = render.np
+		hue, saturation, value = (frame[:, c].astype(np.int32) for c in range(3))
+		chroma = (value * saturation * 2 + 255) // 510
+		return chroma_to_rgb(frame, hue, value, value - chroma, chroma)
+
+	out = bytearray(len(frame))
+	for j, hue, saturation, value in zip(range(0, len(frame), 3), frame[0::3], frame[1::3], frame[2::3]):
+		chroma = SCALE[value << 8 | saturation]
+		write_chroma(out, j, hue, value, value - chroma, chroma)
+	return out
+
+def hsl_to_rgb(frame):
+	"""
+	Returns an RGB frame of the colors of a frame of hue, saturation and lightness, of the same type
+
+	Keyword arguments:
+	frame -- the HSL frame to convert
+	"""
+	if render.is_array(frame):
+		np = render.np
+		hue, saturation, lightness = (frame[:, c].astype(np.int32) for c in range(3))
+		chroma = ((255 - np.abs(lightness * 2 - 255)) * saturation * 2 + 255) // 510
+		low = (lightness * 2 - chroma + 1) >> 1
+		return chroma_to_rgb(frame, hue, low + chroma, low, chroma)
+
+	out = bytearray(len(frame))
+	for j, hue, saturation, lightness in zip(range(0, len(frame), 3), frame[0::3], frame[1::3], frame[2::3]):
+		chroma = SCALE[(255 - abs(lightness * 2 - 255)) << 8 | saturation]
+		low = (lightness * 2 - chroma + 1) >> 1
+		write_chroma(out, j, hue, low + chroma, low, chroma)
+	return out
+
+def write_chroma(out, j, hue, high, low, chroma):
+	"""
+	Writes the RGB color of a hue at a chroma into a bytearray
+
+	Keyword arguments:
+	out -- the bytearray to write the color into
+	j -- the offset of the color's first byte
+	hue -- the hue (0 to 255)
+	high -- the highest channel value of the color
+	low -- the lowest channel value of the color
+	chroma -- the highest channel value less the lowest
+	"""
+	turn = hue * 6
+	sixth = turn >> 8
+	step = RAMP[chroma << 8 | turn & 255]
+	out[j + HIGH[sixth]] = high
+	out[j + MIDDLE[sixth]] = high - step if sixth & 1 else low + step
+	out[j + LOW[sixth]] = low
+
+def chroma_to_rgb(frame, hue, high, low, chroma):
+	"""
+	Returns an RGB array frame of hues at chromas, as write_chroma writes one color
+
+	Keyword arguments:
+	frame -- the array frame converted, which the output takes the shape of
+	hue -- an int32 array of the hues (0 to 255)
+	high -- an int32 array of the highest channel values
+	low -- an int32 array of the lowest channel values
+	chroma -- an int32 array of the highest channel values less the lowest
+	"""
+	np = render.np
+	turn = hue * 6
+	sixth = turn >> 8
+	step = (chroma * (turn & 255) + 128) >> 8
+	rows = np.arange(len(frame))
+	out = np.empty_like(frame)
+	out[rows, np.take(HIGH, sixth)] = high
+	out[rows, np.take(MIDDLE, sixth)] = np.where(sixth & 1, high - step, low + step)
+	out[rows, np.take(LOW, sixth)] = low
+	return out
+
+def hue_wheel(saturation=255, value=255) -> bytes:
+	"""
+	Returns the table of HUE_STEPS packed RGB colors around the color wheel at a saturation and value
+
+	An effect which only varies the hue, such as a rainbow, colors its pixels by
+	looking their hues up in this table with render.lookup, rather than converting
+	every pixel.
+
+	Keyword arguments:
+	saturation -- the saturation (0 to 255) of every color
+	value -- the value (0 to 255) of every color
+	"""
+	frame = bytearray(bytes((0, saturation, value)) * HUE_STEPS)
+	frame[0::3] = bytes(range(HUE_STEPS))
+	return bytes(hsv_to_rgb(frame))
+
+def rotate_hue(frame, steps):
+	"""
+	Rotates the hue of every pixel in a frame around the color wheel, keeping its saturation and value
+
+	Keyword arguments:
+	frame -- the RGB frame to rotate
+	steps -- the number of hues (of HUE_STEPS, a full turn) to rotate by
+	"""
+	hsv = rgb_to_hsv(frame)
+	shift = bytes((i + steps) % HUE_STEPS for i in range(256))
+	if render.is_array(frame):
+		hsv[:, 0] = render.np.frombuffer(shift, dtype=render.np.uint8)[hsv[:, 0]]
+	else:
+		hsv[0::3] = hsv[0::3].translate(shift)
+	frame[:] = hsv_to_rgb(hsv)
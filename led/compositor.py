@@ -0,0 +1,163 @@
+"""
+compositor.py
+
+Layered composition of effects for the LED controller system.
+
+This module runs several effects on one strip at once. Each effect renders
+its frames into its own layer, over a blank frame, and each tick the
+compositor flattens the layers in order onto a base frame, blending each
+layer's pixels within its PixelRange by its blend mode and opacity (see
+render.blend). The flattened frames form a pipeline like any other effect,
+and are shown with pipeline.run.
+"""
+from . import pipeline, render
+from .render import REPLACE, BLEND_MODES
+from .controller import get_strip_count, read_frame
+
+class Layer:
+	"""
+	Represents one effect running in a layer of a composition
+
+	This object:
+		- Holds the frames of the effect, the range its pixels are restricted to, and how it blends
+		- Plays the effect at its own fps, repeating or dropping frames to match the compositor
+		- Keeps showing the last frame of an effect which has finished
+	"""
+	def __init__(self, frames, sel=None, mode=REPLACE, opacity=1.0, fps=None):
+		"""
+		Initialize the layer
+
+		Keyword arguments:
+		frames -- the frames of the effect, each a whole frame of the strip drawn over a blank frame (see Compositor.blank)
+		sel -- the PixelRange the layer's pixels are restricted to, defaults to the whole strip
+		mode -- the blend mode (see render.BLEND_MODES)
+		opacity -- the float value (0 to 1) to mix the layer in by
+		fps -- the number of frames per second the effect plays at, defaults to the compositor's fps
+		"""
+		if mode not in BLEND_MODES:
+			raise ValueError(f"Unknown blend mode '{mode}'. See options: {BLEND_MODES}")
+		if not 0 <= opacity <= 1:
+			raise ValueError(f"Opacity must be between 0 and 1, got {opacity}")
+		if fps is not None and fps <= 0:
+			raise ValueError(f"Layer fps must be greater than 0, got {fps}")
+		self.frames = frames
+		self.sel = sel
+		self.mode = mode
+		self.opacity = opacity
+		self.fps = fps
+		self.source = None	# The iterator of the effect's frames stretched to the compositor's fps
+		self.frame = None	# The frame the layer is showing
+		self.finished = False
+
+	def advance(self, fps):
+		"""
+		Moves the layer on to its frame for the next tick, and returns it
+
+		Keyword arguments:
+		fps -- the number of frames per second the compositor runs at
+		"""
+		if self.source is None:
+			self.source = iter(self.frames if self.fps is None else pipeline.time_stretch(self.frames, fps / self.fps))
+		if not self.finished:
+			frame = next(self.source, None)
+			if frame is None:
+				self.finished = True
+			else:
+				self.frame = frame
+		return self.frame
+
+	def get_bounds(self, count):
+		"""
+		Returns the (start, stop) indices of the pixels the layer blends onto
+
+		Keyword arguments:
+		count -- the number of pixels on the strip
+		"""
+		if self.sel is None:
+			return 0, count
+		return self.sel.get_start(), min(self.sel.get_end(), count)
+
+class Compositor:
+	"""
+	Represents a stack of layers flattened onto one strip
+
+	This object:
+		- Holds its layers in the order they are blended, bottom first
+		- Flattens the layers onto a base frame once per tick
+		- Runs until every layer's effect has finished, or for a duration
+	"""
+	def __init__(self, strip=None, base=None):
+		"""
+		Initialize the compositor with no layers
+
+		Keyword arguments:
+		strip -- the name of the strip to show the composition on, defaults to the default strip
+		base -- the frame beneath every layer, defaults to the contents of the strip when the composition starts
+		"""
+		self.strip = strip
+		self.base = base
+		self.layers = []
+
+	def blank(self):
+		"""
+		Returns a blank frame the size of the strip, for an effect to draw a layer's frames over
+		"""
+		return render.new_frame(count=get_strip_count(self.strip))
+
+	def add_layer(self, layer):
+		"""
+		Adds a layer above every other layer, it is blended from the next tick on
+
+		Returns the layer added
+		"""
+		self.layers.append(layer)
+		return layer
+
+	def remove_layer(self, layer):
+		"""
+		Removes a layer, it is no longer blended from the next tick on
+		"""
+		self.layers.remove(layer)
+
+	def frames(self, fps):
+		"""
+		Yields the flattened frame of the layers for each tick, until every layer has finished
+
+		Keyword arguments:
+		fps -- the number of frames per second the composition runs at
+		"""
+		base = self.base
+		if base is None:
+			base = render.new_frame(source=read_frame(strip=self.strip))
+		count = render.pixel_count(base)
+		out = render.copy_frame(base)
+
+		while self.layers:
+			render.blit(out, base)
+			playing = False
+			for layer in list(self.layers):
+				frame = layer.advance(fps)
+				playing = playing or not layer.finished
+				if frame is not None:
+					start, stop = layer.get_bounds(count)
+					render.blend(out, frame, mode=layer.mode, opacity=layer.opacity, start=start, stop=stop)
+			if not playing:
+				return
+			yield out
+
+	def run(self, fps, duration=None, clock=None, cancel=None, transition=None, easing="linear", engine=None):
+		"""
+		Shows the composition on the strip
+
+		Keyword arguments:
+		fps -- the number of frames per second to flatten and show
+		duration -- the time in seconds to run for, or None to run until every layer has finished
+		clock -- the clock to time the frames against, defaults to the monotonic wall clock
+		cancel -- a threading.Event which, once set, stops the composition
+		transition -- the time in seconds to crossfade from the strip's current contents into the composition
+		easing -- the easing curve of the transition (see transitions.EASINGS)
+		engine -- an engine.Engine to run the composition on instead, in which case the coroutine to start on it is returned
+
+		Returns the timing statistics of the frame scheduler that ran the composition
+		"""
+		return pipeline.run(self.frames(fps), fps=fps, duration=duration, clock=clock, cancel=cancel, strip=self.strip, transition=transition, easing=easing, engine=engine)
@@ -6,17 +6,49 @@ Configuration values for the LED controller system.
 This module centralizes hardware configuration and default runtime
 parameters for the LED strip.
 """
-import board
-import neopixel
-
-PIN = board.D18
-"""Defines the GPIO pin which the LED data wire is connected to on the board"""
+PIN = "D18"
+"""Defines the name of the board GPIO pin which the LED data wire is connected to on the board"""
 
 LED_COUNT = 60
 """The number of LEDs to power on the strip to power, typically set to the number of LEDs on the strip"""
 
-PIXEL_ORDER = neopixel.RGB
+PIXEL_ORDER = "RGB"
 """Defines which pixel order to use (e.g. RGB, GRB, etc.)"""
 
 DEFAULT_BRIGHTNESS = 0.5
 """Defines the default brightness of the pixels"""
+
+GAMMA = 2.2
+"""Defines the gamma curve exponent colors are corrected by before being sent to a strip, so dim colors step evenly (1 turns correction off)"""
+
+WHITE_POINT = (255, 255, 255)
+"""Defines the RGB color full white is sent to a strip as, to balance its channels (see correction.white_point_from_kelvin)"""
+
+CHANNEL_MA = (20, 20, 20)
+"""Defines the current in mA one LED draws through each of its red, green and blue channels at full value"""
+
+IDLE_MA = 1
+"""Defines the current in mA one LED draws while dark"""
+
+POWER_LIMIT_MA = None
+"""Defines the current in mA a strip's power supply can provide, frames which would draw more are dimmed to fit (None to not limit, a frame's draw is still estimated)"""
+
+POWER_HYSTERESIS = 0.05
+"""Defines the fraction of the power limit a limited strip's draw must fall below before it is brightened again, so it does not flicker"""
+
+NUMPY_MIN_PIXELS = 256
+"""Defines the number of pixels from which frames are rendered with NumPy when it is installed, shorter strips render faster in pure Python"""
+
+STRIPS = {
+	"main": {"pin": PIN, "count": LED_COUNT, "pixel_order": PIXEL_ORDER},
+}
+"""Defines every strip driven by the Pi by name, with the pin, number of LEDs and pixel order of each (add an entry per strip), and optionally the "gamma", "white_point" and "power_limit" (mA) of each to override GAMMA, WHITE_POINT and POWER_LIMIT_MA"""
+
+DEFAULT_STRIP = "main"
+"""Defines the name of the strip acted on when no strip is given"""
+
+BACKEND = "auto"
+"""Defines which output backend drives the strip ("neopixel", "simulated", or "auto" to fall back to simulated off of a Pi)"""
+
+SOCKET_PATH = "/tmp/led-controller.sock"
+"""Defines the path of the Unix domain socket the LED daemon listens for commands on"""
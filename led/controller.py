@@ -3,48 +3,149 @@ controller.py
 
 Hardware abstraction layer for the LED strip
 
-This module maintains provides control over the NeoPixel LED hardware.
+This module maintains provides control over the LED hardware through an output backend
 and orchestrates the changing of pixels
-Monitors and controls runtime state (i.e. current color, brightness, etc.) 
+Monitors and controls runtime state (i.e. current color, brightness, etc.)
+
+Every strip driven by the Pi is registered by name (see config.STRIPS), and every
+function takes the name of the strip it acts on, defaulting to config.DEFAULT_STRIP.
 """
-import board 
-import neopixel 
-from .config import PIN, LED_COUNT, DEFAULT_BRIGHTNESS
-from .colors import COLORS, is_valid_color
+from contextlib import contextmanager
+from .config import BACKEND, STRIPS, DEFAULT_STRIP
+from .colors import COLORS, is_valid_color, color_bytes
+from .backends import create_backend
+from .output import OutputThread, DROP
+
+_strips = {}	# The output backend of each strip drawn to so far, by name
+
+def get_strip_names() -> list[str]:
+	"""
+	Returns the names of every configured or registered strip
+	"""
+	return list(dict.fromkeys([*STRIPS, *_strips]))
+
+def get_strip_count(strip=None) -> int:
+	"""
+	Returns the number of pixels on a strip, without creating its backend
+
+	Keyword arguments:
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+	"""
+	name = DEFAULT_STRIP if strip is None else strip
+	if name in _strips:
+		return _strips[name].count
+	if name in STRIPS:
+		return STRIPS[name]["count"]
+	raise ValueError(f"Unknown strip '{name}'. See options: {tuple(get_strip_names())}")
+
+def get_backend(strip=None):
+	"""
+	Returns the output backend a strip's pixels are drawn to, creating the configured backend on first use
+
+	Keyword arguments:
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+	"""
+	name = DEFAULT_STRIP if strip is None else strip
+	backend = _strips.get(name)
+	if backend is None:
+		if name not in STRIPS:
+			raise ValueError(f"Unknown strip '{name}'. See options: {tuple(get_strip_names())}")
+		backend = _strips[name] = create_backend(BACKEND, **STRIPS[name])
+	return backend
+
+def set_backend(backend, strip=None):
+	"""
+	Replaces the output backend a strip's pixels are drawn to
+
+	Keyword arguments:
+	backend -- the OutputBackend instance to draw to, or None to recreate the configured backend on next use
+	strip -- the name of the strip, defaults to DEFAULT_STRIP, a new name registers another strip
+	"""
+	name = DEFAULT_STRIP if strip is None else strip
+	if backend is None:
+		_strips.pop(name, None)
+	else:
+		_strips[name] = backend
 
-pixels = neopixel.NeoPixel(PIN, LED_COUNT, brightness=DEFAULT_BRIGHTNESS)
+@contextmanager
+def using_backend(backend, strip=None):
+	"""
+	Draws a strip to a backend for the duration of a with block, then restores the previous backend
 
-def fill_color(color=COLORS["off"]):
+	Keyword arguments:
+	backend -- the OutputBackend instance to draw to inside the block
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+	"""
+	name = DEFAULT_STRIP if strip is None else strip
+	previous = _strips.get(name)
+	set_backend(backend, strip=name)
+	try:
+		yield backend
+	finally:
+		set_backend(previous, strip=name)
+
+def fill_color(color=COLORS["off"], strip=None):
 	"""
 	Fills the entire LED strip with a specified color
 
 	Keyword arguments:
 	color -- the color to fill the LED strip with
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
 	"""
-	pixels.fill(color)
+	get_backend(strip).fill(color)
 
-def fill_single(index, color=COLORS["off"]):
+def fill_single(index, color=COLORS["off"], strip=None):
 	"""
 	Fills a single LED with a specified color by index
 
 	Keyword arguments:
 	color -- the color to fill the pixel with
-	index -- the index of the pixel on the LED strip (0-LED_COUNT)
+	index -- the index of the pixel on the LED strip (0 to the strip's count)
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
 	"""
-	pixels[index] = color
+	get_backend(strip).set_pixel(index, color)
 
-def fill_range(color=COLORS["off"], length=range(0, LED_COUNT)):
+def fill_range(color=COLORS["off"], length=None, strip=None):
 	"""
 	Fills LEDs in a range to a specified color
 
 	Keyword arguments:
 	color -- the color to fill the LED span with
-	length -- the range of pixels to fill
+	length -- the range of pixels to fill, defaults to every pixel on the strip
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+	"""
+	if length is None:
+		length = range(get_strip_count(strip))
+	if isinstance(length, range) and abs(length.step) == 1:
+		if len(length) > 0:
+			write_frame(color_bytes(color) * len(length), start=min(length[0], length[-1]), strip=strip)
+	else:
+		for i in length:
+			fill_single(index=i, color=color, strip=strip)
+
+def write_frame(frame, start=0, strip=None):
+	"""
+	Writes a precomputed block of pixels to the LED strip in one bulk copy
+
+	Keyword arguments:
+	frame -- a bytes-like object (bytes, bytearray, memoryview, array('B')) of packed RGB values, three bytes per pixel
+	start -- the index of the pixel on the LED strip to write the first color to
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+	"""
+	get_backend(strip).write(frame, start=start)
+
+def read_frame(start=0, stop=None, strip=None) -> bytes:
 	"""
-	for i in length:
-		fill_single(index=i, color=color)
+	Returns the packed RGB values currently held for a block of pixels on the LED strip
 
-def set_brightness(val):
+	Keyword arguments:
+	start -- the index of the first pixel to read
+	stop -- the index after the last pixel to read, defaults to the end of the LED strip
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+	"""
+	return get_backend(strip).read(start=start, stop=stop)
+
+def set_brightness(val, strip=None):
 	"""
 	Sets the brightness of the entire LED strip
 
@@ -54,19 +155,112 @@ def set_brightness(val):
 
 	Keyowrd arguments:
 	val - the float value (0 to 1) to determine the brightness of the LEDs
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
 	"""
 	if val >= 0 and val <= 1:
-	        pixels.brightness = val
+		get_backend(strip).set_brightness(val)
+
+def set_color_correction(gamma=None, white_point=None, strip=None):
+	"""
+	Sets the gamma curve and white point the LED strip's colors are corrected by
+
+	Both are folded into one lookup table per channel along with the brightness,
+	which is only rebuilt when one of them changes.
+
+	Keyword arguments:
+	gamma -- the gamma curve exponent (greater than 0, 1 leaves colors linear), or None to leave it as it is
+	white_point -- the RGB int tuple full white is shown as (see correction.white_point_from_kelvin), or None to leave it as it is
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+	"""
+	get_backend(strip).set_correction(gamma=gamma, white_point=white_point)
 
-def show_pixels():
-        """
-        Displays all updated information to the pixels on the board
-        """
-        pixels.show()
+def set_power_limit(limit, strip=None):
+	"""
+	Sets the current the LED strip's power supply can provide, frames which would draw more are dimmed to fit
+
+	Keyword arguments:
+	limit -- the current in mA (more than the strip draws while dark, see config.IDLE_MA), or None to not limit
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+	"""
+	get_backend(strip).set_power_limit(limit)
+
+def show_pixels(strip=None):
+	"""
+	Displays all updated information to the pixels on the board
+
+	Keyword arguments:
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+
+	Returns true if the pixels were pushed, or false if nothing changed since the last show
+	"""
+	return get_backend(strip).show()
+
+def show_strips(strips=None):
+	"""
+	Displays all updated information on several strips
+
+	Strips with an output thread (see start_output_thread) are handed their frame and
+	pushed in parallel, the rest are pushed one after another from the calling thread.
+
+	Keyword arguments:
+	strips -- the names of the strips to show, defaults to every strip drawn to so far
+
+	Returns the names of the strips which were pushed
+	"""
+	names = list(_strips) if strips is None else strips
+	return [name for name in names if show_pixels(strip=name)]
+
+def start_output_thread(policy=DROP, strip=None):
+	"""
+	Starts pushing shown frames from a background thread, so effects can render the next frame while one is sent
+
+	Each strip has its own output thread, so strips with one are pushed in parallel.
 
-def power_off():
+	Keyword arguments:
+	policy -- the overrun policy (DROP or WAIT) applied when a frame is shown before the previous one was pushed
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+	"""
+	backend = get_backend(strip)
+	if backend.output is None:
+		backend.output = OutputThread(backend, policy=policy)
+		backend.output.start()
+
+def stop_output_thread(strip=None):
+	"""
+	Pushes any frame still waiting on the background thread and returns to pushing frames synchronously
+
+	Keyword arguments:
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+	"""
+	backend = get_backend(strip)
+	if backend.output is not None:
+		backend.output.close()
+		backend.output = None
+
+def get_show_stats(strip=None):
+	"""
+	Returns the counts of frames pushed to, and skipped for, the LED strip
+
+	Keyword arguments:
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+	"""
+	return get_backend(strip).stats
+
+def get_power_stats(strip=None):
+	"""
+	Returns the estimated and limited current draw of the last frame pushed to the LED strip
+
+	Keyword arguments:
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
+	"""
+	return get_backend(strip).power.stats
+
+def power_off(strip=None):
 	"""
 	Turns off the all of the lights on the LED strip
+
+	Keyword arguments:
+	strip -- the name of the strip, defaults to DEFAULT_STRIP
 	"""
-	fill_color(COLORS["off"])
-	show_pixels()
+	fill_color(COLORS["off"], strip=strip)
+	show_pixels(strip=strip)
@@ -0,0 +1,187 @@
+"""
+correction.py
+
+Color correction for the LED controller system.
+
+This module builds the lookup tables which turn the colors effects draw into
+the values sent down a strip's data wire. One 256 entry table per channel
+combines the strip's brightness, a gamma curve, so dim colors step evenly to
+the eye rather than banding, and a white point balancing the channels (see
+white_point_from_kelvin). The tables are only rebuilt when one of those
+changes, and each frame is corrected with bytes.translate, a single table
+lookup pass in C per channel, or one pass in all when the channels share a
+table.
+
+A strip's power limiter (see power.PowerLimiter) dims frames by folding a
+scale into the same tables, so limiting costs nothing per pixel.
+"""
+import math
+from .config import DEFAULT_BRIGHTNESS, GAMMA, WHITE_POINT
+
+IDENTITY = bytes(range(256))
+"""The table which leaves every value as it is"""
+
+def white_point_from_kelvin(kelvin) -> tuple[int, int, int]:
+	"""
+	Returns the RGB white point of a color temperature, for warming or cooling the whites of a strip
+
+	Uses Tanner Helland's fit of blackbody colors, which 6600 K maps to full white on.
+
+	Keyword arguments:
+	kelvin -- the color temperature (1000 to 40000 K), lower is warmer
+	"""
+	if not 1000 <= kelvin <= 40000:
+		raise ValueError(f"Color temperature must be between 1000 and 40000 K, got {kelvin}")
+	t = kelvin / 100
+	if t <= 66:
+		red = 255
+		green = 99.4708025861 * math.log(t) - 161.1195681661
+	else:
+		red = 329.698727446 * (t - 60) ** -0.1332047592
+		green = 288.1221695283 * (t - 60) ** -0.0755148492
+	if t >= 66:
+		blue = 255
+	else:
+		blue = 0 if t <= 19 else 138.5177312231 * math.log(t - 10) - 305.0447927307
+	return tuple(min(255, max(0, round(c))) for c in (red, green, blue))
+
+def build_table(brightness, gamma, scale) -> bytes:
+	"""
+	Returns the 256 entry lookup table of one channel
+
+	Keyword arguments:
+	brightness -- the float value (0 to 1) every value is scaled by
+	gamma -- the exponent values are raised to, after being scaled to 0 to 1
+	scale -- the value (0 to 255) of the channel in the white point
+	"""
+	return bytes(round(brightness * scale * (value / 255) ** gamma) for value in range(256))
+
+class ColorCorrection:
+	"""
+	Represents the brightness, gamma and white point applied to the frames sent to a strip
+
+	This object:
+		- Holds a lookup table per channel combining all three, and the scale set by a power limit
+		- Rebuilds the tables on the next frame only after one of them changes
+		- Corrects a frame of packed RGB values with one translate pass per distinct table
+	"""
+	def __init__(self, brightness=DEFAULT_BRIGHTNESS, gamma=GAMMA, white_point=WHITE_POINT):
+		"""
+		Initialize the correction, its tables are built when first used
+
+		Keyword arguments:
+		brightness -- the float value (0 to 1) to determine the brightness of the LEDs
+		gamma -- the gamma curve exponent, 1 leaves values linear
+		white_point -- the RGB int tuple full white is shown as, see white_point_from_kelvin
+		"""
+		self.brightness = None
+		self.gamma = None
+		self.white_point = None
+		self.limit = 1.0
+		self.tables = None	# The (red, green, blue) lookup tables, or None to rebuild them
+		self.limited = None	# The lookup tables scaled by the limit, or None to rebuild them
+		self.set_brightness(brightness)
+		self.set_gamma(gamma)
+		self.set_white_point(white_point)
+
+	def set_brightness(self, val):
+		"""
+		Sets the brightness every channel is scaled by
+
+		Keyword arguments:
+		val -- the float value (0 to 1) to determine the brightness of the LEDs
+		"""
+		if not 0 <= val <= 1:
+			raise ValueError(f"Brightness must be between 0 and 1, got {val}")
+		if val != self.brightness:
+			self.brightness = val
+			self.tables = None
+			self.limited = None
+
+	def set_gamma(self, gamma):
+		"""
+		Sets the gamma curve exponent
+
+		Keyword arguments:
+		gamma -- the exponent, greater than 0, values are raised to (2.2 to 2.8 suits ws2812b strips, 1 leaves values linear)
+		"""
+		if gamma <= 0:
+			raise ValueError(f"Gamma must be greater than 0, got {gamma}")
+		if gamma != self.gamma:
+			self.gamma = gamma
+			self.tables = None
+			self.limited = None
+
+	def set_white_point(self, white_point):
+		"""
+		Sets the color full white is shown as, balancing the channels
+
+		Keyword arguments:
+		white_point -- an RGB int tuple (0 to 255 per channel)
+		"""
+		white_point = tuple(white_point)
+		if len(white_point) != 3 or not all(0 <= c <= 255 for c in white_point):
+			raise ValueError(f"White point must be three values between 0 and 255, got {white_point}")
+		if white_point != self.white_point:
+			self.white_point = white_point
+			self.tables = None
+			self.limited = None
+
+	def set_limit(self, scale):
+		"""
+		Sets the scale a power limit dims every corrected value by
+
+		Keyword arguments:
+		scale -- the float value (0 to 1) to scale the corrected values by, 1 leaves them unlimited
+		"""
+		if not 0 <= scale <= 1:
+			raise ValueError(f"Power limit scale must be between 0 and 1, got {scale}")
+		if scale != self.limit:
+			self.limit = scale
+			self.limited = None
+
+	def get_tables(self) -> tuple[bytes, bytes, bytes]:
+		"""
+		Returns the (red, green, blue) lookup tables without the power limit, rebuilding them if a parameter changed
+		"""
+		if self.tables is None:
+			built = {}	# Channels with the same white point value share one table, so they are corrected in one pass
+			for scale in self.white_point:
+				if scale not in built:
+					built[scale] = build_table(self.brightness, self.gamma, scale)
+			self.tables = tuple(built[scale] for scale in self.white_point)
+		return self.tables
+
+	def get_output_tables(self) -> tuple[bytes, bytes, bytes]:
+		"""
+		Returns the (red, green, blue) lookup tables frames are sent through, scaled by the power limit
+
+		The limit rounds every value down, so a limited frame never draws more than it was scaled to.
+		"""
+		if self.limit == 1:
+			return self.get_tables()
+		if self.limited is None:
+			dim = bytes(int(value * self.limit) for value in range(256))
+			built = {}	# Tables shared between channels stay shared
+			self.limited = tuple(built.setdefault(id(table), table.translate(dim)) for table in self.get_tables())
+		return self.limited
+
+	def is_identity(self) -> bool:
+		"""
+		Returns true if the correction leaves every value as it is
+		"""
+		return all(table == IDENTITY for table in self.get_output_tables())
+
+	def apply(self, frame):
+		"""
+		Returns a corrected copy of a frame
+
+		Keyword arguments:
+		frame -- a bytearray of packed RGB values
+		"""
+		red, green, blue = self.get_output_tables()
+		out = frame.translate(red)
+		if green is not red or blue is not red:
+			out[1::3] = frame[1::3].translate(green)
+			out[2::3] = frame[2::3].translate(blue)
+		return out
@@ -6,11 +6,11 @@ Animation layer for the LED controller system.
 
 This module defines time-based and pattern-based lighting effects
 that operate on the LED strip through the controller module.
+Each effect draws to the strip its selection (PixelRange) is bound to.
 """
-import queue
-from .controller import fill_color, fill_single, fill_range, power_off, set_brightness, show_pixels
-from .colors import OFF
-from .timer import RepeatingTimer
+from . import gradient, pipeline, render, transitions
+from .controller import power_off, set_brightness, show_pixels, read_frame, write_frame
+from .colors import color_bytes, pack_color
 from .color_palette import ColorPalette
 from .pixel_range import PixelRange
 
@@ -37,56 +37,164 @@ def fill_by_period(span_col=None, space_col=None, sel=None):
 	space_col -- The color to fill in spacing with. If none is provided, spacing is skipped
 	sel -- A container with information on which pixels to display
 	"""
-	for i in sel.get_range():
-		col = sel.get_index_col(index=i, span_col=span_col, space_col=space_col)
+	frame = render.new_frame(source=read_frame(strip=sel.get_strip()))
+	render.fill_pattern(frame, sel.compile(), span_col=span_col, space_col=space_col)
+	write_frame(frame, strip=sel.get_strip())
 
-		if col is not None:
-			fill_single(index=i, color=col)
+def render_pixels(frame, span_col=None, space_col=None, sel=None):
+	"""
+	Renders the selected pixels into a frame by the span length and spacing parameters specified
+
+	Keyword arguments:
+	frame -- The frame to render into, see render.new_frame
+	span_col -- An RGB int tuple defining the primary color to change the LED strip's span length to
+	space_col -- An RGB int tuple defining the color of spacing (LEDs are OFF by default)
+	sel -- A container with information on which pixels to display
+	"""
+	if sel.has_spacing():
+		render.fill_pattern(frame, sel.compile(), span_col=span_col, space_col=space_col)
+	else:
+		render.fill(frame, span_col, start=sel.get_start(), stop=sel.get_end())
 
 def fill_pixels(span_col=None, space_col=None, sel=None):
 	"""
 	Decides which method to fill pixels with based on user input and selections
 
-	This function determines whether it is most efficient to fill by
-	range, period, or all at once depending on the selecitons that the user has made.
+	This function renders the selections that the user has made over the current
+	contents of the strip, and writes the resulting frame to the strip in one copy.
 
 	Keyword arguments:
 	span_col -- An RGB int tuple defining the primary color to change the LED strip's span length to
 	space_col -- An RGB int tuple defining the color of spacing (LEDs are OFF by default)
 	sel -- A container with information on which pixels to display
 	"""
-	if sel.has_spacing():
-		fill_by_period(span_col=span_col, space_col=space_col, sel=sel)
-	elif not sel.is_default():
-		fill_range(color=span_col, length=sel.get_range())
-	else:
-		fill_color(color=span_col)
-	show_pixels()
+	frame = render.new_frame(source=read_frame(strip=sel.get_strip()))
+	render_pixels(frame, span_col=span_col, space_col=space_col, sel=sel)
+	write_frame(frame, strip=sel.get_strip())
+	show_pixels(strip=sel.get_strip())
 
-def apply_fill(palette=None, sel=None):
+def apply_fill(palette=None, sel=None, clock=None, cancel=None, easing=transitions.LINEAR, transition=None, engine=None):
 	"""
 	Wrapper function to apply filling to pixels with paramters that still must be verified
 
 	Keyword arguments:
 	palette -- A container holding color reltated information for LED pixels
 	sel -- A container with information on which pixels to display
+	clock -- The clock to time the transition against, defaults to the monotonic wall clock
+	cancel -- A threading.Event which, once set, stops the transition
+	easing -- The easing curve of the transition (see transitions.EASINGS)
+	transition -- The time in seconds to crossfade from the strip's current contents into the fill, or None to fill at once
+	engine -- An engine.Engine to run the fill on instead, in which case the coroutine to start on it is returned,
+	          a fill without a transition is shown at the engine's next tick
+
+	Returns the timing statistics of the frame scheduler that ran the transition, if there was one
 	"""
 	palette, sel = validate_selections(palette=palette, sel=sel)
-	fill_pixels(span_col=palette.get_span_primary(), space_col=palette.get_space_primary(), sel=sel)
+	if not transition and engine is None:
+		fill_pixels(span_col=palette.get_span_primary(), space_col=palette.get_space_primary(), sel=sel)
+		return None
+
+	frame = render.new_frame(source=read_frame(strip=sel.get_strip()))
+	render_pixels(frame, span_col=palette.get_span_primary(), space_col=palette.get_space_primary(), sel=sel)
+	if not transition:
+		return engine.play([frame], strip=sel.get_strip())	# Run as a task even though it is one frame, so it preempts the effect on the strip
+	return transitions.fade_to(frame, duration=transition, easing=easing, clock=clock, cancel=cancel, strip=sel.get_strip(), engine=engine)
+
+def lit_indices(palette, sel):
+	"""
+	Returns the indices of the selection, in the order they are lit, whose primary color is not off
 
-def blink_color(palette=None, interval=None, duration=None, sel=None):
+	Keyword arguments:
+	palette -- A container holding color reltated information for LED pixels
+	sel -- A container with information on which pixels to display
+	"""
+	compiled = sel.compile()
+	lit = (pack_color(palette.get_space_primary()) != 0, pack_color(palette.get_span_primary()) != 0)	# Compared by value, as an off color may be any equal tuple or a packed 0
+	return [i for i in compiled.indices if lit[compiled.mask[i - compiled.start]]]
+
+def blink_frames(palette=None, sel=None, base=None, hold=1, fade=0, easing=transitions.LINEAR):
+	"""
+	Yields frames alternating between the secondary and primary colors of a palette, forever
+
+	Both frames, and the crossfades between them, are rendered once up front, so each
+	tick only hands back a finished frame.
+
+	Keyword arguments:
+	palette -- A container holding color reltated information for LED pixels
+	sel -- A container with information on which pixels to display
+	base -- The frame to draw over, defaults to the current contents of the LED strip
+	hold -- The number of frames each color is held for
+	fade -- The number of frames each color crossfades into the next over, after it is held
+	easing -- The easing curve of the crossfades (see transitions.EASINGS)
+	"""
+	palette, sel = validate_selections(palette=palette, sel=sel)
+	if base is None:
+		base = render.new_frame(source=read_frame(strip=sel.get_strip()))
+
+	secondary = render.copy_frame(base)
+	render_pixels(secondary, span_col=palette.get_span_secondary(), space_col=palette.get_space_secondary(), sel=sel)
+	primary = render.copy_frame(base)
+	render_pixels(primary, span_col=palette.get_span_primary(), space_col=palette.get_space_primary(), sel=sel)
+
+	if fade == 0 and hold == 1:
+		while True:
+			yield secondary
+			yield primary
+
+	to_primary = [render.copy_frame(frame) for frame in transitions.crossfade(secondary, primary, fade, easing)]
+	to_secondary = [render.copy_frame(frame) for frame in transitions.crossfade(primary, secondary, fade, easing)]
+	while True:
+		for _ in range(hold):
+			yield secondary
+		yield from to_primary
+		for _ in range(hold):
+			yield primary
+		yield from to_secondary
+
+def progressive_frames(palette=None, sel=None, base=None):
+	"""
+	Yields a frame of the secondary colors, then a frame for each pixel lit with its primary color
+
+	Keyword arguments:
+	palette -- A container holding color reltated information for LED pixels
+	sel -- A container with information on which pixels to display
+	base -- The frame to draw over, defaults to the current contents of the LED strip
+	"""
+	palette, sel = validate_selections(palette=palette, sel=sel)
+	if base is None:
+		base = render.new_frame(source=read_frame(strip=sel.get_strip()))
+
+	frame = render.copy_frame(base)
+	render_pixels(frame, span_col=palette.get_span_secondary(), space_col=palette.get_space_secondary(), sel=sel)
+	yield frame
+
+	for i in lit_indices(palette, sel):
+		col = sel.get_index_col(index=i, span_col=palette.get_span_primary(), space_col=palette.get_space_primary())
+		render.fill(frame, col, start=i, stop=i + 1)
+		yield frame
+
+def blink_color(palette=None, interval=None, duration=None, sel=None, clock=None, cancel=None, fade=None, easing=transitions.LINEAR, transition=None, engine=None):
 	"""
 	Takes a color palette and a a interval to blink a specfic color over an interval of time
 
-	This function takes the colors passed and uses a closure to encapsulate it into an
-	action that can be passed to the repeating timer's action function. The timer updates
-	and performs the blink and then this function alternates it's on state.
+	This function runs the blink's frames, which alternate between the palette's
+	secondary and primary colors, at one frame per interval for the duration.
+	With a fade, the colors crossfade into each other at the end of each interval,
+	and the frames run at transitions.DEFAULT_FPS instead.
+
+	Returns the timing statistics of the frame scheduler that ran the effect
 
 	Keyword arguments:
 	palette -- A container holding color reltated information for LED pixels
 	interval -- the time in seconds which the light switches from color1 to color2
 	duration -- A time in seconds which the blinking affect will run for
 	sel -- A container with information on which pixels to display
+	clock -- The clock to time the effect against, defaults to the monotonic wall clock
+	cancel -- A threading.Event which, once set, stops the effect before its next frame
+	fade -- The time in seconds each color crossfades into the next over, up to the interval
+	easing -- The easing curve of the crossfades (see transitions.EASINGS)
+	transition -- The time in seconds to crossfade from the strip's current contents into the effect
+	engine -- An engine.Engine to run the effect on instead, in which case the coroutine to start on it is returned
 	"""
 	palette, sel = validate_selections(palette=palette, sel=sel)
 	if interval is None:
@@ -94,20 +202,18 @@ def blink_color(palette=None, interval=None, duration=None, sel=None):
 	if duration is None:
 		duration = 10
 
-	on = True
-
-	def blink():
-		nonlocal on
-		fill_pixels(span_col=palette.get_span_primary() if not on else palette.get_span_secondary(),
-			space_col=palette.get_space_primary() if not on else palette.get_space_secondary(), sel=sel)
-		on = not on
-
-	timer = RepeatingTimer(interval, blink)
+	if fade:
+		fps = transitions.DEFAULT_FPS
+		ticks = max(1, round(interval * fps))
+		steps = min(ticks, round(fade * fps))
+		frames = blink_frames(palette=palette, sel=sel, hold=ticks - steps, fade=steps, easing=easing)
+	else:
+		fps = 1 / interval
+		frames = blink_frames(palette=palette, sel=sel)
 
-	while timer.get_runtime() <= duration:
-		timer.update()
+	return pipeline.run(frames, fps=fps, duration=duration, clock=clock, cancel=cancel, strip=sel.get_strip(), transition=transition, easing=easing, engine=engine)
 
-def progressive_fill(palette=None, interval=None, duration=None, sel=None):
+def progressive_fill(palette=None, interval=None, duration=None, sel=None, clock=None, cancel=None, easing=transitions.LINEAR, transition=None, engine=None):
 	"""
 	Takes a color palette and optional range arguments to fill the LED strip one at a time from either direction
 
@@ -115,51 +221,199 @@ def progressive_fill(palette=None, interval=None, duration=None, sel=None):
 	Over an interval or duration specified, (with duration taking precedence) fills pixels accumulatively
 	over the specified interval either provided or calculated, with the primary colors for span and spacing.
 
+	Returns the timing statistics of the frame scheduler that ran the effect
+
 	Keyword arguments:
 	palette -- A container holding color reltated information for LED pixels
 	interval -- The interval of time between each light turning on
 	duration -- The duration of the effect, will calculate the interval of time based on leds
 	sel -- A container with information on which pixels to display
+	clock -- The clock to time the effect against, defaults to the monotonic wall clock
+	cancel -- A threading.Event which, once set, stops the effect before its next frame
+	easing -- The easing curve of the transition (see transitions.EASINGS)
+	transition -- The time in seconds to crossfade from the strip's current contents into the effect
+	engine -- An engine.Engine to run the effect on instead, in which case the coroutine to start on it is returned
 	"""
 	palette, sel = validate_selections(palette=palette, sel=sel)
 
-	leds_to_light = queue.Queue()
-
-	for i in sel.get_range():
-		col = sel.get_index_col(index=i, span_col=palette.get_span_primary(), space_col=palette.get_space_primary())
-
-		if col is not OFF:
-			leds_to_light.put(i)
-
 	if duration is not None:				# Duration mode wins precedence over interval mode
-		interval = duration / leds_to_light.qsize()
+		interval = duration / max(1, len(lit_indices(palette, sel)))
 	elif interval is None:
 		interval = 1
 
-	fill_pixels(span_col=palette.get_span_secondary(), space_col=palette.get_space_secondary(), sel=sel)
+	return pipeline.run(progressive_frames(palette=palette, sel=sel), fps=1 / interval, clock=clock, cancel=cancel, strip=sel.get_strip(), transition=transition, easing=easing, engine=engine)
 
-	def prog_fill():
-		nonlocal leds_to_light
-		index = leds_to_light.get()
-		col = sel.get_index_col(index=index, span_col=palette.get_span_primary(), space_col=palette.get_space_primary())
-		if col is not None:
-			fill_single(color=col, index=index)
+BOUNCE = "bounce"
+"""Chase mode where the pattern slides to the end of the range and back"""
 
-	timer = RepeatingTimer(interval, prog_fill)
+WRAP = "wrap"
+"""Chase mode where the pattern scrolls off the end of the range and wraps around to the start"""
 
-	while not leds_to_light.empty():
-		timer.update()
+CHASE_MODES = (BOUNCE, WRAP)
 
-def chase_fill(palette=None, interval=None, duration=None, sel=None):
+def chase_pattern(palette, sel) -> bytes:
 	"""
-	
+	Returns the packed RGB pattern a chase animates over the selection
+
+	With spacing, the pattern is the selection's span and spacing layout in the primary
+	colors. Without spacing, it is a single bar of span length in the span's primary
+	color over the span's secondary color.
 
 	Keyword arguments:
 	palette -- A container holding color reltated information for LED pixels
-	interval -- The interval of time between each light turning on
-	duration -- The duration of the effect, will calculate the interval of time based on leds
 	sel -- A container with information on which pixels to display
 	"""
+	if sel.has_spacing():
+		return sel.compile().template(palette.get_span_primary(), palette.get_space_primary())
+
+	bar = color_bytes(palette.get_span_primary()) * sel.get_span()
+	background = color_bytes(palette.get_span_secondary()) * (sel.get_length() - sel.get_span())
+	return background + bar if sel.is_inverted() else bar + background
+
+def chase_offsets(mode, length, span):
+	"""
+	Returns the offset the pattern is rotated by at each step of one cycle of a chase
+
+	Keyword arguments:
+	mode -- the chase mode (BOUNCE or WRAP)
+	length -- the length of the selection
+	span -- the length of the span, which a bounce stops at the end of the selection with
+	"""
+	if mode == WRAP:
+		return list(range(length))
+	travel = length - span
+	return list(range(travel + 1)) + list(range(travel - 1, 0, -1))
+
+def chase_frames(palette=None, sel=None, mode=BOUNCE, base=None):
+	"""
+	Yields frames of a pattern chasing across the selection, forever, or the base frame once if the selection is empty
+
+	The pattern is rendered once into a ring buffer holding it twice over, so every
+	rotation of it is one contiguous slice and each step is a single block copy.
+
+	Keyword arguments:
+	palette -- A container holding color reltated information for LED pixels
+	sel -- A container with information on which pixels to display
+	mode -- the chase mode (BOUNCE or WRAP)
+	base -- The frame to draw over, defaults to the current contents of the LED strip
+	"""
+	palette, sel = validate_selections(palette=palette, sel=sel)
+	if mode not in CHASE_MODES:
+		raise ValueError(f"Unknown chase mode '{mode}'. See options: {CHASE_MODES}")
+	if base is None:
+		base = render.new_frame(source=read_frame(strip=sel.get_strip()))
+
+	start, stop, length = sel.get_start(), sel.get_end(), sel.get_length()
+	if length <= 0:
+		yield render.copy_frame(base)	# An empty or reversed selection has nothing to chase over, so the base is shown once
+		return
+
+	pattern = chase_pattern(palette, sel)
+	ring = render.new_frame(source=pattern + pattern, use_numpy=render.is_array(base))
+	offsets = chase_offsets(mode, length, sel.get_span())
+	# Slicing the ring later shifts the pattern left, slicing it earlier shifts the pattern right
+	sources = offsets if sel.is_inverted() else [length - offset for offset in offsets]
+
+	frame = render.copy_frame(base)
+	while True:
+		for source_start in sources:
+			render.blit(frame, ring, start=start, stop=stop, source_start=source_start)
+			yield frame
+
+def chase_fill(palette=None, interval=None, duration=None, sel=None, mode=BOUNCE, clock=None, cancel=None, easing=transitions.LINEAR, transition=None, engine=None):
+	"""
+	Takes a color palette and chases a pattern back and forth, or around, the selection over an interval of time
+
+	Without spacing, a bar of span length in the primary color chases over the secondary
+	color. With spacing, the span and spacing pattern in the primary colors chases instead.
+	The pattern moves one pixel each interval for the duration.
+
+	Returns the timing statistics of the frame scheduler that ran the effect
+
+	Keyword arguments:
+	palette -- A container holding color reltated information for LED pixels
+	interval -- The interval of time between each step of the chase
+	duration -- The duration of the effect
+	sel -- A container with information on which pixels to display
+	mode -- The chase mode, BOUNCE to slide back and forth or WRAP to scroll around
+	clock -- The clock to time the effect against, defaults to the monotonic wall clock
+	cancel -- A threading.Event which, once set, stops the effect before its next frame
+	easing -- The easing curve of the transition (see transitions.EASINGS)
+	transition -- The time in seconds to crossfade from the strip's current contents into the effect
+	engine -- An engine.Engine to run the effect on instead, in which case the coroutine to start on it is returned
+	"""
 	palette, sel = validate_selections(palette=palette, sel=sel)
+	if interval is None:
+		interval = 0.1
+	if duration is None:
+		duration = 10
+
+	return pipeline.run(chase_frames(palette=palette, sel=sel, mode=mode), fps=1 / interval, duration=duration, clock=clock, cancel=cancel, strip=sel.get_strip(), transition=transition, easing=easing, engine=engine)
+
+def gradient_indices(sel) -> bytes:
+	"""
+	Returns the index into a gradient of each pixel of the selection, spreading one pass of the gradient over it
+
+	Keyword arguments:
+	sel -- A container with information on which pixels to display
+	"""
+	length = sel.get_length()
+	indices = bytes(i * gradient.LUT_SIZE // length for i in range(length))
+	return indices[::-1] if sel.is_inverted() else indices
+
+def gradient_frames(palette=None, sel=None, step=1, base=None):
+	"""
+	Yields frames of a gradient spread over the selection and scrolling along it, forever
+
+	Each pixel's index into the gradient is computed once. A step rotates every
+	index with one translate pass, then colors the selection with one lookup
+	into the gradient's baked table.
+
+	Keyword arguments:
+	palette -- The gradient.GradientPalette to color the selection with, defaults to the rainbow gradient
+	sel -- A container with information on which pixels to display
+	step -- The number of indices (of 256) the gradient scrolls by each frame, 0 holds it still
+	base -- The frame to draw over, defaults to the current contents of the LED strip
+	"""
+	if palette is None:
+		palette = gradient.GRADIENTS["rainbow"]
+	_, sel = validate_selections(palette=palette, sel=sel)
+	if base is None:
+		base = render.new_frame(source=read_frame(strip=sel.get_strip()))
+
+	indices = gradient_indices(sel)
+	table = palette.get_table()
+	turns = bytes(range(gradient.LUT_SIZE)) * 2	# Each window of LUT_SIZE bytes adds its offset to an index, wrapping
+	offset = 0
+
+	frame = render.copy_frame(base)
+	while True:
+		render.lookup(frame, indices.translate(turns[offset:offset + gradient.LUT_SIZE]), table, start=sel.get_start())
+		yield frame
+		offset = (offset + step) % gradient.LUT_SIZE
+
+def gradient_fill(palette=None, interval=None, duration=None, sel=None, step=1, clock=None, cancel=None, easing=transitions.LINEAR, transition=None, engine=None):
+	"""
+	Takes a gradient palette and scrolls it along the selection over an interval of time
+
+	Returns the timing statistics of the frame scheduler that ran the effect
+
+	Keyword arguments:
+	palette -- The gradient.GradientPalette to color the selection with, defaults to the rainbow gradient
+	interval -- The interval of time between each step of the gradient
+	duration -- The duration of the effect
+	sel -- A container with information on which pixels to display
+	step -- The number of indices (of 256) the gradient scrolls by each interval
+	clock -- The clock to time the effect against, defaults to the monotonic wall clock
+	cancel -- A threading.Event which, once set, stops the effect before its next frame
+	easing -- The easing curve of the transition (see transitions.EASINGS)
+	transition -- The time in seconds to crossfade from the strip's current contents into the effect
+	engine -- An engine.Engine to run the effect on instead, in which case the coroutine to start on it is returned
+	"""
+	_, sel = validate_selections(palette=palette, sel=sel)
+	if interval is None:
+		interval = 0.05
+	if duration is None:
+		duration = 10
 
-	raise NotImplementedError("Chase fill is not implemented.")
+	return pipeline.run(gradient_frames(palette=palette, sel=sel, step=step), fps=1 / interval, duration=duration, clock=clock, cancel=cancel, strip=sel.get_strip(), transition=transition, easing=easing, engine=engine)
@@ -0,0 +1,267 @@
+"""
+engine.py
+
+Asyncio effect engine for the LED controller system.
+
+This module runs effects as tasks on one asyncio event loop, all driven by a
+single tick clock. Each tick the engine shows every strip written to since the
+last tick, then wakes the effects to render their next frame while it waits
+for the next deadline. An effect is either a pipeline of frames (a plain or
+async iterable) or a coroutine which writes its own frames and awaits
+Engine.next_tick. Starting an effect on a strip cancels the effect running on
+it, which stops at its next await, so within one frame. The effect runners
+(pipeline.run and the effects built on it, stream.stream_frames,
+recording.play and UniverseReceiver.serve) return such a coroutine when
+they are given an engine.
+
+Control inputs (network receivers, sockets, pipes, stdin) are read on the same
+loop through add_reader, so nothing runs on a thread of its own.
+"""
+import asyncio
+import inspect
+from .clock import MONOTONIC
+from .config import DEFAULT_STRIP
+from .controller import write_frame, show_strips
+from .timer import FrameScheduler, SchedulerStats
+
+DEFAULT_FPS = 60
+"""The number of ticks per second the engine runs at when none is given"""
+
+class Engine:
+	"""
+	Represents a set of effects sharing one event loop and one tick clock
+
+	This object:
+		- Runs one effect task per strip, cancelling the running effect when another is started on its strip
+		- Shows each strip written to once per tick, at deadlines kept by a FrameScheduler
+		- Reads control inputs on the same loop as the effects
+	"""
+	def __init__(self, fps=DEFAULT_FPS, clock=None):
+		"""
+		Initialize the engine, it does not tick until run
+
+		Keyword arguments:
+		fps -- the number of ticks per second
+		clock -- the clock to time the ticks against, defaults to the monotonic wall clock
+		"""
+		if fps <= 0:
+			raise ValueError(f"Engine fps must be greater than 0, got {fps}")
+		self.fps = fps
+		self.clock = clock if clock is not None else MONOTONIC
+		self.tasks = {}		# The task of the effect running on each strip, by name
+		self.deadlines = {}	# The time each effect with a duration is stopped at, by strip name
+		self.written = set()	# The names of the strips written to since the last tick
+		self.waiting = []	# The futures of the effects waiting for the next tick
+		self.readers = []	# The file descriptors read on the loop
+		self.timer = None	# The frame scheduler keeping the ticks, while the engine runs
+		self.lateness = 0.0	# The time in seconds the last tick was shown past its deadline
+		self.running = False
+
+	async def next_tick(self):
+		"""
+		Suspends the awaiting effect until the next tick
+		"""
+		tick = asyncio.get_running_loop().create_future()	# Each effect waits on its own future, so cancelling it leaves the rest waiting
+		self.waiting.append(tick)
+		await tick
+
+	def write(self, frame, start=0, strip=None):
+		"""
+		Writes a block of pixels to a strip, to be shown at the next tick
+
+		Keyword arguments:
+		frame -- a frame, or a bytes-like object of packed RGB values, see controller.write_frame
+		start -- the index of the pixel on the strip to write the first color to
+		strip -- the name of the strip, defaults to DEFAULT_STRIP
+		"""
+		write_frame(frame, start=start, strip=strip)
+		self.written.add(DEFAULT_STRIP if strip is None else strip)
+
+	async def play(self, frames, strip=None, fps=None, duration=None):
+		"""
+		Writes the frames of a pipeline to a strip, one frame per tick or at the pipeline's own fps
+
+		A pipeline slower than the engine holds each frame for several ticks, and one
+		faster than the engine drops frames, as with pipeline.time_stretch.
+
+		Keyword arguments:
+		frames -- an iterable or async iterable of frames
+		strip -- the name of the strip, defaults to DEFAULT_STRIP
+		fps -- the number of frames per second the pipeline plays at, defaults to the engine's fps
+		duration -- the time in seconds to play for, or None to play until the frames run out
+
+		Returns the timing statistics of the frames written, each late by as much as the tick it was rendered on
+		"""
+		rate = 1.0 if fps is None else fps / self.fps
+		is_async = hasattr(frames, "__aiter__")
+		source = aiter(frames) if is_async else iter(frames)
+		owed = 1.0
+		stats = SchedulerStats()
+		started = self.clock.now()
+		try:
+			while duration is None or self.clock.now() - started <= duration:
+				frame = None
+				while owed >= 1:
+					if is_async:
+						frame = await anext(source, None)
+					else:
+						frame = next(source, None)
+					if frame is None:
+						return stats
+					owed -= 1
+				if frame is not None:
+					self.write(frame, strip=strip)
+					stats.record(self.lateness)
+				await self.next_tick()
+				owed += rate
+			return stats
+		finally:
+			if is_async and hasattr(source, "aclose"):
+				await source.aclose()
+			elif hasattr(source, "close"):
+				source.close()
+
+	def start(self, effect, strip=None, fps=None, duration=None):
+		"""
+		Starts an effect on a strip, cancelling the effect running on it
+
+		This must be called on the engine's event loop, before or while the engine runs.
+
+		Keyword arguments:
+		effect -- an iterable or async iterable of frames (see play), or a coroutine which writes its own frames (see write and next_tick)
+		strip -- the name of the strip, defaults to DEFAULT_STRIP
+		fps -- the number of frames per second a pipeline plays at, defaults to the engine's fps, ignored for coroutines
+		duration -- the time in seconds to run for, or None to run until the effect finishes
+
+		Returns the asyncio.Task running the effect
+		"""
+		name = DEFAULT_STRIP if strip is None else strip
+		self.stop(name)
+		coro = effect if inspect.iscoroutine(effect) else self.play(effect, strip=name, fps=fps)
+		task = asyncio.get_running_loop().create_task(coro, name=f"led-effect-{name}")
+		self.tasks[name] = task
+		if duration is not None:
+			self.deadlines[name] = self.clock.now() + duration
+		return task
+
+	def stop(self, strip=None):
+		"""
+		Cancels the effect running on a strip, if there is one, it stops at its next await
+
+		Keyword arguments:
+		strip -- the name of the strip, defaults to DEFAULT_STRIP
+		"""
+		name = DEFAULT_STRIP if strip is None else strip
+		task = self.tasks.pop(name, None)
+		self.deadlines.pop(name, None)
+		if task is not None:
+			task.cancel()
+
+	def is_idle(self) -> bool:
+		"""
+		Returns true if no effect is running
+		"""
+		return all(task.done() for task in self.tasks.values())
+
+	def show(self):
+		"""
+		Stops the effects whose duration has passed, shows the strips written to since the last tick, and wakes the effects
+		"""
+		now = self.clock.now()
+		if self.timer is not None:
+			self.lateness = max(0.0, now - self.timer.next_update)	# The scheduler moves on to the next deadline after this returns
+		for name, deadline in list(self.deadlines.items()):
+			if now > deadline:
+				self.stop(name)
+
+		if self.written:
+			show_strips(list(self.written))
+			self.written.clear()
+
+		waiting, self.waiting = self.waiting, []
+		for tick in waiting:
+			if not tick.done():
+				tick.set_result(None)
+
+	def add_reader(self, fd, callback):
+		"""
+		Calls a function, on the engine's event loop, whenever a file descriptor has data to read
+
+		Readers are removed when the engine stops running.
+
+		Keyword arguments:
+		fd -- a file descriptor, or an object with a fileno method such as a socket or sys.stdin
+		callback -- the function taking no arguments to call, it should read without blocking
+		"""
+		asyncio.get_running_loop().add_reader(fd, callback)
+		self.readers.append(fd)
+
+	def remove_reader(self, fd):
+		"""
+		Stops reading a file descriptor added with add_reader, before the engine stops running
+
+		Keyword arguments:
+		fd -- the file descriptor, or the object with a fileno method, that was added
+		"""
+		if fd in self.readers:
+			self.readers.remove(fd)
+			asyncio.get_running_loop().remove_reader(fd)
+
+	def add_receiver(self, receiver):
+		"""
+		Receives the packets of a UniverseReceiver on the engine's event loop
+
+		The receiver shows each frame as soon as it latches, rather than at the next tick,
+		so frames keep the timing of the lighting software sending them.
+
+		Keyword arguments:
+		receiver -- the receiver.UniverseReceiver to read, it is bound if it is not already
+		"""
+		if receiver.sock is None:
+			receiver.bind()
+		receiver.sock.setblocking(False)
+
+		def receive():
+			while True:
+				try:
+					size = receiver.sock.recv_into(receiver.buffer)
+				except BlockingIOError:
+					return
+				receiver.handle(size)
+
+		self.add_reader(receiver.sock, receive)
+
+	async def run(self, duration=None, forever=False):
+		"""
+		Ticks the engine, showing the strips written to and waking the effects once per tick
+
+		Keyword arguments:
+		duration -- the time in seconds to tick for, or None to tick until stopped
+		forever -- keeps ticking while no effect is running, for effects started later by a control input, otherwise ticking ends once every effect has finished
+
+		Returns the timing statistics of the frame scheduler that kept the ticks
+		"""
+		timer = self.timer = FrameScheduler(1 / self.fps, self.show, clock=self.clock)
+		self.running = True
+		await asyncio.sleep(0)	# Let the effects already started render their first frame
+
+		try:
+			while self.running and (forever or not self.is_idle()) and (duration is None or timer.get_runtime() <= duration):
+				await self.clock.sleep_until(timer.step())
+		finally:
+			self.running = False
+			for name in list(self.tasks):
+				self.stop(name)
+			loop = asyncio.get_running_loop()
+			for fd in self.readers:
+				loop.remove_reader(fd)
+			self.readers.clear()
+			self.timer = None
+
+		return timer.get_stats()
+
+	def shutdown(self):
+		"""
+		Stops the engine at its next tick, cancelling every effect
+		"""
+		self.running = False
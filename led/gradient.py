@@ -0,0 +1,174 @@
+"""
+gradient.py
+
+Gradient palettes for the LED controller system.
+
+This module defines a palette of any number of color stops, placed along a
+0 to 1 gradient and interpolated either in RGB or in OKLab, a perceptual space
+in which the steps between colors look even to the eye. A gradient is baked
+once into a table of LUT_SIZE packed RGB colors, so an effect colors each
+pixel by its 0 to 255 index into the gradient with a single table lookup (see
+render.lookup) rather than by interpolating per pixel.
+"""
+from dataclasses import dataclass, field
+from .colors import COLORS, OFF, is_valid_color, unpack_color
+
+RGB = "rgb"
+"""Interpolates the channels of neighbouring stops directly"""
+
+OKLAB = "oklab"
+"""Interpolates neighbouring stops in the OKLab perceptual color space"""
+
+SPACES = (RGB, OKLAB)
+
+LUT_SIZE = 256
+"""The number of colors a gradient is baked into, one for each index of a pixel"""
+
+def srgb_to_linear(value) -> float:
+	"""
+	Returns the linear light intensity (0 to 1) of an sRGB channel value
+
+	Keyword arguments:
+	value -- the channel value (0 to 255)
+	"""
+	c = value / 255
+	return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+def linear_to_srgb(value) -> int:
+	"""
+	Returns the sRGB channel value (0 to 255) of a linear light intensity, clamped to the channel
+
+	Keyword arguments:
+	value -- the linear light intensity (0 to 1)
+	"""
+	c = min(1.0, max(0.0, value))
+	c = c * 12.92 if c <= 0.0031308 else 1.055 * c ** (1 / 2.4) - 0.055
+	return round(c * 255)
+
+def to_oklab(color) -> tuple[float, float, float]:
+	"""
+	Returns the (L, a, b) OKLab coordinates of an RGB color
+
+	Keyword arguments:
+	color -- an RGB int tuple
+	"""
+	r, g, b = (srgb_to_linear(c) for c in color)
+	l = (0.4122214708 * r + 0.5363325363 * g + 0.0514459929 * b) ** (1 / 3)
+	m = (0.2119034982 * r + 0.6806995451 * g + 0.1073969566 * b) ** (1 / 3)
+	s = (0.0883024619 * r + 0.2817188376 * g + 0.6299787005 * b) ** (1 / 3)
+	return (
+		0.2104542553 * l + 0.7936177850 * m - 0.0040720468 * s,
+		1.9779984951 * l - 2.4285922050 * m + 0.4505937099 * s,
+		0.0259040371 * l + 0.7827717662 * m - 0.8086757660 * s,
+	)
+
+def from_oklab(lab) -> tuple[int, int, int]:
+	"""
+	Returns the RGB int tuple of OKLab coordinates, clamped to the channels
+
+	Keyword arguments:
+	lab -- the (L, a, b) OKLab coordinates
+	"""
+	L, a, b = lab
+	l = (L + 0.3963377774 * a + 0.2158037573 * b) ** 3
+	m = (L - 0.1055613458 * a - 0.0638541728 * b) ** 3
+	s = (L - 0.0894841775 * a - 1.2914855480 * b) ** 3
+	return (
+		linear_to_srgb(4.0767416621 * l - 3.3077115913 * m + 0.2309699292 * s),
+		linear_to_srgb(-1.2684380046 * l + 2.6097574011 * m - 0.3413193965 * s),
+		linear_to_srgb(-0.0041960863 * l - 0.7034186147 * m + 1.7076147010 * s),
+	)
+
+def even_stops(colors) -> tuple[tuple[float, tuple[int, int, int]], ...]:
+	"""
+	Returns gradient stops spreading colors evenly from 0 to 1
+
+	Keyword arguments:
+	colors -- the RGB int tuples or packed ints, in order along the gradient
+	"""
+	last = max(1, len(colors) - 1)
+	return tuple((i / last, color) for i, color in enumerate(colors))
+
+@dataclass(slots=True)
+class GradientPalette:
+	"""
+	Represents a validated gradient of color stops, baked into a color lookup table
+
+	This object:
+		- Stores (position, color) stops, positions running from 0 to 1 in order
+		- Interpolates between neighbouring stops in RGB or OKLab, holding the end colors beyond the first and last stop
+		- Bakes the gradient once into LUT_SIZE packed RGB colors, which effects look each pixel's index up in
+	"""
+	stops: tuple[tuple[float, tuple[int, int, int]], ...] = ((0.0, OFF), (1.0, OFF))
+	space: str = RGB
+	table: bytes = field(init=False, repr=False, compare=False)	# The baked colors, 3 bytes per index
+
+	def __post_init__(self):
+		"""
+		Performs validation on the stops and space entered, then bakes the table
+		"""
+		if self.space not in SPACES:
+			raise ValueError(f"Unknown gradient space '{self.space}'. See options: {SPACES}")
+		if len(self.stops) == 0:
+			raise ValueError("A gradient needs at least one stop")
+
+		stops = []
+		for position, color in self.stops:
+			color = unpack_color(color) if isinstance(color, int) else color
+			if not is_valid_color(color):
+				raise ValueError(f"Invalid color for gradient stop at {position}: {color}")
+			if not 0 <= position <= 1 or (stops and position < stops[-1][0]):
+				raise ValueError(f"Gradient stop positions must run in order from 0 to 1, got {position}")
+			stops.append((float(position), color))
+		self.stops = tuple(stops)
+		self.table = self.bake()
+
+	def bake(self) -> bytes:
+		"""
+		Returns the gradient sampled at LUT_SIZE evenly spaced positions, as packed RGB colors
+		"""
+		positions = [position for position, _ in self.stops]
+		if self.space == OKLAB:
+			points = [to_oklab(color) for _, color in self.stops]
+		else:
+			points = [color for _, color in self.stops]
+
+		table = bytearray()
+		segment = 0
+		for index in range(LUT_SIZE):
+			t = index / (LUT_SIZE - 1)
+			while segment < len(positions) - 1 and positions[segment + 1] < t:
+				segment += 1
+			if t <= positions[0]:
+				point = points[0]
+			elif segment == len(positions) - 1:
+				point = points[-1]
+			else:
+				width = positions[segment + 1] - positions[segment]
+				mix = (t - positions[segment]) / width if width > 0 else 1.0
+				point = tuple(a + (b - a) * mix for a, b in zip(points[segment], points[segment + 1]))
+			table += bytes(from_oklab(point) if self.space == OKLAB else (round(c) for c in point))
+		return bytes(table)
+
+	def get_table(self) -> bytes:
+		"""
+		Returns the baked table of LUT_SIZE packed RGB colors
+		"""
+		return self.table
+
+	def get_color(self, index) -> tuple[int, int, int]:
+		"""
+		Returns the color of an index into the gradient
+
+		Keyword arguments:
+		index -- the index (0 to 255) along the gradient, 0 being its start and 255 its end
+		"""
+		offset = (index & (LUT_SIZE - 1)) * 3
+		return tuple(self.table[offset:offset + 3])
+
+GRADIENTS = {
+	"rainbow": GradientPalette(even_stops((COLORS["red"], COLORS["yellow"], COLORS["green"], COLORS["cyan"], COLORS["blue"], COLORS["magenta"], COLORS["red"]))),
+	"fire": GradientPalette(((0.0, OFF), (0.4, COLORS["red"]), (0.8, (255, 160, 0)), (1.0, (255, 255, 180)))),
+	"heatmap": GradientPalette(even_stops((COLORS["blue"], COLORS["cyan"], COLORS["green"], COLORS["yellow"], COLORS["red"])), space=OKLAB),
+}
+"""The built in gradients, by name"""
@@ -0,0 +1,40 @@
+"""
+offline.py
+
+Offline rendering for the LED controller system.
+
+This module runs timed effects against a virtual clock and collects the
+frames they push, so an entire effect timeline can be rendered as fast as
+the CPU allows for tests, previews, and pre-rendering.
+"""
+from .backends import FrameSinkBackend
+from .clock import VirtualClock
+from .controller import get_strip_count, using_backend
+
+def render_offline(effect, count=None, clock=None, sink=None, **kwargs):
+	"""
+	Runs a timed effect on a virtual clock and returns the frames it pushed
+
+	The simulated strip stands in for the strip the effect's selection is bound to.
+
+	Keyword arguments:
+	effect -- the effect function to run (e.g. effects.blink_color), it must accept a clock argument
+	count -- the number of pixels on the simulated strip, defaults to the length of the strip stood in for
+	clock -- the VirtualClock to run the effect against, defaults to a new clock starting at 0
+	sink -- a callable taking (timestamp, frame) for each pushed frame, defaults to collecting frames
+	kwargs -- the remaining arguments passed to the effect (e.g. palette, interval, duration, sel)
+
+	Returns:
+	a list of (timestamp, frame) pairs, empty when a sink is provided
+	"""
+	strip = kwargs["sel"].get_strip() if kwargs.get("sel") is not None else None
+	if count is None:
+		count = get_strip_count(strip)
+	if clock is None:
+		clock = VirtualClock()
+	backend = FrameSinkBackend(count=count, sink=sink, clock=clock)
+
+	with using_backend(backend, strip=strip):
+		effect(clock=clock, **kwargs)
+
+	return backend.frames
@@ -0,0 +1,118 @@
+"""
+output.py
+
+Background output stage for the LED controller system.
+
+This module defines a thread which pushes frames to the strip while the
+next frame is being rendered, so the time spent sending data down the wire
+no longer comes out of the frame budget of an effect.
+"""
+import threading
+
+DROP = "drop"
+"""Overrun policy where a frame still waiting to be pushed is replaced by the newer frame"""
+
+WAIT = "wait"
+"""Overrun policy where showing a frame blocks until the waiting frame has been taken by the output thread"""
+
+POLICIES = (DROP, WAIT)
+
+class OutputThread:
+	"""
+	Represents a background thread which pushes shown frames out to a backend
+
+	This object:
+		- Holds a front buffer being pushed by the thread and a back buffer holding the next frame
+		- Copies shown frames into the back buffer and swaps it to the front when the thread is free
+		- Applies an overrun policy when a frame is shown before the previous one was pushed
+		- Leaves the strip holding its last frame when no new frame is ready, as ws2812b pixels latch their color
+	"""
+	def __init__(self, backend, policy=DROP):
+		"""
+		Initialize the output thread, it is not running until started
+
+		Keyword arguments:
+		backend -- the OutputBackend to push frames through
+		policy -- the overrun policy (DROP or WAIT) applied when the thread is behind
+		"""
+		if policy not in POLICIES:
+			raise ValueError(f"Unknown output policy '{policy}'. See options: {POLICIES}")
+		self.backend = backend
+		self.policy = policy
+		self.cond = threading.Condition()
+		self.spare = [bytearray(backend.count * 3), bytearray(backend.count * 3)]
+		self.pending = None		# The back buffer holding the next frame to push, or None
+		self.pending_stop = 0
+		self.busy = False
+		self.closed = False
+		self.thread = threading.Thread(target=self.run, name="led-output", daemon=True)
+
+	def start(self):
+		"""
+		Starts the thread pushing frames
+		"""
+		self.thread.start()
+
+	def submit(self, frame, stop):
+		"""
+		Hands a frame to the thread to be pushed, applying the overrun policy if one is already waiting
+
+		Keyword arguments:
+		frame -- a bytes-like object of packed RGB values for the whole strip
+		stop -- the index after the last pixel that must be sent
+		"""
+		with self.cond:
+			if self.pending is not None:
+				if self.policy == WAIT:
+					self.cond.wait_for(lambda: self.pending is None or self.closed)
+				else:
+					self.backend.stats.dropped += 1
+					stop = max(stop, self.pending_stop)	# The dropped frame's changes still need to be sent
+			if self.closed:
+				raise RuntimeError("Cannot show a frame on a closed output thread")
+
+			buf = self.pending if self.pending is not None else self.spare.pop()
+			buf[:] = frame
+			self.pending = buf
+			self.pending_stop = stop
+			self.cond.notify_all()
+
+	def run(self):
+		"""
+		Pushes each frame handed to the thread until it is closed
+		"""
+		while True:
+			with self.cond:
+				self.cond.wait_for(lambda: self.pending is not None or self.closed)
+				if self.pending is None:
+					return
+				front, stop = self.pending, self.pending_stop
+				self.pending = None
+				self.busy = True
+				self.cond.notify_all()
+
+			try:
+				self.backend.send(front, stop)
+			finally:
+				with self.cond:
+					self.spare.append(front)
+					self.busy = False
+					self.cond.notify_all()
+
+	def flush(self):
+		"""
+		Blocks until every frame handed to the thread has been pushed
+		"""
+		with self.cond:
+			self.cond.wait_for(lambda: (self.pending is None and not self.busy) or not self.thread.is_alive())
+
+	def close(self):
+		"""
+		Pushes any waiting frame and stops the thread
+		"""
+		self.flush()
+		with self.cond:
+			self.closed = True
+			self.cond.notify_all()
+		if self.thread.is_alive():
+			self.thread.join()
@@ -0,0 +1,180 @@
+"""
+pipeline.py
+
+Composable frame pipelines for the LED controller system.
+
+An effect is a generator which lazily yields one frame (see render.new_frame)
+for each tick. This module defines the stages which wrap an effect's frames
+to transform them (brightness, reverse, mirror, range mask, time-stretch,
+concatenate, loop), and a single runner which drives any pipeline on the
+strip at a target fps, either on the calling thread or as a task of an
+engine.Engine.
+
+A frame yielded by a generator is only valid until the next frame is
+requested, so a stage that changes a frame works on a copy of it.
+"""
+import itertools
+from . import render
+from .controller import write_frame, show_pixels
+from .timer import FrameScheduler, SchedulerStats
+
+def scale_brightness(frames, val):
+	"""
+	Scales the brightness of every frame
+
+	Keyword arguments:
+	frames -- the frames to scale
+	val -- the float value (0 to 1) to scale channel values by
+	"""
+	for frame in frames:
+		out = render.copy_frame(frame)
+		render.scale(out, val)
+		yield out
+
+def reverse(frames, start=0, stop=None):
+	"""
+	Reverses the order of a block of pixels in every frame
+
+	Keyword arguments:
+	frames -- the frames to reverse
+	start -- the index of the first pixel to reverse
+	stop -- the index after the last pixel to reverse, defaults to the end of the frame
+	"""
+	for frame in frames:
+		out = render.copy_frame(frame)
+		render.reverse(out, start=start, stop=stop)
+		yield out
+
+def mirror(frames):
+	"""
+	Reflects the first half of every frame onto its second half
+	"""
+	for frame in frames:
+		out = render.copy_frame(frame)
+		render.mirror(out)
+		yield out
+
+def mask(frames, sel, base):
+	"""
+	Restricts every frame to the pixels of a PixelRange, taking every other pixel from a base frame
+
+	Keyword arguments:
+	frames -- the frames to mask
+	sel -- A container with information on which pixels to keep
+	base -- the frame to take pixels outside of the range from
+	"""
+	for frame in frames:
+		out = render.copy_frame(base)
+		render.blit(out, frame, start=sel.get_start(), stop=sel.get_end())
+		yield out
+
+def time_stretch(frames, factor):
+	"""
+	Stretches the frames over time, repeating frames to slow them down or dropping frames to speed them up
+
+	Keyword arguments:
+	frames -- the frames to stretch
+	factor -- the float number of ticks each frame lasts for (2 plays at half speed, 0.5 at double speed)
+	"""
+	if factor <= 0:
+		raise ValueError(f"Time stretch factor must be greater than 0, got {factor}")
+	owed = 0.0
+	for frame in frames:
+		owed += factor
+		while owed >= 1:
+			owed -= 1
+			yield frame
+
+def concat(*pipelines):
+	"""
+	Plays each pipeline's frames one after another
+	"""
+	return itertools.chain(*pipelines)
+
+def loop(frames, times=None):
+	"""
+	Repeats the frames, keeping a copy of each so the source only renders them once
+
+	Keyword arguments:
+	frames -- the finite frames to repeat
+	times -- the number of times to play the frames, or None to repeat them forever
+	"""
+	played = []
+	for frame in frames:
+		played.append(render.copy_frame(frame))
+		yield frame
+
+	repeats = itertools.count(1) if times is None else range(1, times)
+	for i in repeats:
+		if not played:
+			return
+		yield from played
+
+def run(frames, fps, duration=None, clock=None, cancel=None, strip=None, transition=None, easing="linear", engine=None):
+	"""
+	Drives a pipeline on the LED strip, writing and showing one frame per tick
+
+	Keyword arguments:
+	frames -- the pipeline of frames to show
+	fps -- the number of frames to show per second
+	duration -- the time in seconds to run for, or None to run until the frames run out
+	clock -- the clock to time the frames against, defaults to the monotonic wall clock
+	cancel -- a threading.Event which, once set, stops the pipeline without waiting out the current frame
+	strip -- the name of the strip to show the frames on, defaults to the default strip
+	transition -- the time in seconds to crossfade from the strip's current contents to the first frame, before the duration starts
+	easing -- the easing curve of the crossfade (see transitions.EASINGS)
+	engine -- an engine.Engine to play the pipeline on instead, in which case the coroutine to start on it is returned (see run_on)
+
+	Returns the timing statistics of the frame scheduler that ran the pipeline
+	"""
+	if engine is not None:
+		return run_on(engine, frames, fps, duration=duration, strip=strip, transition=transition, easing=easing)
+
+	frames = iter(frames)
+	pending = next(frames, None)
+
+	if transition and pending is not None:
+		from .transitions import fade_to	# Imported here, as transitions runs its fades through this module
+		fade_to(pending, duration=transition, easing=easing, clock=clock, cancel=cancel, strip=strip)
+
+	def show_next():
+		nonlocal pending
+		write_frame(pending, strip=strip)
+		show_pixels(strip=strip)
+		pending = next(frames, None)	# Render the next frame before waiting for its deadline
+
+	timer = FrameScheduler(1 / fps, show_next, clock=clock, cancel=cancel)
+
+	while pending is not None and not timer.is_cancelled() and (duration is None or timer.get_runtime() <= duration):
+		timer.update()
+
+	return timer.get_stats()
+
+async def run_on(engine, frames, fps, duration=None, strip=None, transition=None, easing="linear"):
+	"""
+	Drives a pipeline on the LED strip as a task of an engine, writing one frame per tick of the pipeline's fps
+
+	The frames are shown at the engine's ticks (see engine.Engine.play), and the
+	task is stopped by cancelling it rather than by a cancel event.
+
+	Keyword arguments:
+	engine -- the engine.Engine whose ticks show the frames
+	frames -- the pipeline of frames to show
+	fps -- the number of frames to show per second
+	duration -- the time in seconds to run for, or None to run until the frames run out
+	strip -- the name of the strip to show the frames on, defaults to the default strip
+	transition -- the time in seconds to crossfade from the strip's current contents to the first frame, before the duration starts
+	easing -- the easing curve of the crossfade (see transitions.EASINGS)
+
+	Returns the timing statistics of the frames written
+	"""
+	frames = iter(frames)
+	pending = next(frames, None)
+	if pending is None:
+		return SchedulerStats()
+
+	if transition:
+		from .transitions import fade_to	# Imported here, as transitions runs its fades through this module
+		await fade_to(pending, duration=transition, easing=easing, strip=strip, engine=engine)
+
+	return await engine.play(itertools.chain([pending], frames), strip=strip, fps=fps, duration=duration)
@@ -5,9 +5,83 @@ This module defines the PixelRange data abstraction
 
 PixelRange is a dataclass which holds the information on which 
 arrangement of pixels to display on the LED strip, and how to arrange them
+A PixelRange is bound to one strip, and is clamped to that strip's length
 """
-from dataclasses import dataclass
-from .config import LED_COUNT
+from dataclasses import dataclass, field
+from .colors import color_bytes
+from .controller import get_strip_count
+
+@dataclass(slots=True, frozen=True)
+class CompiledRange:
+	"""
+	Represents the precomputed layout of a PixelRange
+
+	This object:
+		- Stores the ordered indices of the range, the span/spacing mask, and the runs of span and spacing pixels
+		- Builds two-color frame templates for the range and caches them by color
+		- Is rebuilt by PixelRange whenever one of its setters runs
+	"""
+	start: int				# The strip index of the first pixel in the range
+	indices: tuple[int, ...]		# The indices of the range in the order they are lit
+	mask: bytes				# One byte per pixel from start, 1 if the pixel is in the span and 0 if in spacing
+	span_runs: tuple[tuple[int, int], ...]	# The (start, stop) strip indices of each stretch of span pixels
+	space_runs: tuple[tuple[int, int], ...]	# The (start, stop) strip indices of each stretch of spacing pixels
+	templates: dict = field(default_factory=dict, compare=False, repr=False)
+
+	def get_length(self) -> int:
+		"""
+		Returns the integer length of the range
+		"""
+		return len(self.mask)
+
+	def template(self, span_col, space_col) -> bytes:
+		"""
+		Returns the packed RGB frame for the range filled with a span and a spacing color
+
+		Keyword arguments:
+		span_col -- An RGB value representing the coloring for the span
+		space_col -- An RGB value representing the coloring for the spacing
+		"""
+		key = (span_col, space_col)
+		frame = self.templates.get(key)
+		if frame is None:
+			buf = bytearray(color_bytes(space_col) * self.get_length())
+			self.stamp(buf, self.span_runs, span_col)
+			frame = bytes(buf)
+			if len(self.templates) >= MAX_TEMPLATES:
+				self.templates.clear()
+			self.templates[key] = frame
+		return frame
+
+	def fill(self, frame, span_col, space_col=None):
+		"""
+		Fills a bytearray holding the range's packed RGB values with span and spacing colors
+
+		Keyword arguments:
+		frame -- A bytearray of packed RGB values for the pixels of the range
+		span_col -- An RGB value representing the coloring for the span
+		space_col -- An RGB value representing the coloring for the spacing. If none is provided, spacing is left as is
+		"""
+		if space_col is not None:
+			frame[:] = self.template(span_col, space_col)
+		else:
+			self.stamp(frame, self.span_runs, span_col)
+
+	def stamp(self, frame, runs, color):
+		"""
+		Writes a color over runs of pixels in a bytearray holding the range's packed RGB values
+
+		Keyword arguments:
+		frame -- A bytearray of packed RGB values for the pixels of the range
+		runs -- The (start, stop) strip indices of each run to color
+		color -- An RGB value to write over each run
+		"""
+		col = color_bytes(color)
+		for run_start, run_stop in runs:
+			frame[(run_start - self.start) * 3:(run_stop - self.start) * 3] = col * (run_stop - run_start)
+
+MAX_TEMPLATES = 8
+"""The number of two-color templates a CompiledRange caches before it is cleared"""
 
 @dataclass(slots=True)
 class PixelRange:
@@ -20,13 +94,17 @@ class PixelRange:
 		- Can provide information on the arrangement of pixels (e.g. range, color of a specific pixel, if an index is in the span)
 	"""
 	start: int = 0			# The start boundary of the range to be filled
-	end: int = LED_COUNT		# The end boundary of the range to be filled
+	end: int = None			# The end boundary of the range to be filled, defaults to the length of the strip
 	span: int = 1			# The length of each stretch of LEDs separated by spaces
 	spacing: int = 0		# The space between each span of LEDs
 	invert: bool = False		# A boolean defining whether to start lighting from the start or end of the strip
+	strip: str | None = None	# The name of the strip the range selects pixels on, or None for the default strip
+	_compiled: CompiledRange | None = field(default=None, init=False, repr=False, compare=False)
 
 	def __post_init__(self):
 
+		self.set_strip(self.strip)
+
 		self.set_start(self.start)
 		self.set_end(self.end)
 
@@ -43,12 +121,46 @@ class PixelRange:
 			return range(self.start, self.end, 1)
 		return range(self.end - 1, self.start - 1, -1)
 
+	def compile(self) -> CompiledRange:
+		"""
+		Returns the precomputed layout of the range, building it if a setter has run since it was last built
+		"""
+		if self._compiled is None:
+			length = self.get_length()
+			period = self.get_period()
+			pattern = b"\x01" * self.span + b"\x00" * self.spacing
+			mask = (pattern * (length // period + 1))[:length]
+			if self.invert:
+				mask = mask[::-1]
+
+			span_runs = []
+			space_runs = []
+			run_start = 0
+			for i in range(1, length + 1):
+				if i == length or mask[i] != mask[run_start]:
+					runs = span_runs if mask[run_start] else space_runs
+					runs.append((self.start + run_start, self.start + i))
+					run_start = i
+
+			self._compiled = CompiledRange(
+				start=self.start,
+				indices=tuple(self.get_range()),
+				mask=mask,
+				span_runs=tuple(span_runs),
+				space_runs=tuple(space_runs)
+			)
+		return self._compiled
+
 	def is_in_span(self, index) -> bool:
 		"""
 		Returns true if the index provided is within the span length, or false if in spacing area
 
 		index -- The index of the LED to be checked
 		"""
+		offset = index - self.start
+		if 0 <= offset < self.get_length():
+			return self.compile().mask[offset] == 1
+
 		offset_index = index - self.start if not self.invert else (self.end - 1) - index
 
 		return (offset_index % self.get_period()) < self.span
@@ -76,10 +188,11 @@ class PixelRange:
 		"""
 		Sets or clamps the start value of the range to the value provided after validation
 		"""
+		self._compiled = None
 		if value is None:
 			self.start = 0
 		elif self.ensure_int(value, "start"):
-			self.start = max(0, min(value, LED_COUNT))
+			self.start = max(0, min(value, get_strip_count(self.strip)))
 
 	def get_end(self) -> int:
 		"""
@@ -91,10 +204,28 @@ class PixelRange:
 		"""
 		Sets or clamps the end value of the range to the value provided after validation
 		"""
+		self._compiled = None
 		if value is None:
-			self.end = LED_COUNT
+			self.end = get_strip_count(self.strip)
 		elif self.ensure_int(value, "end"):
-			self.end = max(1, min(value, LED_COUNT))
+			self.end = max(1, min(value, get_strip_count(self.strip)))
+
+	def get_strip(self) -> str | None:
+		"""
+		Returns the name of the strip the range selects pixels on, or None for the default strip
+		"""
+		return self.strip
+
+	def set_strip(self, value: str | None) -> None:
+		"""
+		Sets the strip the range selects pixels on, as long as it is a known strip
+
+		The start and end are not clamped again, call set_start and set_end after changing strips.
+		"""
+		if value is not None:
+			get_strip_count(value)	# Raises a ValueError for an unknown strip
+		self._compiled = None
+		self.strip = value
 
 	def get_span(self) -> int:
 		"""
@@ -106,6 +237,7 @@ class PixelRange:
 		"""
 		Sets or clamps the span value of the range to the value provided after validation
 		"""
+		self._compiled = None
 		if value is None:
 			self.span = 1
 		elif self.ensure_int(value, "span"):
@@ -124,6 +256,7 @@ class PixelRange:
 
 		if not isinstance(value, bool):
 			raise TypeError(f"Value {value} provided for set_invert is not of type boolean")
+		self._compiled = None
 		self.invert = value
 
 	def get_spacing(self) -> int:
@@ -136,6 +269,7 @@ class PixelRange:
 		"""
 		Sets or clamps the spacing value of the range to the value provided after validation
 		"""
+		self._compiled = None
 		if value is None:
 			self.spacing = 0
 		elif self.ensure_int(value, "spacing"):
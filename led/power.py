@@ -0,0 +1,116 @@
+"""
+power.py
+
+Power budgeting for the LED controller system.
+
+A ws2812b LED draws a small idle current, plus a current through each color
+channel in proportion to the value sent to it. This module estimates the
+current a frame draws from the values it is sent as, after color correction,
+and works out the scale a frame must be dimmed by to stay within the limit of
+the strip's power supply. The scale is folded into the strip's color
+correction tables, so every pixel is dimmed uniformly at no cost per pixel.
+
+Dimming is immediate when a frame would draw too much, but a limited strip is
+only brightened again once its draw falls below the limit by the hysteresis,
+so a frame drawing close to the limit does not flicker between two scales.
+"""
+from dataclasses import dataclass
+from .config import CHANNEL_MA, IDLE_MA, POWER_LIMIT_MA, POWER_HYSTERESIS
+
+@dataclass(slots=True)
+class PowerStats:
+	"""
+	Represents the estimated current draw of the frames sent to a strip
+	"""
+	estimated_ma: float = 0.0	# The current the last frame would draw unlimited
+	limited_ma: float = 0.0		# The current the last frame draws as it was sent, after limiting
+	peak_ma: float = 0.0		# The highest current any frame would have drawn unlimited
+	scale: float = 1.0		# The scale the last frame was dimmed by to keep within the limit
+	limited: int = 0		# The number of frames dimmed to keep within the limit
+
+class PowerLimiter:
+	"""
+	Represents the power budget of a strip
+
+	This object:
+		- Estimates the current each frame draws, from the values it is sent as, in one summing pass per distinct channel
+		- Returns the scale each frame is sent at, dimming frames which would draw more than the limit
+		- Only brightens a limited strip again once its draw leaves the hysteresis band below the limit
+		- Keeps the estimated and limited draw of the last frame as PowerStats
+	"""
+	def __init__(self, count, limit=POWER_LIMIT_MA, channel_ma=CHANNEL_MA, idle_ma=IDLE_MA, hysteresis=POWER_HYSTERESIS):
+		"""
+		Initialize the limiter at full scale
+
+		Keyword arguments:
+		count -- the number of pixels on the strip
+		limit -- the current in mA the strip's supply can provide, or None to only estimate
+		channel_ma -- the current in mA one LED draws through each of its (red, green, blue) channels at full value
+		idle_ma -- the current in mA one LED draws while dark
+		hysteresis -- the fraction (0 to 1) of the limit the draw must fall below it before the strip is brightened
+		"""
+		self.count = count
+		self.channel_ma = tuple(channel_ma)
+		self.idle_ma = idle_ma
+		self.hysteresis = hysteresis
+		self.limit = None
+		self.scale = 1.0
+		self.stats = PowerStats()
+		self.set_limit(limit)
+
+	def set_limit(self, limit):
+		"""
+		Sets the current the strip's supply can provide
+
+		Keyword arguments:
+		limit -- the current in mA, more than the strip draws while dark, or None to only estimate
+		"""
+		if limit is not None and limit <= self.idle_ma * self.count:
+			raise ValueError(f"Power limit must be more than the {self.idle_ma * self.count} mA the strip draws while dark, got {limit}")
+		self.limit = limit
+		if limit is None:
+			self.scale = 1.0
+
+	def estimate(self, frame, tables) -> float:
+		"""
+		Returns the current in mA a frame draws once sent through a set of lookup tables
+
+		Keyword arguments:
+		frame -- a bytearray of packed RGB values for the whole strip
+		tables -- the (red, green, blue) lookup tables the frame is corrected by, see correction.ColorCorrection
+		"""
+		red, green, blue = tables
+		ma = self.channel_ma
+		if red is green is blue and ma[0] == ma[1] == ma[2]:
+			draw = ma[0] * sum(frame.translate(red))
+		else:
+			draw = sum(channel_ma * sum(frame[c::3].translate(table)) for c, (channel_ma, table) in enumerate(zip(ma, tables)))
+		return self.idle_ma * self.count + draw / 255
+
+	def update(self, frame, tables) -> float:
+		"""
+		Estimates the draw of a frame and returns the scale (0 to 1) to send it at to keep within the limit
+
+		Keyword arguments:
+		frame -- a bytearray of packed RGB values for the whole strip
+		tables -- the (red, green, blue) lookup tables the frame is corrected by before limiting
+		"""
+		estimated = self.estimate(frame, tables)
+		idle = self.idle_ma * self.count
+		draw = estimated - idle
+
+		if self.limit is not None:
+			budget = self.limit - idle
+			if draw * self.scale > budget:
+				self.scale = budget / draw
+			elif self.scale < 1 and draw * self.scale < budget * (1 - self.hysteresis):
+				# Brighten into the middle of the band, so the next frame like this one stays put
+				self.scale = min(1.0, budget * (1 - self.hysteresis / 2) / draw) if draw > 0 else 1.0
+
+		self.stats.estimated_ma = estimated
+		self.stats.limited_ma = idle + draw * self.scale
+		self.stats.peak_ma = max(self.stats.peak_ma, estimated)
+		self.stats.scale = self.scale
+		if self.scale < 1:
+			self.stats.limited += 1
+		return self.scale
@@ -0,0 +1,455 @@
+"""
+receiver.py
+
+Network frame receivers for the LED controller system.
+
+This module receives pixel data over UDP from lighting software with the
+sACN (E1.31), Art-Net and DDP protocols, so the strip can run as pixels in
+a larger rig. Each packet is received into one reusable buffer and its
+channel data is copied straight into the strip's frame, which is only shown
+once the frame is complete:
+	- E1.31 and Art-Net map consecutive universes of 170 pixels onto the strip,
+	  and show the frame once every universe covering the strip has arrived,
+	  or on the sync packet when the sender synchronizes its universes
+	- DDP writes data at a byte offset into the strip, and shows the frame on
+	  a packet with the push flag set
+
+Packets older than the last one seen from a universe, by their sequence
+number, are dropped. This module also defines packet builders, which are
+used to send test frames to a receiver from localhost.
+"""
+import socket
+import struct
+from dataclasses import dataclass
+from .clock import MONOTONIC
+from .controller import get_backend, write_frame, show_pixels
+
+E131 = "e131"
+"""Streaming ACN (ANSI E1.31), DMX512 universes over UDP"""
+
+ARTNET = "artnet"
+"""Art-Net, DMX512 universes over UDP"""
+
+DDP = "ddp"
+"""Distributed Display Protocol, raw pixel data at a byte offset over UDP"""
+
+PROTOCOLS = (E131, ARTNET, DDP)
+
+PORTS = {E131: 5568, ARTNET: 6454, DDP: 4048}
+"""The UDP port each protocol is received on"""
+
+FIRST_UNIVERSES = {E131: 1, ARTNET: 0}
+"""The universe mapped to the first pixel of the strip by default, as E1.31 universes start at 1"""
+
+PIXELS_PER_UNIVERSE = 170
+"""The number of RGB pixels mapped to each DMX512 universe (510 of its 512 channels)"""
+
+MAX_PACKET = 1500
+"""The size in bytes of the buffer each packet is received into"""
+
+POLL_INTERVAL = 0.1
+"""The time in seconds between checks for cancellation while waiting on a packet"""
+
+ARTNET_SYNC_TIMEOUT = 4
+"""The time in seconds after the last ArtSync that Art-Net frames are shown without waiting for a sync"""
+
+DATA = "data"
+SYNC = "sync"
+
+E131_ID = b"ASC-E1.17\x00\x00\x00"
+E131_ROOT_DATA = 0x00000004
+E131_ROOT_EXTENDED = 0x00000008
+E131_FRAMING_DATA = 0x00000002
+E131_FRAMING_SYNC = 0x00000001
+E131_PREVIEW = 0x80
+E131_TERMINATED = 0x40
+E131_DATA_OFFSET = 126
+
+ARTNET_ID = b"Art-Net\x00"
+ARTNET_DMX = 0x5000
+ARTNET_SYNC = 0x5200
+ARTNET_VERSION = 14
+ARTNET_DATA_OFFSET = 18
+
+DDP_VERSION = 0x40
+DDP_TIMECODE = 0x10
+DDP_PUSH = 0x01
+DDP_DATA_OFFSET = 10
+
+def is_late(sequence, last, bits=8, window=20):
+	"""
+	Returns true if a sequence number is not newer than the last one seen
+
+	Sequence numbers wrap around, so a number is late if it falls in the
+	window of numbers before (or equal to) the last one seen.
+
+	Keyword arguments:
+	sequence -- the sequence number of the packet received
+	last -- the sequence number of the last packet accepted, or None if none was accepted
+	bits -- the width of the sequence number
+	window -- the number of sequence numbers before the last one treated as late
+	"""
+	if last is None:
+		return False
+	diff = (sequence - last) % (1 << bits)
+	return diff == 0 or diff > (1 << bits) - window
+
+def parse_e131(packet, size):
+	"""
+	Returns the contents of an E1.31 packet as a tuple, or None if it is not a packet to act on
+
+	Data packets return (DATA, universe, sequence, sync address, data offset, data length).
+	Sync packets return (SYNC, sync address, sequence, 0, 0, 0).
+
+	Keyword arguments:
+	packet -- the buffer the packet was received into
+	size -- the number of bytes received
+	"""
+	if size < 49 or packet[4:16] != E131_ID:
+		return None
+	root, = struct.unpack_from(">I", packet, 18)
+	framing, = struct.unpack_from(">I", packet, 40)
+	if root == E131_ROOT_EXTENDED and framing == E131_FRAMING_SYNC:
+		sequence, address = struct.unpack_from(">BH", packet, 44)
+		return SYNC, address, sequence, 0, 0, 0
+	if root != E131_ROOT_DATA or framing != E131_FRAMING_DATA or size < E131_DATA_OFFSET:
+		return None
+	sync, sequence, options, universe = struct.unpack_from(">HBBH", packet, 109)
+	count, start_code = struct.unpack_from(">HB", packet, 123)
+	if options & (E131_PREVIEW | E131_TERMINATED) or start_code != 0:
+		return None
+	length = min(count - 1, size - E131_DATA_OFFSET)
+	return DATA, universe, sequence, sync, E131_DATA_OFFSET, length
+
+def parse_artnet(packet, size):
+	"""
+	Returns the contents of an Art-Net packet as a tuple, or None if it is not a packet to act on
+
+	ArtDmx packets return (DATA, universe, sequence, 0, data offset, data length).
+	ArtSync packets return (SYNC, 0, 0, 0, 0, 0).
+
+	Keyword arguments:
+	packet -- the buffer the packet was received into
+	size -- the number of bytes received
+	"""
+	if size < 14 or packet[0:8] != ARTNET_ID:
+		return None
+	opcode, = struct.unpack_from("<H", packet, 8)
+	if opcode == ARTNET_SYNC:
+		return SYNC, 0, 0, 0, 0, 0
+	if opcode != ARTNET_DMX or size < ARTNET_DATA_OFFSET:
+		return None
+	sequence, = struct.unpack_from("B", packet, 12)
+	universe, = struct.unpack_from("<H", packet, 14)
+	length, = struct.unpack_from(">H", packet, 16)
+	return DATA, universe & 0x7FFF, sequence, 0, ARTNET_DATA_OFFSET, min(length, size - ARTNET_DATA_OFFSET)
+
+def parse_ddp(packet, size):
+	"""
+	Returns the contents of a DDP packet as a tuple, or None if it is not a packet to act on
+
+	Packets return (DATA, byte offset on the strip, sequence, push flag, data offset, data length).
+
+	Keyword arguments:
+	packet -- the buffer the packet was received into
+	size -- the number of bytes received
+	"""
+	if size < DDP_DATA_OFFSET:
+		return None
+	flags, sequence = packet[0], packet[1] & 0x0F
+	if flags & 0xC0 != DDP_VERSION:
+		return None
+	offset, length = struct.unpack_from(">IH", packet, 4)
+	header = DDP_DATA_OFFSET + (4 if flags & DDP_TIMECODE else 0)
+	return DATA, offset, sequence, flags & DDP_PUSH, header, min(length, max(size - header, 0))
+
+PARSERS = {E131: parse_e131, ARTNET: parse_artnet, DDP: parse_ddp}
+
+@dataclass(slots=True)
+class ReceiverStats:
+	"""
+	Represents the counts of packets handled by a receiver
+	"""
+	packets: int = 0
+	frames: int = 0
+	late: int = 0
+	ignored: int = 0
+	incomplete: int = 0
+
+class UniverseReceiver:
+	"""
+	Represents a UDP receiver which assembles frames for the LED strip from network packets
+
+	This object:
+		- Receives every packet into one reusable buffer and copies its pixels straight into the strip's frame
+		- Drops packets which are late by their sequence number
+		- Shows a frame once it is complete, or on the sync packet that latches it
+	"""
+	def __init__(self, protocol=E131, universe=None, host="0.0.0.0", port=None, clock=None, strip=None):
+		"""
+		Initialize the receiver, it is not listening until bound
+
+		Keyword arguments:
+		protocol -- the protocol to receive (E131, ARTNET or DDP)
+		universe -- the universe mapped to the first pixel of the strip, defaults to the protocol's first universe
+		host -- the address to listen on
+		port -- the UDP port to listen on, defaults to the protocol's port (0 picks a free port)
+		clock -- the clock the Art-Net sync timeout is measured against, defaults to the monotonic wall clock
+		strip -- the name of the strip to show the frames on, defaults to the default strip
+		"""
+		if protocol not in PROTOCOLS:
+			raise ValueError(f"Unknown protocol '{protocol}'. See options: {PROTOCOLS}")
+		self.protocol = protocol
+		self.parse = PARSERS[protocol]
+		self.universe = FIRST_UNIVERSES.get(protocol, 0) if universe is None else universe
+		self.address = (host, PORTS[protocol] if port is None else port)
+		self.clock = clock if clock is not None else MONOTONIC
+		self.strip = strip
+		self.size = get_backend(strip).count * 3
+		self.universes = -(-self.size // (PIXELS_PER_UNIVERSE * 3))
+		self.buffer = bytearray(MAX_PACKET)
+		self.view = memoryview(self.buffer)
+		self.sequences = {}
+		self.received = set()	# The universes written since the last frame was shown
+		self.sync_address = 0	# The E1.31 sync address the written universes are waiting on
+		self.last_sync = None	# The time of the last ArtSync received
+		self.stats = ReceiverStats()
+		self.sock = None
+
+	def bind(self):
+		"""
+		Opens the UDP socket and starts listening for packets
+
+		Returns the address listened on
+		"""
+		self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self.sock.bind(self.address)
+		self.sock.settimeout(POLL_INTERVAL)
+		self.address = self.sock.getsockname()
+		return self.address
+
+	def close(self):
+		"""
+		Stops listening for packets
+		"""
+		if self.sock is not None:
+			self.sock.close()
+			self.sock = None
+
+	def serve(self, duration=None, cancel=None, engine=None):
+		"""
+		Receives packets and shows the frames they carry until cancelled
+
+		Keyword arguments:
+		duration -- the time in seconds to receive for, or None to receive until cancelled
+		cancel -- a threading.Event which, once set, stops receiving
+		engine -- an engine.Engine to receive on instead, in which case the coroutine to start on it is returned (see serve_on)
+
+		Returns the counts of packets handled
+		"""
+		if engine is not None:
+			return self.serve_on(engine, duration=duration)
+		if self.sock is None:
+			self.bind()
+		started = self.clock.now()
+		try:
+			while not (cancel is not None and cancel.is_set()) and (duration is None or self.clock.now() - started <= duration):
+				try:
+					size = self.sock.recv_into(self.buffer)
+				except socket.timeout:
+					continue
+				self.handle(size)
+		finally:
+			self.close()
+		return self.stats
+
+	async def serve_on(self, engine, duration=None):
+		"""
+		Receives packets and shows the frames they carry as a task of an engine, until the task is cancelled
+
+		The packets are read on the engine's event loop (see engine.Engine.add_receiver),
+		so this task only waits out the duration and stops listening once it ends.
+
+		Keyword arguments:
+		engine -- the engine.Engine to read the packets on
+		duration -- the time in seconds to receive for, or None to receive until cancelled
+
+		Returns the counts of packets handled
+		"""
+		engine.add_receiver(self)
+		started = engine.clock.now()
+		try:
+			while duration is None or engine.clock.now() - started <= duration:
+				await engine.next_tick()
+		finally:
+			engine.remove_reader(self.sock)
+			self.close()
+		return self.stats
+
+	def handle(self, size):
+		"""
+		Acts on a packet held in the receive buffer
+
+		Keyword arguments:
+		size -- the number of bytes received
+
+		Returns true if the packet showed a frame
+		"""
+		self.stats.packets += 1
+		packet = self.parse(self.buffer, size)
+		if packet is None:
+			self.stats.ignored += 1
+			return False
+		kind, key, sequence, sync, start, length = packet
+
+		if kind == SYNC:
+			return self.handle_sync(key)
+
+		if self.protocol == DDP:
+			late = sequence != 0 and is_late(sequence, self.sequences.get(0), bits=4, window=8)
+		else:
+			late = (sequence != 0 or self.protocol == E131) and is_late(sequence, self.sequences.get(key))
+		if late:
+			self.stats.late += 1
+			return False
+		self.sequences[0 if self.protocol == DDP else key] = sequence
+
+		if self.protocol == DDP:
+			self.write(key, start, length)
+			return self.latch() if sync else False
+
+		index = key - self.universe
+		if index < 0 or index >= self.universes:
+			self.stats.ignored += 1
+			return False
+		self.write(index * PIXELS_PER_UNIVERSE * 3, start, length)
+		self.received.add(index)
+		self.sync_address = sync
+
+		if self.protocol == ARTNET and self.last_sync is not None:
+			if self.clock.now() - self.last_sync <= ARTNET_SYNC_TIMEOUT:
+				return False
+			self.last_sync = None
+		if sync == 0 and len(self.received) == self.universes:
+			return self.latch()
+		return False
+
+	def handle_sync(self, address):
+		"""
+		Shows the frame waiting on a sync packet, if every universe of it has arrived
+
+		Keyword arguments:
+		address -- the sync address of an E1.31 sync packet, ignored for Art-Net
+		"""
+		if self.protocol == ARTNET:
+			self.last_sync = self.clock.now()
+		elif address != self.sync_address or address == 0:
+			self.stats.ignored += 1
+			return False
+		if len(self.received) < self.universes:
+			self.stats.incomplete += 1
+			return False
+		return self.latch()
+
+	def write(self, offset, start, length):
+		"""
+		Copies the pixels of a packet into the strip's frame
+
+		Channels past the end of the strip, and a trailing partial pixel, are ignored.
+
+		Keyword arguments:
+		offset -- the channel (byte) on the strip to write the first channel of data to
+		start -- the offset of the data in the receive buffer
+		length -- the number of channels of data
+		"""
+		length = min(length, self.size - offset)
+		length -= length % 3
+		if offset % 3 != 0 or length <= 0:
+			return
+		write_frame(self.view[start:start + length], start=offset // 3, strip=self.strip)
+
+	def latch(self):
+		"""
+		Shows the assembled frame and starts assembling the next one
+		"""
+		self.received.clear()
+		self.stats.frames += 1
+		show_pixels(strip=self.strip)
+		return True
+
+def e131_packet(universe, data, sequence=0, sync_address=0, priority=100, source="led-controller"):
+	"""
+	Returns an E1.31 data packet carrying channel data for a universe
+
+	Keyword arguments:
+	universe -- the universe the data is for
+	data -- a bytes-like object of up to 512 channel values
+	sequence -- the sequence number of the packet (0-255)
+	sync_address -- the universe of the sync packet to wait on, or 0 to show without waiting
+	priority -- the priority of the source (0-200)
+	source -- the name of the source
+	"""
+	size = E131_DATA_OFFSET + len(data)
+	return b"".join((
+		struct.pack(">HH12sHI16s", 0x0010, 0, E131_ID, 0x7000 | (size - 16), E131_ROOT_DATA, bytes(16)),
+		struct.pack(">HI64sBHBBH", 0x7000 | (size - 38), E131_FRAMING_DATA, source.encode(), priority, sync_address, sequence, 0, universe),
+		struct.pack(">HBBHHHB", 0x7000 | (size - 115), 0x02, 0xA1, 0, 1, len(data) + 1, 0),
+		bytes(data)
+	))
+
+def e131_sync_packet(sync_address, sequence=0):
+	"""
+	Returns an E1.31 sync packet which shows the universes waiting on its sync address
+
+	Keyword arguments:
+	sync_address -- the sync address the universes are waiting on
+	sequence -- the sequence number of the packet (0-255)
+	"""
+	return b"".join((
+		struct.pack(">HH12sHI16s", 0x0010, 0, E131_ID, 0x7000 | (49 - 16), E131_ROOT_EXTENDED, bytes(16)),
+		struct.pack(">HIBHH", 0x7000 | (49 - 38), E131_FRAMING_SYNC, sequence, sync_address, 0)
+	))
+
+def artnet_packet(universe, data, sequence=0):
+	"""
+	Returns an ArtDmx packet carrying channel data for a universe
+
+	Keyword arguments:
+	universe -- the 15 bit port address of the universe the data is for
+	data -- a bytes-like object of up to 512 channel values
+	sequence -- the sequence number of the packet (1-255), or 0 to disable sequencing
+	"""
+	return ARTNET_ID + struct.pack("<H", ARTNET_DMX) + struct.pack(">HBB", ARTNET_VERSION, sequence, 0) + struct.pack("<H", universe) + struct.pack(">H", len(data)) + bytes(data)
+
+def artnet_sync_packet():
+	"""
+	Returns an ArtSync packet which shows the universes received since the last sync
+	"""
+	return ARTNET_ID + struct.pack("<H", ARTNET_SYNC) + struct.pack(">HBB", ARTNET_VERSION, 0, 0)
+
+def ddp_packet(offset, data, sequence=0, push=True):
+	"""
+	Returns a DDP packet carrying pixel data for a block of channels
+
+	Keyword arguments:
+	offset -- the channel (byte) on the strip to write the first channel of data to
+	data -- a bytes-like object of packed RGB values
+	sequence -- the sequence number of the packet (1-15), or 0 to disable sequencing
+	push -- whether the packet shows the frame once written
+	"""
+	flags = DDP_VERSION | (DDP_PUSH if push else 0)
+	return struct.pack(">BBBBIH", flags, sequence, 0x0B, 1, offset, len(data)) + bytes(data)
+
+def send(packet, protocol=E131, host="127.0.0.1", port=None):
+	"""
+	Sends a packet to a receiver over UDP
+
+	Keyword arguments:
+	packet -- the bytes of the packet to send
+	protocol -- the protocol of the packet, which sets the default port
+	host -- the address of the receiver
+	port -- the UDP port of the receiver, defaults to the protocol's port
+	"""
+	with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+		sock.sendto(packet, (host, PORTS[protocol] if port is None else port))
@@ -0,0 +1,398 @@
+"""
+recording.py
+
+Frame recording and playback for the LED controller system.
+
+This module records the frames of an effect, with the time each was
+pushed, to a compact binary file, and plays recordings back on the strip.
+Playback memory-maps the file, so a long show starts right away and is
+read from disk as it plays rather than loaded into memory.
+
+File layout (little-endian):
+	- A header: magic, version, flags, pixel count, frame count and the offset of the index
+	- One record per frame: its timestamp, encoding, payload length and payload
+	- An index, aligned to 8 bytes, of every frame's timestamp, then record offset,
+	  then the number of the keyframe it is decoded from
+
+Each frame is stored raw, run-length encoded as runs of identical pixels,
+or as a delta of the pixel spans which changed since the previous frame,
+whichever is smallest. Every KEYFRAME_INTERVAL frames, a frame is stored
+without a delta, so seeking only decodes from the nearest keyframe.
+"""
+import bisect
+import mmap
+import struct
+from .clock import MONOTONIC
+from .config import LED_COUNT
+from .controller import get_strip_count, write_frame, show_pixels
+from .offline import render_offline
+from .timer import SchedulerStats, DEFAULT_SPIN
+
+MAGIC = b"LEDR"
+VERSION = 1
+
+COMPRESSED = 0x01
+"""Header flag set when frames may be stored run-length or delta encoded"""
+
+RAW = 0
+"""Frame encoding holding the packed RGB values of the whole frame"""
+
+RLE = 1
+"""Frame encoding holding (count, r, g, b) runs of identical pixels"""
+
+DELTA = 2
+"""Frame encoding holding (start, length, values) patches of the pixels changed since the previous frame"""
+
+KEYFRAME_INTERVAL = 60
+"""The most frames stored between frames which are decoded without the previous frame"""
+
+HEADER = struct.Struct("<4sHHIIQ")
+RECORD = struct.Struct("<dBI")
+RUN = struct.Struct("<B3s")
+PATCH = struct.Struct("<HH")
+INDEX_ENTRY_SIZE = 8 + 8 + 4
+
+def encode_rle(frame) -> bytes:
+	"""
+	Returns a frame encoded as (count, r, g, b) runs of identical pixels
+
+	Keyword arguments:
+	frame -- a bytes-like object of packed RGB values
+	"""
+	out = bytearray()
+	pixels = [frame[i:i + 3] for i in range(0, len(frame), 3)]
+	i = 0
+	while i < len(pixels):
+		run = 1
+		while i + run < len(pixels) and run < 255 and pixels[i + run] == pixels[i]:
+			run += 1
+		out += RUN.pack(run, pixels[i])
+		i += run
+	return bytes(out)
+
+def decode_rle(payload, frame):
+	"""
+	Writes the pixels of a run-length encoded frame into a frame
+
+	Keyword arguments:
+	payload -- the (count, r, g, b) runs of the frame
+	frame -- the bytearray to write the packed RGB values into
+	"""
+	pos = 0
+	for run, color in RUN.iter_unpack(payload):
+		frame[pos:pos + run * 3] = color * run
+		pos += run * 3
+
+def encode_delta(frame, previous) -> bytes:
+	"""
+	Returns the pixel spans of a frame which differ from the previous frame
+
+	Spans separated by a single unchanged pixel are merged, as a patch header costs more than the pixel.
+
+	Keyword arguments:
+	frame -- a bytes-like object of packed RGB values
+	previous -- the packed RGB values of the previous frame
+	"""
+	out = bytearray()
+	count = len(frame) // 3
+	start = None
+	gap = 0
+	for i in range(count + 2):
+		changed = i < count and frame[i * 3:i * 3 + 3] != previous[i * 3:i * 3 + 3]
+		if changed:
+			if start is None:
+				start = i
+			gap = 0
+		elif start is not None:
+			gap += 1
+			if gap > 1 or i >= count:
+				stop = i - gap + 1
+				out += PATCH.pack(start, stop - start) + frame[start * 3:stop * 3]
+				start = None
+	return bytes(out)
+
+def decode_delta(payload, frame):
+	"""
+	Writes the changed pixel spans of a delta encoded frame into the previous frame
+
+	Keyword arguments:
+	payload -- the (start, length, values) patches of the frame
+	frame -- the bytearray holding the previous frame, updated in place
+	"""
+	pos = 0
+	while pos < len(payload):
+		start, length = PATCH.unpack_from(payload, pos)
+		pos += PATCH.size
+		frame[start * 3:(start + length) * 3] = payload[pos:pos + length * 3]
+		pos += length * 3
+
+class FrameRecorder:
+	"""
+	Represents a recording being written to a file
+
+	This object:
+		- Appends one record per frame, choosing the smallest encoding when compressing
+		- Stores a frame without a delta at least every keyframe_interval frames
+		- Writes the seek index and completes the header when closed
+	"""
+	def __init__(self, path, count=LED_COUNT, compress=True, keyframe_interval=KEYFRAME_INTERVAL):
+		"""
+		Initialize the recorder, creating the file
+
+		Keyword arguments:
+		path -- the path of the file to record to
+		count -- the number of pixels in each frame
+		compress -- whether frames may be stored run-length or delta encoded
+		keyframe_interval -- the most frames stored between frames decoded without the previous frame
+		"""
+		self.file = open(path, "wb")
+		self.count = count
+		self.compress = compress
+		self.keyframe_interval = keyframe_interval
+		self.previous = None
+		self.keyframe = 0
+		self.timestamps = []
+		self.offsets = []
+		self.keyframes = []
+		self.file.write(HEADER.pack(MAGIC, VERSION, COMPRESSED if compress else 0, count, 0, 0))
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def write(self, timestamp, frame):
+		"""
+		Appends a frame to the recording, it can be used as the sink of a FrameSinkBackend
+
+		Keyword arguments:
+		timestamp -- the time in seconds the frame was pushed
+		frame -- a bytes-like object of packed RGB values for the whole strip
+		"""
+		frame = bytes(frame)
+		if len(frame) != self.count * 3:
+			raise ValueError(f"Frame must hold {self.count * 3} bytes, got {len(frame)}")
+
+		number = len(self.offsets)
+		encoding, payload = RAW, frame
+		if self.compress:
+			candidates = [(RLE, encode_rle(frame))]
+			if self.previous is not None and number - self.keyframe < self.keyframe_interval:
+				candidates.append((DELTA, encode_delta(frame, self.previous)))
+			for candidate in candidates:
+				if len(candidate[1]) < len(payload):
+					encoding, payload = candidate
+		if encoding != DELTA:
+			self.keyframe = number
+
+		self.timestamps.append(timestamp)
+		self.offsets.append(self.file.tell())
+		self.keyframes.append(self.keyframe)
+		self.file.write(RECORD.pack(timestamp, encoding, len(payload)))
+		self.file.write(payload)
+		self.previous = frame
+
+	def close(self):
+		"""
+		Writes the seek index, completes the header and closes the file
+		"""
+		if self.file.closed:
+			return
+		frames = len(self.offsets)
+		self.file.write(bytes(-self.file.tell() % 8))
+		index = self.file.tell()
+		self.file.write(struct.pack(f"<{frames}d", *self.timestamps))
+		self.file.write(struct.pack(f"<{frames}Q", *self.offsets))
+		self.file.write(struct.pack(f"<{frames}I", *self.keyframes))
+		self.file.seek(0)
+		self.file.write(HEADER.pack(MAGIC, VERSION, COMPRESSED if self.compress else 0, self.count, frames, index))
+		self.file.close()
+
+class Recording:
+	"""
+	Represents a recording read from a memory-mapped file
+
+	This object:
+		- Reads frames from the mapped file on demand, without loading the file into memory
+		- Reads the seek index in place, so opening a recording does not depend on its length
+		- Decodes frames into one reused frame, continuing from the last frame decoded when possible
+	"""
+	def __init__(self, path):
+		"""
+		Initialize the recording, mapping the file into memory
+
+		Keyword arguments:
+		path -- the path of the recorded file
+		"""
+		with open(path, "rb") as file:
+			self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+		magic, version, self.flags, self.count, frames, index = HEADER.unpack_from(self.map, 0)
+		if magic != MAGIC or version != VERSION:
+			self.map.close()
+			raise ValueError(f"'{path}' is not a version {VERSION} LED recording")
+		self.view = memoryview(self.map)
+		self.timestamps = self.view[index:index + frames * 8].cast("d")
+		self.offsets = self.view[index + frames * 8:index + frames * 16].cast("Q")
+		self.keyframes = self.view[index + frames * 16:index + frames * INDEX_ENTRY_SIZE].cast("I")
+		self.frame = bytearray(self.count * 3)
+		self.current = None	# The number of the frame held in self.frame
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def __len__(self):
+		return len(self.offsets)
+
+	def close(self):
+		"""
+		Unmaps the file
+		"""
+		for view in (self.timestamps, self.offsets, self.keyframes, self.view):
+			view.release()
+		self.map.close()
+
+	def get_duration(self) -> float:
+		"""
+		Returns the timestamp of the last frame in seconds
+		"""
+		return self.timestamps[-1] if len(self) else 0.0
+
+	def seek(self, timestamp) -> int:
+		"""
+		Returns the number of the frame on the strip at a time, the first frame if the time is before it
+
+		Keyword arguments:
+		timestamp -- the time in seconds into the recording
+		"""
+		return max(bisect.bisect_right(self.timestamps, timestamp) - 1, 0)
+
+	def get_frame(self, number):
+		"""
+		Returns the packed RGB values of a frame
+
+		The frame returned is only valid until the next call.
+
+		Keyword arguments:
+		number -- the number of the frame in the recording
+		"""
+		if number != self.current:
+			first = self.keyframes[number]
+			if self.current is not None and first <= self.current < number:
+				first = self.current + 1	# Continue from the frame already decoded
+			for i in range(first, number + 1):
+				self.decode(i)
+			self.current = number
+		return self.frame
+
+	def decode(self, number):
+		"""
+		Decodes a frame into the reused frame, which must hold the previous frame if the frame is a delta
+
+		Keyword arguments:
+		number -- the number of the frame in the recording
+		"""
+		offset = self.offsets[number]
+		timestamp, encoding, length = RECORD.unpack_from(self.map, offset)
+		start = offset + RECORD.size
+		payload = self.view[start:start + length]
+		if encoding == RAW:
+			self.frame[:] = payload
+		elif encoding == RLE:
+			decode_rle(payload, self.frame)
+		else:
+			decode_delta(payload, self.frame)
+
+	def frames(self, start=0.0):
+		"""
+		Yields the (timestamp, frame) pairs of the recording in order
+
+		Keyword arguments:
+		start -- the time in seconds into the recording to start from
+		"""
+		for number in range(self.seek(start), len(self)):
+			yield self.timestamps[number], self.get_frame(number)
+
+def record(effect, path, count=None, compress=True, **kwargs):
+	"""
+	Renders a timed effect offline and records its frames to a file
+
+	Keyword arguments:
+	effect -- the effect function to record (e.g. effects.blink_color), it must accept a clock argument
+	path -- the path of the file to record to
+	count -- the number of pixels on the strip, defaults to the length of the strip the effect's selection is bound to
+	compress -- whether frames may be stored run-length or delta encoded
+	kwargs -- the remaining arguments passed to the effect (e.g. palette, interval, duration, sel)
+
+	Returns the number of frames recorded
+	"""
+	if count is None:
+		count = get_strip_count(kwargs["sel"].get_strip() if kwargs.get("sel") is not None else None)
+	with FrameRecorder(path, count=count, compress=compress) as recorder:
+		render_offline(effect, count=count, sink=recorder.write, **kwargs)
+		return len(recorder.offsets)
+
+def play(path, start=0.0, clock=None, cancel=None, strip=None, engine=None):
+	"""
+	Plays a recording on the LED strip, showing each frame at the time it was recorded
+
+	Keyword arguments:
+	path -- the path of the recorded file
+	start -- the time in seconds into the recording to start from
+	clock -- the clock to time the frames against, defaults to the monotonic wall clock
+	cancel -- a threading.Event which, once set, stops the playback
+	strip -- the name of the strip to play the recording on, defaults to the default strip
+	engine -- an engine.Engine to play the recording on instead, in which case the coroutine to start on it is returned
+
+	Returns the timing statistics of the frames shown
+	"""
+	if engine is not None:
+		return play_on(engine, path, start=start, strip=strip)
+
+	clock = clock if clock is not None else MONOTONIC
+	stats = SchedulerStats()
+	with Recording(path) as recording:
+		epoch = None
+		for timestamp, frame in recording.frames(start):
+			if epoch is None:
+				epoch = clock.now() - max(timestamp, start)
+			deadline = epoch + timestamp
+			clock.wait_until(deadline, spin=DEFAULT_SPIN, cancel=cancel)
+			if cancel is not None and cancel.is_set():
+				break
+			stats.record(max(clock.now() - deadline, 0.0))
+			write_frame(frame, strip=strip)
+			show_pixels(strip=strip)
+	return stats
+
+async def play_on(engine, path, start=0.0, strip=None):
+	"""
+	Plays a recording on the LED strip as a task of an engine, showing each frame at the time it was recorded
+
+	Frames keep their recorded timing, so each is shown as soon as its time
+	comes rather than at the engine's next tick.
+
+	Keyword arguments:
+	engine -- the engine.Engine whose event loop and clock the recording plays against
+	path -- the path of the recorded file
+	start -- the time in seconds into the recording to start from
+	strip -- the name of the strip to play the recording on, defaults to the default strip
+
+	Returns the timing statistics of the frames shown
+	"""
+	clock = engine.clock
+	stats = SchedulerStats()
+	with Recording(path) as recording:
+		epoch = None
+		for timestamp, frame in recording.frames(start):
+			if epoch is None:
+				epoch = clock.now() - max(timestamp, start)
+			deadline = epoch + timestamp
+			await clock.sleep_until(deadline)
+			stats.record(max(clock.now() - deadline, 0.0))
+			write_frame(frame, strip=strip)
+			show_pixels(strip=strip)
+	return stats
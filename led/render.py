@@ -0,0 +1,344 @@
+"""
+render.py
+
+Frame rendering operations for the LED controller system.
+
+This module defines the operations effects use to build a frame before it is
+written to the strip in one copy. When NumPy is installed and the strip is
+long enough to benefit, a frame is an (n, 3) uint8 array of n pixels and each
+operation is a single array operation, otherwise a frame is a bytearray of
+packed RGB values and the operations fall back to pure Python. Both paths
+produce bit-identical frames.
+
+NumPy is only imported once the first array frame is created, so short
+strips and one-off commands do not pay for importing it.
+
+Colors may be given as RGB int tuples or packed 24-bit ints (see
+colors.pack_color), and a frame is only turned into per-pixel values at the
+edge, by packed_pixels, for libraries which take one value per pixel.
+"""
+import importlib.util
+import sys
+from array import array
+from .colors import color_bytes, unpack_color
+from .config import NUMPY_MIN_PIXELS
+
+np = None
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+"""Defines whether the NumPy render path is available"""
+
+PACKED_TYPECODE = "I" if array("I").itemsize == 4 else "L"
+"""The array typecode of a native 32-bit unsigned int, which packed pixels are held in"""
+
+def load_numpy():
+	"""
+	Imports NumPy on first use and returns the module
+	"""
+	global np
+	if np is None:
+		import numpy
+		np = numpy
+	return np
+
+def new_frame(count=None, source=None, use_numpy=None):
+	"""
+	Returns a new frame, either blank or holding a copy of the packed RGB values provided
+
+	Strips differ in length, so a blank frame must be given its count (see controller.get_strip_count).
+
+	Keyword arguments:
+	count -- the number of pixels in the frame, ignored when a source is provided
+	source -- a bytes-like object of packed RGB values to copy into the frame
+	use_numpy -- whether to create an (n, 3) uint8 array rather than a bytearray, defaults to
+	             using NumPy when it is installed and the frame has at least NUMPY_MIN_PIXELS pixels
+	"""
+	if source is not None:
+		count = memoryview(source).nbytes // 3
+	elif count is None:
+		raise TypeError("A blank frame needs the number of pixels it holds")
+	if use_numpy is None:
+		use_numpy = HAS_NUMPY and count >= NUMPY_MIN_PIXELS
+	if use_numpy:
+		if not HAS_NUMPY:
+			raise RuntimeError("The NumPy render path was requested but NumPy is not installed")
+		load_numpy()
+		if source is None:
+			return np.zeros((count, 3), dtype=np.uint8)
+		return np.frombuffer(source, dtype=np.uint8).reshape(-1, 3).copy()
+	if source is None:
+		return bytearray(count * 3)
+	return bytearray(source)
+
+def is_array(frame) -> bool:
+	"""
+	Returns true if the frame is a NumPy array rather than a bytearray
+	"""
+	return np is not None and isinstance(frame, np.ndarray)
+
+def pixel_count(frame) -> int:
+	"""
+	Returns the number of pixels held in a frame
+	"""
+	return len(frame) if is_array(frame) else len(frame) // 3
+
+def copy_frame(frame):
+	"""
+	Returns a copy of a frame of the same type
+	"""
+	return frame.copy()
+
+def packed_pixels(frame) -> array:
+	"""
+	Returns the pixels of a frame as an array of packed 24-bit ints (0xRRGGBB), one per pixel
+
+	The channels are interleaved into the 32-bit lanes of the array with three
+	strided copies, so no tuple is built per pixel.
+
+	Keyword arguments:
+	frame -- the frame to pack
+	"""
+	data = bytes(memoryview(frame).cast("B"))
+	lanes = bytearray(len(data) // 3 * 4)
+	red, green, blue = (1, 2, 3) if sys.byteorder == "big" else (2, 1, 0)
+	lanes[red::4] = data[0::3]
+	lanes[green::4] = data[1::3]
+	lanes[blue::4] = data[2::3]
+	return array(PACKED_TYPECODE, lanes)
+
+def blit(frame, source, start=0, stop=None, source_start=None):
+	"""
+	Copies a block of pixels from one frame into another
+
+	Keyword arguments:
+	frame -- the frame to copy pixels into
+	source -- the frame to copy pixels from, of the same type
+	start -- the index of the first pixel to copy into
+	stop -- the index after the last pixel to copy into, clamped to the end of the frame
+	source_start -- the index of the first pixel to copy from, defaults to start
+	"""
+	if stop is None or stop > pixel_count(frame):
+		stop = pixel_count(frame)
+	if source_start is None:
+		source_start = start
+	source_stop = source_start + stop - start
+	if is_array(frame):
+		frame[start:stop] = source[source_start:source_stop]
+	else:
+		frame[start * 3:stop * 3] = source[source_start * 3:source_stop * 3]
+
+def fill(frame, color, start=0, stop=None):
+	"""
+	Fills a block of pixels in a frame with a single color
+
+	Keyword arguments:
+	frame -- the frame to fill
+	color -- an RGB int tuple or packed int to fill the block with
+	start -- the index of the first pixel to fill
+	stop -- the index after the last pixel to fill, clamped to the end of the frame
+	"""
+	if stop is None or stop > pixel_count(frame):
+		stop = pixel_count(frame)
+	if is_array(frame):
+		frame[start:stop] = unpack_color(color)
+	else:
+		frame[start * 3:stop * 3] = color_bytes(color) * (stop - start)
+
+def fill_pattern(frame, compiled, span_col, space_col=None):
+	"""
+	Fills the pixels of a compiled PixelRange in a frame by its span and spacing layout
+
+	Keyword arguments:
+	frame -- the frame to fill
+	compiled -- the CompiledRange laying out the span and spacing pixels
+	span_col -- An RGB int tuple or packed int to fill the span with
+	space_col -- An RGB int tuple or packed int to fill the spacing with. If none is provided, spacing is left as is
+	"""
+	start = compiled.start
+	stop = start + compiled.get_length()
+	if is_array(frame):
+		segment = frame[start:stop]
+		if space_col is not None:
+			segment[:] = unpack_color(space_col)
+		segment[np.frombuffer(compiled.mask, dtype=np.bool_)] = unpack_color(span_col)
+	else:
+		segment = frame[start * 3:stop * 3]
+		compiled.fill(segment, span_col=span_col, space_col=space_col)
+		frame[start * 3:stop * 3] = segment
+
+def reverse(frame, start=0, stop=None):
+	"""
+	Reverses the order of a block of pixels in a frame
+
+	Keyword arguments:
+	frame -- the frame to reverse pixels in
+	start -- the index of the first pixel to reverse
+	stop -- the index after the last pixel to reverse, defaults to the end of the frame
+	"""
+	if stop is None:
+		stop = pixel_count(frame)
+	if is_array(frame):
+		frame[start:stop] = frame[start:stop][::-1].copy()
+	else:
+		# Reversing the bytes reverses the pixels but leaves each one in BGR order
+		flipped = frame[start * 3:stop * 3][::-1]
+		flipped[0::3], flipped[2::3] = flipped[2::3], flipped[0::3]
+		frame[start * 3:stop * 3] = flipped
+
+def mirror(frame):
+	"""
+	Reflects the first half of a frame onto its second half, so the frame reads the same from either end
+	"""
+	count = pixel_count(frame)
+	half = count // 2
+	if is_array(frame):
+		frame[count - half:] = frame[:half][::-1]
+	else:
+		flipped = frame[:half * 3][::-1]
+		flipped[0::3], flipped[2::3] = flipped[2::3], flipped[0::3]
+		frame[(count - half) * 3:] = flipped
+
+REPLACE = "replace"
+"""Blend mode where a layer's pixels replace the pixels beneath them, ignoring opacity"""
+
+ADD = "add"
+"""Blend mode where a layer's channels are added to the channels beneath them, saturating at 255"""
+
+MULTIPLY = "multiply"
+"""Blend mode where a layer's channels scale the channels beneath them (255 keeps them, 0 turns them off)"""
+
+MAX = "max"
+"""Blend mode where each channel takes the brighter of the layer and the pixels beneath it"""
+
+ALPHA = "alpha"
+"""Blend mode where a layer's pixels are mixed over the pixels beneath them by the layer's opacity"""
+
+BLEND_MODES = (REPLACE, ADD, MULTIPLY, MAX, ALPHA)
+
+_BLENDS = {
+	ADD: lambda b, l: min(b + l, 255),
+	MULTIPLY: lambda b, l: b * l // 255,
+	MAX: max,
+	ALPHA: lambda b, l: l
+}
+
+def blend(frame, layer, mode=REPLACE, opacity=1.0, start=0, stop=None):
+	"""
+	Blends a block of pixels from a layer onto a frame
+
+	The blended channel is mixed with the channel beneath it by the opacity,
+	in 8 bit fixed point, so both render paths round identically.
+
+	Keyword arguments:
+	frame -- the frame to blend onto
+	layer -- the frame to blend from, of the same type
+	mode -- the blend mode (REPLACE, ADD, MULTIPLY, MAX or ALPHA)
+	opacity -- the float value (0 to 1) to mix the blended pixels in by
+	start -- the index of the first pixel to blend
+	stop -- the index after the last pixel to blend, clamped to the end of the frame
+	"""
+	if mode not in BLEND_MODES:
+		raise ValueError(f"Unknown blend mode '{mode}'. See options: {BLEND_MODES}")
+	if stop is None or stop > pixel_count(frame):
+		stop = pixel_count(frame)
+	level = round(max(0.0, min(opacity, 1.0)) * 255)
+	if start >= stop or (level == 0 and mode != REPLACE):
+		return
+	if mode == REPLACE or (mode == ALPHA and level == 255):
+		blit(frame, layer, start=start, stop=stop)
+		return
+
+	if is_array(frame):
+		below = frame[start:stop].astype(np.uint16)
+		above = layer[start:stop].astype(np.uint16)
+		if mode == ADD:
+			out = np.minimum(below + above, 255)
+		elif mode == MULTIPLY:
+			out = below * above // 255
+		elif mode == MAX:
+			out = np.maximum(below, above)
+		else:
+			out = above
+		if level < 255:
+			out = (below * (255 - level) + out * level + 127) // 255
+		frame[start:stop] = out
+	else:
+		below = frame[start * 3:stop * 3]
+		above = layer[start * 3:stop * 3]
+		op = _BLENDS[mode]
+		if level == 255:
+			frame[start * 3:stop * 3] = bytes(map(op, below, above))
+		else:
+			keep = 255 - level
+			frame[start * 3:stop * 3] = bytes([(b * keep + op(b, l) * level + 127) // 255 for b, l in zip(below, above)])
+
+def lookup(frame, indices, table, start=0):
+	"""
+	Colors a block of pixels in a frame by looking each pixel's index up in a color table
+
+	Each channel is looked up in one pass, with bytes.translate, or with a single
+	take of the table's rows for an array frame.
+
+	Keyword arguments:
+	frame -- the frame to color
+	indices -- a bytes-like object or uint8 array of one index (0 to 255) per pixel, clamped to the end of the frame
+	table -- 256 packed RGB colors, such as the table of a gradient.GradientPalette
+	start -- the index of the pixel on the frame to color with the first index
+	"""
+	count = max(0, min(memoryview(indices).nbytes, pixel_count(frame) - start))
+	if is_array(frame):
+		colors = np.frombuffer(table, dtype=np.uint8).reshape(256, 3)
+		frame[start:start + count] = colors.take(np.frombuffer(indices, dtype=np.uint8, count=count), axis=0)
+	else:
+		keys = bytes(memoryview(indices).cast("B")[:count])
+		block = bytearray(count * 3)
+		block[0::3] = keys.translate(table[0::3])
+		block[1::3] = keys.translate(table[1::3])
+		block[2::3] = keys.translate(table[2::3])
+		frame[start * 3:(start + count) * 3] = block
+
+def brightness_table(val) -> bytes:
+	"""
+	Returns a 256 entry table mapping each channel value to its value at a brightness
+
+	Keyword arguments:
+	val -- the float value (0 to 1) to scale channel values by
+	"""
+	return bytes(int(i * val) for i in range(256))
+
+def scale(frame, val):
+	"""
+	Scales every channel of every pixel in a frame by a brightness
+
+	Keyword arguments:
+	frame -- the frame to scale
+	val -- the float value (0 to 1) to scale channel values by
+	"""
+	table = brightness_table(val)
+	if is_array(frame):
+		frame[:] = np.frombuffer(table, dtype=np.uint8)[frame]
+	else:
+		frame[:] = frame.translate(table)
+
+def swap_colors(frame, mapping):
+	"""
+	Replaces colors in a frame, so a frame drawn with one palette shows another
+
+	Every pixel is matched against its color before any swap is made, so
+	mappings that exchange two colors do not chain.
+
+	Keyword arguments:
+	frame -- the frame to swap colors in
+	mapping -- a dict of RGB int tuples to the RGB int tuples that replace them
+	"""
+	if is_array(frame):
+		keys = (frame[:, 0].astype(np.uint32) << 16) | (frame[:, 1].astype(np.uint32) << 8) | frame[:, 2]
+		matches = [(keys == ((r << 16) | (g << 8) | b), new) for (r, g, b), new in mapping.items()]
+		for match, new in matches:
+			frame[match] = new
+	else:
+		swaps = {bytes(old): bytes(new) for old, new in mapping.items()}
+		for i in range(0, len(frame), 3):
+			new = swaps.get(bytes(frame[i:i + 3]))
+			if new is not None:
+				frame[i:i + 3] = new
@@ -0,0 +1,310 @@
+"""
+stream.py
+
+Raw frame streaming for the LED controller system.
+
+This module reads fixed-size frames of packed pixel values from a file,
+FIFO or stdin and shows them on the strip, so other tools (ffmpeg, shaders,
+etc.) can drive the strip directly. Frames are read on a background thread,
+or on the event loop of an engine.Engine, into a latest-frame slot, so when
+the producer is faster than the strip only the newest frame is shown and
+stale frames never queue up.
+"""
+import itertools
+import os
+import sys
+import threading
+from .clock import MONOTONIC
+from .controller import get_backend, write_frame, show_pixels
+from .timer import FrameScheduler, SchedulerStats
+
+DEFAULT_FPS = 60
+"""The default maximum number of frames shown per second"""
+
+PIXEL_ORDERS = tuple("".join(order) for order in itertools.permutations("RGB"))
+"""The channel orders a stream's pixels may be packed in"""
+
+POLL_INTERVAL = 0.05
+"""The time in seconds between checks for cancellation and the deadline while waiting on a frame"""
+
+def reorder(data, order, out=None):
+	"""
+	Returns packed pixel values rearranged from a channel order to RGB
+
+	Each channel is moved with a single strided slice copy, so no Python
+	code runs per pixel.
+
+	Keyword arguments:
+	data -- a bytes-like object of packed pixel values in the channel order
+	order -- the channel order of the data (e.g. "GRB")
+	out -- a bytearray of the same length to write the RGB values into, a new one is created if None
+	"""
+	if order not in PIXEL_ORDERS:
+		raise ValueError(f"Unknown pixel order '{order}'. See options: {PIXEL_ORDERS}")
+	if out is None:
+		out = bytearray(len(data))
+	for i, channel in enumerate(order):
+		out["RGB".index(channel)::3] = data[i::3]
+	return out
+
+def open_source(source, blocking=True):
+	"""
+	Returns an unbuffered binary file for a stream source
+
+	Keyword arguments:
+	source -- a path to a file or FIFO, or "-" for stdin
+	blocking -- whether reads wait for data, a FIFO opened without blocking does not wait for a writer either
+	"""
+	if source == "-":
+		stream = open(sys.stdin.fileno(), "rb", buffering=0, closefd=False)
+	elif blocking:
+		stream = open(source, "rb", buffering=0)
+	else:
+		stream = open(source, "rb", buffering=0, opener=lambda path, flags: os.open(path, flags | os.O_NONBLOCK))
+	if not blocking:
+		os.set_blocking(stream.fileno(), False)
+	return stream
+
+class FrameReader:
+	"""
+	Represents a reader of fixed-size frames from a stream, on a background thread or an event loop
+
+	This object:
+		- Reads each frame into a back buffer, and swaps it into the latest-frame slot once complete
+		- Replaces an unshown frame with the newer one, counting it as coalesced
+		- Discards a partial frame left when the stream ends
+	"""
+	def __init__(self, source, frame_size):
+		"""
+		Initialize the frame reader, it is not reading until started
+
+		Keyword arguments:
+		source -- a binary file object, a path to a file or FIFO, or "-" for stdin,
+		          paths are opened on the reading thread so waiting for a FIFO writer never blocks the caller
+		frame_size -- the number of bytes in one frame
+		"""
+		self.source = source
+		self.frame_size = frame_size
+		self.cond = threading.Condition()
+		self.back = bytearray(frame_size)
+		self.latest = bytearray(frame_size)
+		self.front = bytearray(frame_size)
+		self.stream = None
+		self.filled = 0			# The number of bytes of the next frame read into the back buffer
+		self.fresh = False		# Whether the latest-frame slot holds a frame not yet taken
+		self.done = False
+		self.frames_read = 0
+		self.coalesced = 0
+		self.thread = threading.Thread(target=self.run, name="led-stream", daemon=True)
+
+	def start(self):
+		"""
+		Starts the thread reading frames
+		"""
+		self.thread.start()
+
+	def open(self, blocking=True):
+		"""
+		Opens the source if it is a path, and returns the stream frames are read from
+
+		Keyword arguments:
+		blocking -- whether reads wait for data, a stream which does not block is read with feed whenever it has data
+		"""
+		self.stream = open_source(self.source, blocking=blocking) if isinstance(self.source, str) else self.source
+		if not blocking:
+			os.set_blocking(self.stream.fileno(), False)
+		return self.stream
+
+	def feed(self) -> bool:
+		"""
+		Reads once from the stream into the frame being read, swapping it into the latest-frame slot once complete
+
+		Returns false once the stream has ended
+		"""
+		read = self.stream.readinto(memoryview(self.back)[self.filled:])
+		if read is None:
+			return True		# A stream which does not block has nothing to read yet
+		if not read:
+			return False
+		self.filled += read
+		if self.filled == self.frame_size:
+			self.filled = 0
+			with self.cond:
+				if self.fresh:
+					self.coalesced += 1
+				self.back, self.latest = self.latest, self.back
+				self.fresh = True
+				self.frames_read += 1
+				self.cond.notify_all()
+		return True
+
+	def close(self):
+		"""
+		Closes the stream if it was opened from a path, and marks the stream as ended
+		"""
+		if self.stream is not None and self.stream is not self.source:
+			self.stream.close()
+		with self.cond:
+			self.done = True
+			self.cond.notify_all()
+
+	def run(self):
+		"""
+		Reads frames until the stream ends
+		"""
+		try:
+			self.open()
+			while self.feed():
+				pass
+		finally:
+			self.close()
+
+	def take(self, cancel=None, deadline=None, clock=None):
+		"""
+		Returns the newest frame not yet taken, blocking until one is read
+
+		The frame returned is only valid until the next call.
+
+		Keyword arguments:
+		cancel -- a threading.Event which, once set, stops waiting
+		deadline -- the time, on the clock, to stop waiting at, or None to wait until a frame is read
+		clock -- the clock the deadline is kept against, defaults to the monotonic wall clock
+
+		Returns the frame, or None if the stream ended, or the wait was cancelled or ran past the deadline
+		"""
+		clock = clock if clock is not None else MONOTONIC
+		with self.cond:
+			while not self.fresh and not self.done:
+				if cancel is not None and cancel.is_set():
+					return None
+				if deadline is not None and clock.now() > deadline:
+					return None
+				self.cond.wait(POLL_INTERVAL)
+			return self.poll()
+
+	def poll(self):
+		"""
+		Returns the newest frame not yet taken without waiting, or None if there is none
+
+		The frame returned is only valid until the next call of poll or take.
+		"""
+		with self.cond:
+			if not self.fresh:
+				return None
+			self.front, self.latest = self.latest, self.front
+			self.fresh = False
+			return self.front
+
+	def is_finished(self) -> bool:
+		"""
+		Returns true if the stream ended and every frame read has been taken
+		"""
+		with self.cond:
+			return self.done and not self.fresh
+
+def stream_frames(source, fps=DEFAULT_FPS, pixel_order="RGB", duration=None, clock=None, cancel=None, strip=None, engine=None):
+	"""
+	Shows frames read from a stream on the LED strip until the stream ends
+
+	A frame is three bytes of packed pixel values for each pixel on the strip. Frames are shown as
+	soon as they arrive, but no more than fps times per second, and any frame
+	overtaken by a newer one before it could be shown is skipped.
+
+	Keyword arguments:
+	source -- a binary file object, a path to a file or FIFO, or "-" for stdin
+	fps -- the maximum number of frames to show per second
+	pixel_order -- the channel order of the stream's pixels (e.g. "GRB")
+	duration -- the time in seconds to stream for, or None to stream until the source ends
+	clock -- the clock to time the frames against, defaults to the monotonic wall clock
+	cancel -- a threading.Event which, once set, stops the stream
+	strip -- the name of the strip to show the frames on, defaults to the default strip
+	engine -- an engine.Engine to stream on instead, in which case the coroutine to start on it is returned (see stream_on)
+
+	Returns the timing statistics of the frame scheduler that showed the frames
+	"""
+	if fps <= 0:
+		raise ValueError(f"Stream fps must be greater than 0, got {fps}")
+	if pixel_order not in PIXEL_ORDERS:
+		raise ValueError(f"Unknown pixel order '{pixel_order}'. See options: {PIXEL_ORDERS}")
+
+	frame_size = get_backend(strip).count * 3
+	reader = FrameReader(source, frame_size)
+	if engine is not None:
+		return stream_on(engine, reader, fps=fps, pixel_order=pixel_order, duration=duration, strip=strip)
+	rgb = bytearray(frame_size)
+
+	def show_latest():
+		frame = reader.take(cancel, deadline=deadline, clock=timer.clock)
+		if frame is None:
+			return
+		if pixel_order != "RGB":
+			frame = reorder(frame, pixel_order, out=rgb)
+		write_frame(frame, strip=strip)
+		show_pixels(strip=strip)
+
+	timer = FrameScheduler(1 / fps, show_latest, clock=clock, cancel=cancel)
+	deadline = timer.start_time + duration if duration is not None else None	# Kept while waiting on a stalled producer too
+	reader.start()
+
+	while not reader.is_finished() and not timer.is_cancelled() and (duration is None or timer.get_runtime() <= duration):
+		timer.update()
+
+	return timer.get_stats()
+
+async def stream_on(engine, reader, fps=DEFAULT_FPS, pixel_order="RGB", duration=None, strip=None):
+	"""
+	Shows the frames of a FrameReader on the LED strip as a task of an engine, until the stream ends
+
+	The stream is read on the engine's event loop whenever it has data, rather than
+	on a thread, and the newest frame is shown at the engine's ticks, no more than fps
+	times per second. A regular file, which is always ready to read, is read one frame
+	per frame shown instead.
+
+	Keyword arguments:
+	engine -- the engine.Engine to read the stream on
+	reader -- the FrameReader of the stream, it must not be started
+	fps -- the maximum number of frames to show per second
+	pixel_order -- the channel order of the stream's pixels (e.g. "GRB")
+	duration -- the time in seconds to stream for, or None to stream until the source ends
+	strip -- the name of the strip to show the frames on, defaults to the default strip
+
+	Returns the timing statistics of the frames shown
+	"""
+	stats = SchedulerStats()
+	rgb = bytearray(reader.frame_size)
+	stream = reader.open(blocking=False)
+
+	def receive():
+		if not reader.feed():
+			engine.remove_reader(stream)
+			reader.close()
+
+	try:
+		try:
+			engine.add_reader(stream, receive)
+			polled = False
+		except PermissionError:	# Regular files cannot be waited on, as they always have data to read
+			polled = True
+
+		rate = fps / engine.fps
+		owed = 1.0
+		started = engine.clock.now()
+		while not reader.is_finished() and (duration is None or engine.clock.now() - started <= duration):
+			if owed >= 1:
+				while polled and not reader.fresh:
+					if not reader.feed():
+						reader.close()
+						break
+				frame = reader.poll()
+				if frame is not None:
+					owed -= 1
+					if pixel_order != "RGB":
+						frame = reorder(frame, pixel_order, out=rgb)
+					engine.write(frame, strip=strip)
+					stats.record(engine.lateness)
+			await engine.next_tick()
+			owed = min(1.0, owed + rate)	# A stalled producer does not earn a burst of frames once it resumes
+	finally:
+		engine.remove_reader(stream)
+		reader.close()
+	return stats
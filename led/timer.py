@@ -1,34 +1,115 @@
 """
 timer.py
 
-This module introduces an abstraction for a repeating timer which can
-perform actions over a given interval using time.monotonic
+This module introduces a frame scheduler which can perform actions over a
+given interval using time.monotonic, or an injected clock, while accounting
+for drift, overruns, and jitter in when each action runs
 """
-import time
+from dataclasses import dataclass, field
+from .clock import MONOTONIC
 
-class RepeatingTimer:
+CATCH_UP = "catch-up"
+"""Overrun policy where frames that fell behind run back to back until the schedule is caught up"""
+
+SKIP = "skip"
+"""Overrun policy where frames that fell behind are skipped and the schedule resumes at the next deadline"""
+
+POLICIES = (CATCH_UP, SKIP)
+
+DEFAULT_SPIN = 0.001
+"""The time in seconds before a deadline that the scheduler stops sleeping and spins, for sub-millisecond accuracy"""
+
+JITTER_BUCKETS = (0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02)
+"""The upper bounds in seconds of each bucket of the lateness histogram, with a final bucket for anything later"""
+
+@dataclass(slots=True)
+class SchedulerStats:
 	"""
-	This class defines the capabilities for a repeating timer which takes an action
-	and performs it at an interval
+	Represents the timing statistics of a frame scheduler
+
+	This object:
+		- Counts the frames run, the deadlines missed, and the frames skipped
+		- Stores the maximum lateness of a frame
+		- Stores a histogram of frame lateness bucketed by JITTER_BUCKETS
+	"""
+	frames: int = 0			# The number of times the action has run
+	missed: int = 0			# The number of frames whose action overran the next frame's deadline
+	skipped: int = 0		# The number of frames skipped by the SKIP policy
+	max_lateness: float = 0.0	# The most seconds any frame started after its deadline
+	jitter: list[int] = field(default_factory=lambda: [0] * (len(JITTER_BUCKETS) + 1))
+
+	def record(self, lateness):
+		"""
+		Records the lateness of a frame
+
+		Keyword arguments:
+		lateness -- the time in seconds the frame started after its deadline
+		"""
+		self.frames += 1
+		if lateness > self.max_lateness:
+			self.max_lateness = lateness
+
+		for i, bound in enumerate(JITTER_BUCKETS):
+			if lateness < bound:
+				self.jitter[i] += 1
+				return
+		self.jitter[-1] += 1
+
+def wait_until(deadline, spin=DEFAULT_SPIN):
+	"""
+	Blocks until a deadline, sleeping for most of the wait and spinning through the end of it
+
+	Keyword arguments:
+	deadline -- the time.monotonic value to wait until
+	spin -- the time in seconds before the deadline to stop sleeping and spin
+	"""
+	MONOTONIC.wait_until(deadline, spin=spin)
+
+class FrameScheduler:
 	"""
-	start_time = time.monotonic()
-	next_update = start_time
-	interval = 1
-	action = None
+	This class defines the capabilities for a frame scheduler which takes an action
+	and performs it at an interval
 
-	def __init__(self, interval=1, action=None):
+	Each scheduler keeps its own epoch from when it was created or reset, notices
+	when an action overruns its interval, and applies a catch-up or skip policy
+	rather than falling further behind.
+	"""
+	def __init__(self, interval=1, action=None, policy=SKIP, spin=DEFAULT_SPIN, clock=None, cancel=None):
 		"""
-		Initialize the repeating timer
+		Initialize the frame scheduler
 
 		Keyword arguments:
 		interval -- the interval of time over which to wait to repeat a function
 		action -- the function of the action to be repeated over an interval
+		policy -- the overrun policy (CATCH_UP or SKIP) applied when the schedule falls behind
+		spin -- the time in seconds before each deadline to stop sleeping and spin
+		clock -- the clock to time frames against, defaults to the monotonic wall clock
+		cancel -- a threading.Event which, once set, cuts short the wait for the next frame
 		"""
+		if policy not in POLICIES:
+			raise ValueError(f"Unknown scheduler policy '{policy}'. See options: {POLICIES}")
+		self.action = None
+		self.policy = policy
+		self.spin = spin
+		self.clock = clock if clock is not None else MONOTONIC
+		self.cancel = cancel
 		self.set_interval(interval)
 
 		if action is not None:
 			self.set_action(action)
 
+		self.reset()
+
+	def reset(self):
+		"""
+		Restarts the scheduler's epoch and statistics from the current time
+		"""
+		self.start_time = self.clock.now()
+		self.epoch = self.start_time	# Deadlines are counted in whole intervals from the epoch, so they never drift
+		self.ticks = 0
+		self.next_update = self.start_time
+		self.stats = SchedulerStats()
+
 	def set_action(self, action):
 		"""
 		Sets the action to be performed for an instance of this class
@@ -52,6 +133,9 @@ class RepeatingTimer:
 		if interval <= 0:
 			raise ValueError(f"Timer interval must be a time greater than 0 seconds")
 		self.interval = interval
+		if hasattr(self, "next_update"):
+			self.epoch = self.next_update
+			self.ticks = 0
 
 	def get_interval(self):
 		"""
@@ -63,19 +147,48 @@ class RepeatingTimer:
 		"""
 		Returns the current runtime of the timer object
 		"""
-		return time.monotonic() - self.start_time
+		return self.clock.now() - self.start_time
+
+	def is_cancelled(self) -> bool:
+		"""
+		Returns true if the scheduler's cancel event has been set
+		"""
+		return self.cancel is not None and self.cancel.is_set()
+
+	def get_stats(self) -> SchedulerStats:
+		"""
+		Returns the timing statistics of the scheduler
+		"""
+		return self.stats
 
 	def update(self):
 		"""
-		Updates the timer to perform a set action during a set interval
+		Performs the set action for the current frame and waits until the next frame's deadline
 		"""
-		self.next_update += self.interval
+		self.clock.wait_until(self.step(), spin=self.spin, cancel=self.cancel)
 
+	def step(self) -> float:
+		"""
+		Performs the set action for the current frame without waiting, and returns the next frame's deadline
+		"""
 		if self.action is None:
 			raise RuntimeError("No action was provided")
-		else:
-			self.action()
 
-		sleep_time = self.next_update - time.monotonic()
-		if sleep_time > 0:
-			time.sleep(sleep_time)
+		self.stats.record(max(0.0, self.clock.now() - self.next_update))
+		self.action()
+		self.ticks += 1
+		self.next_update = self.epoch + self.ticks * self.interval
+
+		behind = self.clock.now() - self.next_update
+		if behind > 0:
+			self.stats.missed += 1
+			if self.policy == SKIP:
+				skipped = int(behind // self.interval) + 1
+				self.ticks += skipped
+				self.next_update = self.epoch + self.ticks * self.interval
+				self.stats.skipped += skipped
+
+		return self.next_update
+
+RepeatingTimer = FrameScheduler
+"""The original name of the frame scheduler"""
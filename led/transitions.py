@@ -0,0 +1,153 @@
+"""
+transitions.py
+
+Crossfade transitions for the LED controller system.
+
+This module fades from one frame to another over a number of steps, shaped
+by an easing curve. The mixing is fixed-point: the level of each step is
+precomputed as an integer out of LEVELS, and each channel is mixed as
+(a * (LEVELS - level) + b * level + LEVELS // 2) >> 8. For bytearray frames
+the channels are spread into the 16-bit lanes of one Python integer, so a
+step of a whole frame is two big-integer multiplies, done in C, rather than
+a loop over the pixels. NumPy frames are mixed with uint16 arrays instead.
+"""
+from . import pipeline, render
+from .controller import read_frame
+
+DEFAULT_FPS = 60
+"""The number of frames per second transitions are shown at"""
+
+LEVELS = 256
+"""The fixed-point denominator of a mix level, a level of LEVELS shows only the target"""
+
+LINEAR = "linear"
+"""Easing where the fade moves at a constant rate"""
+
+EASE_IN = "ease-in"
+"""Easing where the fade starts slowly and speeds up"""
+
+EASE_OUT = "ease-out"
+"""Easing where the fade starts quickly and slows down"""
+
+EASE_IN_OUT = "ease-in-out"
+"""Easing where the fade starts and ends slowly"""
+
+EASINGS = {
+	LINEAR: lambda t: t,
+	EASE_IN: lambda t: t * t,
+	EASE_OUT: lambda t: t * (2 - t),
+	EASE_IN_OUT: lambda t: t * t * (3 - 2 * t),
+}
+
+def ease_levels(steps, easing=LINEAR) -> list[int]:
+	"""
+	Returns the fixed-point mix level (0 to LEVELS) of each step of a fade, the last step being LEVELS
+
+	Keyword arguments:
+	steps -- the number of frames the fade lasts
+	easing -- the easing curve (LINEAR, EASE_IN, EASE_OUT or EASE_IN_OUT)
+	"""
+	if easing not in EASINGS:
+		raise ValueError(f"Unknown easing '{easing}'. See options: {tuple(EASINGS)}")
+	curve = EASINGS[easing]
+	return [round(curve(step / steps) * LEVELS) for step in range(1, steps + 1)]
+
+def spread(data) -> int:
+	"""
+	Returns the bytes of a frame spread into the 16-bit lanes of one integer, the first byte in the lowest lane
+
+	Keyword arguments:
+	data -- a bytes-like object, or a frame
+	"""
+	data = memoryview(data).cast("B")
+	lanes = bytearray(data.nbytes * 2)
+	lanes[0::2] = data
+	return int.from_bytes(lanes, "little")
+
+class Mixer:
+	"""
+	Represents a source frame being mixed into a target frame at fixed-point levels
+
+	This object:
+		- Prepares both frames once, so each step of a fade is only the mix
+		- Mixes bytearray frames in the 16-bit lanes of integers, and NumPy frames in uint16 arrays
+		- Mixes into one output frame, which is only valid until the next mix
+	"""
+	def __init__(self, source, target):
+		"""
+		Initialize the mixer
+
+		Keyword arguments:
+		source -- the frame shown at level 0
+		target -- the frame shown at level LEVELS, the output frame is of its type
+		"""
+		self.size = memoryview(source).nbytes
+		if memoryview(target).nbytes != self.size:
+			raise ValueError(f"Cannot mix a frame of {self.size // 3} pixels with a frame of {memoryview(target).nbytes // 3} pixels")
+		self.is_array = render.is_array(target)
+		self.out = render.copy_frame(target)
+		if self.is_array:
+			self.source = render.new_frame(source=bytes(memoryview(source).cast("B")), use_numpy=True).astype(render.np.uint16)
+		else:
+			self.source = spread(source)
+			self.half = spread(bytes([LEVELS // 2]) * self.size)	# Rounds each lane to the nearest value
+		self.set_target(target)
+
+	def set_target(self, target):
+		"""
+		Replaces the target frame
+
+		Keyword arguments:
+		target -- the frame shown at level LEVELS
+		"""
+		self.target = target.astype(render.np.uint16) if self.is_array else spread(target)
+
+	def mix(self, level):
+		"""
+		Returns the mix of the source and target frames at a level
+
+		Keyword arguments:
+		level -- the fixed-point level (0 to LEVELS) of the target in the mix
+		"""
+		if self.is_array:
+			mixed = self.source * (LEVELS - level) + self.target * level + LEVELS // 2
+			self.out[:] = mixed >> 8
+		else:
+			# Every lane stays below 255 * 256 + 128, so no lane carries into the next
+			lanes = (self.source * (LEVELS - level) + self.target * level + self.half).to_bytes(self.size * 2, "little")
+			self.out[:] = lanes[1::2]
+		return self.out
+
+def crossfade(source, target, steps, easing=LINEAR):
+	"""
+	Yields the frames of a fade from a source frame to a target frame, ending on the target
+
+	Keyword arguments:
+	source -- the frame to fade from
+	target -- the frame to fade to
+	steps -- the number of frames the fade lasts
+	easing -- the easing curve (LINEAR, EASE_IN, EASE_OUT or EASE_IN_OUT)
+	"""
+	mixer = Mixer(source, target)
+	for level in ease_levels(steps, easing):
+		yield mixer.mix(level)
+
+def fade_to(frame, duration, easing=LINEAR, fps=DEFAULT_FPS, clock=None, cancel=None, strip=None, engine=None):
+	"""
+	Fades the LED strip from its current contents to a frame
+
+	Keyword arguments:
+	frame -- the frame to fade to
+	duration -- the time in seconds the fade lasts
+	easing -- the easing curve (LINEAR, EASE_IN, EASE_OUT or EASE_IN_OUT)
+	fps -- the number of frames per second to show the fade at
+	clock -- the clock to time the fade against, defaults to the monotonic wall clock
+	cancel -- a threading.Event which, once set, stops the fade
+	strip -- the name of the strip, defaults to the default strip
+	engine -- an engine.Engine to run the fade on instead, in which case the coroutine to start on it is returned
+
+	Returns the timing statistics of the frame scheduler that ran the fade
+	"""
+	steps = max(1, round(duration * fps))
+	frames = crossfade(read_frame(strip=strip), frame, steps, easing)
+	return pipeline.run(frames, fps=fps, clock=clock, cancel=cancel, strip=strip, engine=engine)
@@ -0,0 +1,14 @@
+"""
+conftest.py
+
+Shared helpers for the unit tests
+
+This module holds the helpers used across several test modules,
+so each module imports them rather than defining its own copy.
+"""
+
+def to_bytes(frame) -> bytes:
+	"""
+	Returns the packed RGB values held in a frame of either type
+	"""
+	return bytes(memoryview(frame).cast("B"))
@@ -0,0 +1,221 @@
+"""
+test_backends.py
+
+Unit tests for the LED output backends
+
+This module verifies that the simulated backend holds
+the expected frame, counts shows, and that the controller
+draws through whichever backend it is given.
+"""
+import threading
+import pytest
+from array import array
+from led import controller
+from led.backends import SimulatedBackend, create_backend
+from led.colors import COLORS, OFF
+
+COUNT = 10
+
+@pytest.fixture
+def backend():
+	"""
+	Provides a fresh simulated backend installed on the controller
+	"""
+	b = SimulatedBackend(count=COUNT)
+	controller.set_backend(b)
+	yield b
+	controller.set_backend(None)
+
+def test_simulated_backend_starts_off(backend):
+	"""
+	Tests that a new simulated backend holds a blank frame and has not been shown
+	"""
+	assert backend.buf == bytearray(COUNT * 3)
+	assert backend.show_count == 0
+
+def test_simulated_backend_fill(backend):
+	"""
+	Tests that filling the backend sets every pixel in the frame
+	"""
+	backend.fill(COLORS["red"])
+
+	assert all(backend.get_pixel(i) == COLORS["red"] for i in range(COUNT))
+
+@pytest.mark.parametrize("index", [0, 4, COUNT - 1])
+def test_simulated_backend_set_pixel(backend, index):
+	"""
+	Tests that setting a pixel only changes that pixel
+	"""
+	backend.set_pixel(index, COLORS["blue"])
+
+	for i in range(COUNT):
+		assert backend.get_pixel(i) == (COLORS["blue"] if i == index else OFF)
+
+def test_simulated_backend_packed_colors(backend):
+	"""
+	Tests that packed colors are drawn as their RGB values, and read back as tuples
+	"""
+	backend.fill(0x00FF00)
+	backend.set_pixel(1, 0x0000FF)
+
+	assert backend.get_pixel(0) == COLORS["green"]
+	assert backend.get_pixel(1) == COLORS["blue"]
+
+@pytest.mark.parametrize("index", [-1, COUNT, COUNT + 5])
+def test_simulated_backend_set_pixel_out_of_range(backend, index):
+	"""
+	Tests that an index off of the strip throws an IndexError and does not grow the frame
+	"""
+	with pytest.raises(IndexError):
+		backend.set_pixel(index, COLORS["blue"])
+	assert len(backend.buf) == COUNT * 3
+
+def test_simulated_backend_show(backend):
+	"""
+	Tests that show records the current frame and counts the call
+	"""
+	backend.fill(COLORS["green"])
+	assert backend.shown == bytes(COUNT * 3)
+
+	backend.show()
+
+	assert backend.shown == bytes(COLORS["green"]) * COUNT
+	assert backend.show_count == 1
+
+def test_controller_draws_through_backend(backend):
+	"""
+	Tests that the controller functions write to the installed backend
+	"""
+	controller.fill_color(COLORS["white"])
+	controller.fill_single(index=0, color=COLORS["red"])
+	controller.fill_range(color=COLORS["blue"], length=range(5, 8))
+	controller.set_brightness(0.25)
+	controller.show_pixels()
+
+	assert backend.get_pixel(0) == COLORS["red"]
+	assert backend.get_pixel(1) == COLORS["white"]
+	assert [backend.get_pixel(i) for i in range(5, 8)] == [COLORS["blue"]] * 3
+	assert backend.brightness == 0.25
+	assert backend.show_count == 1
+
+def test_create_backend_unknown_name():
+	"""
+	Tests that an unknown backend name throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		create_backend("invalid")
+
+@pytest.mark.parametrize("frame", [
+	bytes(COLORS["red"]) * 3,
+	bytearray(COLORS["red"]) * 3,
+	memoryview(bytes(COLORS["red"]) * 3),
+	array("B", COLORS["red"] * 3)
+])
+def test_write_frame_bulk_copy(backend, frame):
+	"""
+	Tests that any bytes-like frame of packed colors is copied into place
+	"""
+	controller.write_frame(frame, start=2)
+
+	assert [backend.get_pixel(i) for i in range(COUNT)] == [OFF] * 2 + [COLORS["red"]] * 3 + [OFF] * (COUNT - 5)
+
+@pytest.mark.parametrize("frame, start, exception", [
+	(bytes(4), 0, ValueError),
+	(bytes(3 * COUNT), 1, IndexError),
+	(bytes(3), -1, IndexError),
+	(bytes(3), COUNT, IndexError)
+])
+def test_write_frame_invalid(backend, frame, start, exception):
+	"""
+	Tests that frames that are misaligned or do not fit on the strip are rejected
+	"""
+	with pytest.raises(exception):
+		controller.write_frame(frame, start=start)
+	assert len(backend.buf) == COUNT * 3
+
+def test_read_frame(backend):
+	"""
+	Tests that reading a block of pixels returns their packed colors
+	"""
+	controller.fill_single(index=3, color=COLORS["cyan"])
+
+	assert controller.read_frame(start=3, stop=5) == bytes(COLORS["cyan"]) + bytes(OFF)
+
+def test_show_skips_unchanged_frame(backend):
+	"""
+	Tests that showing a frame that has not changed since the last show is skipped and counted
+	"""
+	controller.fill_color(COLORS["red"])
+	assert controller.show_pixels() == True
+
+	controller.fill_color(COLORS["red"])
+	controller.write_frame(bytes(COLORS["red"]) * 2, start=4)
+	controller.fill_single(index=0, color=COLORS["red"])
+
+	assert controller.show_pixels() == False
+	assert backend.show_count == 1
+	assert controller.get_show_stats().pushed == 1
+	assert controller.get_show_stats().skipped == 1
+
+@pytest.mark.parametrize("write, expected", [
+	(lambda: controller.fill_single(index=2, color=COLORS["red"]), (2, 3)),
+	(lambda: controller.write_frame(bytes(COLORS["red"]) * 3, start=4), (4, 7)),
+	(lambda: controller.fill_range(color=COLORS["red"], length=range(1, 3)), (1, 3)),
+	(lambda: controller.fill_color(COLORS["red"]), (0, COUNT)),
+	(lambda: controller.set_brightness(0.1), (0, COUNT)),
+	(lambda: controller.set_color_correction(gamma=2.8), (0, COUNT))
+])
+def test_dirty_span(backend, write, expected):
+	"""
+	Tests that writes mark only the span of pixels they changed as dirty
+	"""
+	controller.show_pixels()
+
+	write()
+
+	assert backend.dirty == expected
+
+def test_show_shortens_push_to_dirty_span(backend):
+	"""
+	Tests that a show only sends pixels up to the last changed pixel
+	"""
+	controller.show_pixels()
+	controller.fill_single(index=3, color=COLORS["red"])
+	controller.fill_single(index=1, color=COLORS["red"])
+
+	controller.show_pixels()
+
+	assert controller.get_show_stats().pixels_pushed == COUNT + 4
+	assert backend.get_pixel(3) == COLORS["red"]
+	assert backend.shown[3 * 3:4 * 3] == bytes(COLORS["red"])
+
+def test_correction_waits_for_frame_being_sent():
+	"""
+	Tests that changing the correction or power limit from another thread waits for the frame being sent through them
+	"""
+	sending = threading.Event()
+	release = threading.Event()
+
+	class SlowBackend(SimulatedBackend):
+		def push(self, frame, stop):
+			sending.set()
+			release.wait(timeout=5)
+			tables = self.correction.get_output_tables()	# The tables must not change while the frame is sent
+			super().push(frame, stop)
+			self.sent_tables = tables
+
+	b = SlowBackend(count=COUNT)
+	sender = threading.Thread(target=b.send, args=(b.buf, COUNT))
+	sender.start()
+	sending.wait(timeout=5)
+	before = b.correction.get_output_tables()
+	setter = threading.Thread(target=lambda: (b.set_correction(gamma=1.8), b.set_power_limit(100)))
+	setter.start()
+	setter.join(timeout=0.1)
+
+	assert setter.is_alive()
+	release.set()
+	sender.join(timeout=5)
+	setter.join(timeout=5)
+	assert b.sent_tables == before
+	assert b.correction.gamma == 1.8 and b.power.limit == 100
@@ -9,6 +9,7 @@ for the main entry point.
 import pytest
 from cli.__main__ import main
 from cli.exit_codes import ExitCode
+from led.config import LED_COUNT
 
 @pytest.mark.parametrize("flags", [
 	(["--off"]),
@@ -35,3 +36,108 @@ def test_cli_invalid_time_return_invalid(flags):
 	Tests that invalid times for interval or duration will return invalid input
 	"""
 	assert main(flags) == ExitCode.INVALID_INPUT
+
+def test_cli_invalid_fps_return_invalid():
+	"""
+	Tests that a stream fps of 0 or less will return invalid input
+	"""
+	assert main(["--stream", "--fps", "0"]) == ExitCode.INVALID_INPUT
+
+def test_cli_stream_file_returns_success(tmp_path):
+	"""
+	Tests that streaming frames from a file returns successful once the file ends
+	"""
+	path = tmp_path / "frames.bin"
+	path.write_bytes(bytes(LED_COUNT * 3) * 2)
+
+	assert main(["--local", "--stream", str(path)]) == ExitCode.SUCCESS
+
+def test_cli_receive_returns_success(capsys):
+	"""
+	Tests that receiving frames returns successful once the duration ends
+	"""
+	assert main(["--local", "--receive", "ddp", "--duration", "0.1", "--stats"]) == ExitCode.SUCCESS
+	assert "Packets: 0" in capsys.readouterr().out
+
+def test_cli_record_and_play_return_success(tmp_path):
+	"""
+	Tests that recording a timed effect and playing it back return successful
+	"""
+	path = str(tmp_path / "show.led")
+
+	assert main(["--local", "--chase", "--color", "r", "--span", "4", "--spacing", "4", "--duration", "1", "--record", path]) == ExitCode.SUCCESS
+	assert main(["--local", "--play", path, "--seek", "0.9"]) == ExitCode.SUCCESS
+
+def test_cli_record_gradient_returns_success(tmp_path):
+	"""
+	Tests that a gradient can be recorded as a timed effect
+	"""
+	path = str(tmp_path / "gradient.led")
+
+	assert main(["--local", "--gradient", "fire", "--duration", "1", "--record", path]) == ExitCode.SUCCESS
+	assert main(["--local", "--play", path, "--seek", "0.9"]) == ExitCode.SUCCESS
+
+@pytest.mark.parametrize("flags", [
+	(["--fill", "--record", "show.led"]),
+	(["--play", "missing.led"]),
+	(["--play", "missing.led", "--seek", "-1"])
+])
+def test_cli_invalid_recording_return_invalid(flags):
+	"""
+	Tests that recording without a timed effect, or playing a missing recording, will return invalid input
+	"""
+	assert main(flags) == ExitCode.INVALID_INPUT
+
+def test_cli_unknown_strip_return_invalid():
+	"""
+	Tests that acting on a strip which is not configured will return invalid input
+	"""
+	assert main(["--fill", "--color", "r", "--strip", "missing"]) == ExitCode.INVALID_INPUT
+
+def test_cli_layers_return_success():
+	"""
+	Tests that running effects in layers returns successful once the duration ends
+	"""
+	flags = ["--local", "--duration", "0.2",
+		"--layer", "--fill --color g",
+		"--layer", "--blink --color r --range 0 20 --interval 0.1",
+		"--layer", "--chase --color b --range 30 60 --blend add --opacity 0.5"]
+
+	assert main(flags) == ExitCode.SUCCESS
+
+@pytest.mark.parametrize("layer", [
+	("--color r"),
+	("--blink --opacity 2"),
+	("--chase --blend screen"),
+	("--blink --interval 0")
+])
+def test_cli_invalid_layer_return_invalid(layer):
+	"""
+	Tests that a layer without an effect, or with an invalid blend, opacity or interval, will return invalid input
+	"""
+	assert main(["--local", "--layer", layer]) == ExitCode.INVALID_INPUT
+
+@pytest.mark.parametrize("flags", [
+	(["--gamma", "0"]),
+	(["--temperature", "100"]),
+	(["--power-limit", "1"])
+])
+def test_cli_invalid_correction_return_invalid(flags):
+	"""
+	Tests that a gamma of 0 or less, a color temperature out of range, or a power limit the strip draws while dark, will return invalid input
+	"""
+	assert main(["--local", "--fill", *flags]) == ExitCode.INVALID_INPUT
+
+def test_cli_fade_returns_success():
+	"""
+	Tests that fading into a fill returns successful, and a negative fade returns invalid input
+	"""
+	assert main(["--local", "--fill", "--color", "b", "--fade", "0.05", "--easing", "ease-in-out"]) == ExitCode.SUCCESS
+	assert main(["--local", "--fill", "--color", "b", "--fade", "-1"]) == ExitCode.INVALID_INPUT
+
+def test_cli_gradient_returns_success():
+	"""
+	Tests that scrolling a gradient, alone or in a layer, returns successful once the duration ends
+	"""
+	assert main(["--local", "--gradient", "rainbow", "--interval", "0.05", "--duration", "0.1"]) == ExitCode.SUCCESS
+	assert main(["--local", "--duration", "0.1", "--layer", "--gradient fire --range 0 10"]) == ExitCode.SUCCESS
@@ -27,7 +27,9 @@ def test_default_color_palette(function):
 	("span_primary", "invalid"),
 	("span_secondary", "invalid"),
 	("spacing_primary", "invalid"),
-	("spacing_secondary", "invalid")
+	("spacing_secondary", "invalid"),
+	("span_primary", 0x1000000),
+	("span_primary", -1)
 ])
 def test_color_palette_invalid_colors(field, value):
 	"""
@@ -35,3 +37,12 @@ def test_color_palette_invalid_colors(field, value):
 	"""
 	with pytest.raises(ValueError):
 		ColorPalette(**{field: value})
+
+def test_color_palette_packed_colors():
+	"""
+	Tests that a palette keeps packed 24-bit colors as they are given
+	"""
+	p = ColorPalette(span_primary=0xFF8000, spacing_primary=0)
+
+	assert p.get_span_primary() == 0xFF8000
+	assert p.get_space_primary() == 0
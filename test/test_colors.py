@@ -7,7 +7,7 @@ This module verifies that valid colors resolve
 correctly and invalid colors throw exceptions
 """
 import pytest
-from led.colors import COLORS, OFF, is_valid_color, resolve_color
+from led.colors import COLORS, OFF, is_valid_color, resolve_color, parse_color, pack_color, unpack_color, color_bytes
 
 @pytest.mark.parametrize("test_value,expected", [
 	(["r"], COLORS["red"]),
@@ -22,10 +22,46 @@ def test_valid_colors(test_value, expected):
 	"""
 	assert resolve_color(test_value) == expected
 
+@pytest.mark.parametrize("test_value,expected", [
+	(["orange"], (255, 165, 0)),
+	(["RebeccaPurple"], (102, 51, 153)),
+	(["lime"], COLORS["green"]),
+	(["#FF8800"], (255, 136, 0)),
+	(["#f80"], (255, 136, 0)),
+	(["10,20,30"], (10, 20, 30)),
+	(["hsv(120, 100%, 50%)"], (0, 128, 0)),
+	(["hsv(120,", "100%,", "50%)"], (0, 128, 0)),
+	(["hsl(480deg, 100%, 25%)"], (0, 128, 0)),
+	(["6600K"], COLORS["white"]),
+	("cyan", COLORS["cyan"])
+])
+def test_color_formats(test_value, expected):
+	"""
+	Takes colors in each supported format and asserts that they equal an expected result
+	"""
+	assert resolve_color(test_value) == expected
+
+def test_resolve_color_is_cached():
+	"""
+	Tests that a color string resolved again is served from the cache rather than parsed
+	"""
+	parse_color.cache_clear()
+
+	resolve_color(["hsv(10, 20%, 30%)"])
+	resolve_color(["hsv(10,", "20%,", "30%)"])
+
+	assert parse_color.cache_info().hits == 1
+	assert parse_color.cache_info().misses == 1
+
 
 @pytest.mark.parametrize("value", [
 	(["invalid"]),
 	(["r", "g", "b"]),
+	(["#12345"]),
+	(["#+12345"]),
+	(["hsv(10, 120%, 50%)"]),
+	(["500K"]),
+	([]),
 	(None)
 ])
 def test_invalid_color_string(value):
@@ -48,3 +84,25 @@ def test_invalid_rgb_tuples(value):
 	Takes an invalid rgb tuple and verifies that is_valid_color returns False
 	"""
 	assert is_valid_color(value) == False
+
+@pytest.mark.parametrize("color, packed", [
+	(COLORS["red"], 0xFF0000),
+	(COLORS["cyan"], 0x00FFFF),
+	(OFF, 0),
+	((1, 2, 3), 0x010203)
+])
+def test_packed_colors(color, packed):
+	"""
+	Tests that colors pack into 24-bit ints and unpack back into the same tuple and bytes
+	"""
+	assert pack_color(color) == packed
+	assert unpack_color(packed) == color
+	assert color_bytes(packed) == color_bytes(color) == bytes(color)
+
+@pytest.mark.parametrize("value", [-1, 0x1000000])
+def test_invalid_packed_colors(value):
+	"""
+	Takes a packed int outside 24 bits and verifies that pack_color throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		pack_color(value)
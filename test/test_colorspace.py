@@ -0,0 +1,105 @@
+"""
+test_colorspace.py
+
+Unit tests for whole frame color space conversions
+
+This module verifies that converting frames between RGB and
+HSV or HSL stays within one step of colorsys, that the NumPy
+and pure Python paths produce the same bytes, and that hues
+rotate around the color wheel.
+"""
+import colorsys
+import itertools
+import random
+import pytest
+from led import colorspace, render
+from led.colors import COLORS
+from conftest import to_bytes
+
+PATHS = [
+	False,
+	pytest.param(True, marks=pytest.mark.skipif(not render.HAS_NUMPY, reason="NumPy is not installed"))
+]
+
+CONVERSIONS = [colorspace.rgb_to_hsv, colorspace.hsv_to_rgb, colorspace.rgb_to_hsl, colorspace.hsl_to_rgb]
+
+def sample_pixels():
+	"""
+	Returns a seeded sample of colors, with the grays and primaries the formulas branch on
+	"""
+	rng = random.Random(11)
+	return [tuple(rng.randrange(256) for _ in range(3)) for _ in range(3000)] + [(0, 0, 0), (255, 255, 255), (7, 7, 7), *COLORS.values()]
+
+def hue_distance(a, b) -> int:
+	"""
+	Returns the number of steps between two hues around the color wheel
+	"""
+	d = (a - b) % colorspace.HUE_STEPS
+	return min(d, colorspace.HUE_STEPS - d)
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+@pytest.mark.parametrize("convert, reference", [
+	(colorspace.rgb_to_hsv, colorsys.rgb_to_hsv),
+	(colorspace.rgb_to_hsl, lambda r, g, b: (lambda h, l, s: (h, s, l))(*colorsys.rgb_to_hls(r, g, b)))
+])
+def test_from_rgb_matches_colorsys(use_numpy, convert, reference):
+	"""
+	Tests that every channel converted from RGB is within one step of colorsys, ignoring the hue of grays
+	"""
+	pixels = sample_pixels()
+	out = to_bytes(convert(render.new_frame(source=bytes(itertools.chain.from_iterable(pixels)), use_numpy=use_numpy)))
+
+	for j, (r, g, b) in enumerate(pixels):
+		h, s, v = reference(r / 255, g / 255, b / 255)
+		hue, saturation, level = out[j * 3:j * 3 + 3]
+		assert abs(saturation - round(s * 255)) <= 1
+		assert abs(level - round(v * 255)) <= 1
+		if r != g or g != b:
+			assert hue_distance(hue, round(h * 256)) <= 1
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+@pytest.mark.parametrize("convert, reference", [
+	(colorspace.hsv_to_rgb, colorsys.hsv_to_rgb),
+	(colorspace.hsl_to_rgb, lambda h, s, l: colorsys.hls_to_rgb(h, l, s))
+])
+def test_to_rgb_matches_colorsys(use_numpy, convert, reference):
+	"""
+	Tests that every channel converted to RGB is within one step of colorsys
+	"""
+	pixels = sample_pixels()
+	out = to_bytes(convert(render.new_frame(source=bytes(itertools.chain.from_iterable(pixels)), use_numpy=use_numpy)))
+
+	for j, (h, s, v) in enumerate(pixels):
+		expected = [round(c * 255) for c in reference(h / 256, s / 255, v / 255)]
+		assert all(abs(a - b) <= 1 for a, b in zip(out[j * 3:j * 3 + 3], expected))
+
+@pytest.mark.skipif(not render.HAS_NUMPY, reason="NumPy is not installed")
+@pytest.mark.parametrize("convert", CONVERSIONS)
+def test_paths_are_bit_identical(convert):
+	"""
+	Tests that every conversion produces the same bytes on the NumPy and pure Python paths
+	"""
+	source = bytes(itertools.chain.from_iterable(sample_pixels()))
+
+	assert to_bytes(convert(render.new_frame(source=source, use_numpy=True))) == to_bytes(convert(render.new_frame(source=source, use_numpy=False)))
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+def test_rotate_hue(use_numpy):
+	"""
+	Tests that rotating by a third of the wheel turns each primary into the next, to within the steps of the wheel
+	"""
+	frame = render.new_frame(source=bytes(COLORS["red"] + COLORS["green"] + COLORS["blue"]), use_numpy=use_numpy)
+
+	colorspace.rotate_hue(frame, colorspace.HUE_STEPS // 3)
+
+	assert to_bytes(frame) == bytes((2, 255, 0, 0, 4, 255, 255, 0, 0))
+
+def test_hue_wheel():
+	"""
+	Tests that the hue wheel starts on red and holds one color per hue at the saturation and value given
+	"""
+	wheel = colorspace.hue_wheel(value=128)
+
+	assert len(wheel) == colorspace.HUE_STEPS * 3
+	assert wheel[:3] == bytes((128, 0, 0))
+	assert max(wheel) == 128
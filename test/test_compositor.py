@@ -0,0 +1,94 @@
+"""
+test_compositor.py
+
+Unit tests for the layered compositor
+
+This module verifies that layers are restricted to their
+PixelRange, blended in order onto the base frame, played at
+their own fps, and run on the strip until every layer finishes.
+"""
+import pytest
+from led import compositor, effects, render
+from led.backends import FrameSinkBackend
+from led.clock import VirtualClock
+from led.colors import COLORS, OFF
+from led.color_palette import ColorPalette
+from led.controller import using_backend
+from led.pixel_range import PixelRange
+from conftest import to_bytes
+
+COUNT = 10
+R = COLORS["red"]
+B = COLORS["blue"]
+
+def solid(color, count=COUNT):
+	"""
+	Returns a frame of a single color
+	"""
+	return render.new_frame(source=bytes(color) * count)
+
+def test_layers_restricted_to_range():
+	"""
+	Tests that each layer only changes the pixels of its range, over the base frame
+	"""
+	comp = compositor.Compositor(base=solid(OFF))
+	comp.add_layer(compositor.Layer([solid(R)], sel=PixelRange(start=0, end=3)))
+	comp.add_layer(compositor.Layer([solid(B)], sel=PixelRange(start=6, end=8)))
+
+	frame = next(comp.frames(fps=1))
+
+	assert to_bytes(frame) == bytes(R * 3 + OFF * 3 + B * 2 + OFF * 2)
+
+def test_layers_blend_in_order():
+	"""
+	Tests that a layer blends onto the layers beneath it by its mode and opacity
+	"""
+	comp = compositor.Compositor(base=solid((100, 0, 0)))
+	comp.add_layer(compositor.Layer([solid((0, 0, 200))], mode=render.ADD))
+	comp.add_layer(compositor.Layer([solid((0, 0, 0))], mode=render.ALPHA, opacity=0.5, sel=PixelRange(start=5)))
+
+	frame = next(comp.frames(fps=1))
+
+	assert to_bytes(frame) == bytes((100, 0, 200)) * 5 + bytes((50, 0, 100)) * 5
+
+def test_layer_fps_and_finish():
+	"""
+	Tests that a slower layer repeats its frames, and a finished layer keeps its last frame until all have finished
+	"""
+	comp = compositor.Compositor(base=solid(OFF, count=2))
+	comp.add_layer(compositor.Layer([solid(R, 2), solid(B, 2)], sel=PixelRange(start=0, end=1), fps=1))
+	comp.add_layer(compositor.Layer([solid(B, 2), solid(R, 2), solid(B, 2)], sel=PixelRange(start=1, end=2)))
+
+	frames = [to_bytes(f) for f in comp.frames(fps=2)]
+
+	assert frames == [bytes(R + B), bytes(R + R), bytes(B + B), bytes(B + B)]
+
+def test_invalid_layer():
+	"""
+	Tests that an unknown blend mode, or an opacity outside of 0 to 1, throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		compositor.Layer([], mode="screen")
+	with pytest.raises(ValueError):
+		compositor.Layer([], opacity=1.5)
+
+def test_run_effects_in_layers():
+	"""
+	Tests that a blink and a chase run side by side on the strip at their own rates
+	"""
+	clock = VirtualClock()
+	backend = FrameSinkBackend(count=COUNT, clock=clock)
+
+	with using_backend(backend):
+		comp = compositor.Compositor()
+		blink_sel = PixelRange(start=0, end=4)
+		chase_sel = PixelRange(start=6, end=10, span=2)
+		comp.add_layer(compositor.Layer(effects.blink_frames(ColorPalette(span_primary=R), blink_sel, base=comp.blank()), sel=blink_sel, fps=1))
+		comp.add_layer(compositor.Layer(effects.chase_frames(ColorPalette(span_primary=B), chase_sel, base=comp.blank()), sel=chase_sel, fps=2))
+		comp.run(fps=2, duration=1, clock=clock)
+
+	assert backend.frames == [
+		(0, bytes(OFF * 6 + B * 2 + OFF * 2)),
+		(0.5, bytes(OFF * 7 + B * 2 + OFF)),
+		(1, bytes(R * 4 + OFF * 4 + B * 2))
+	]
@@ -0,0 +1,103 @@
+"""
+test_controller.py
+
+Unit tests for the strip registry of the controller
+
+This module registers several simulated strips and verifies
+that controller functions, PixelRanges and effects act on the
+strip they are bound to, and that strips can be shown together.
+"""
+import pytest
+from led import controller, effects
+from led.backends import SimulatedBackend
+from led.colors import COLORS, OFF
+from led.color_palette import ColorPalette
+from led.config import LED_COUNT
+from led.offline import render_offline
+from led.pixel_range import PixelRange
+
+R = COLORS["red"]
+B = COLORS["blue"]
+
+@pytest.fixture
+def strips():
+	"""
+	Provides the default strip and two more strips of different lengths, all simulated
+	"""
+	backends = {None: SimulatedBackend(count=LED_COUNT), "left": SimulatedBackend(count=10), "right": SimulatedBackend(count=20)}
+	for name, backend in backends.items():
+		controller.set_backend(backend, strip=name)
+	yield backends
+	for name in backends:
+		controller.set_backend(None, strip=name)
+
+def test_unknown_strip():
+	"""
+	Tests that acting on a strip which is neither configured nor registered throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		controller.get_backend("missing")
+	with pytest.raises(ValueError):
+		PixelRange(strip="missing")
+
+def test_functions_act_on_their_strip(strips):
+	"""
+	Tests that controller functions only change the strip they are given
+	"""
+	controller.fill_color(R, strip="left")
+	controller.fill_single(0, B, strip="right")
+	controller.set_brightness(0.2, strip="right")
+
+	assert controller.read_frame(strip="left") == bytes(R) * 10
+	assert controller.read_frame(strip="right") == bytes(B) + bytes(OFF) * 19
+	assert controller.read_frame() == bytes(OFF) * LED_COUNT
+	assert strips["right"].brightness == 0.2
+	assert strips["left"].brightness != 0.2
+
+def test_fill_range_defaults_to_its_strip(strips):
+	"""
+	Tests that filling a range without one fills every pixel of the strip given, whatever its length
+	"""
+	controller.fill_range(R, strip="left")
+	controller.fill_range(B, strip="right")
+
+	assert controller.read_frame(strip="left") == bytes(R) * 10
+	assert controller.read_frame(strip="right") == bytes(B) * 20
+
+def test_range_clamps_to_its_strip(strips):
+	"""
+	Tests that a PixelRange defaults to, and is clamped to, the length of its strip
+	"""
+	assert PixelRange(strip="left").get_end() == 10
+	assert PixelRange(start=15, end=100, strip="right").get_range() == range(15, 20)
+	assert "left" in controller.get_strip_names()
+
+def test_effects_target_their_strip(strips):
+	"""
+	Tests that an effect draws to the strip its selection is bound to, including when rendered offline
+	"""
+	effects.apply_fill(palette=ColorPalette(span_primary=R), sel=PixelRange(start=5, strip="left"))
+
+	frames = render_offline(effects.blink_color, palette=ColorPalette(span_primary=B), sel=PixelRange(strip="right"), interval=1, duration=1)
+
+	assert strips["left"].shown == bytes(OFF) * 5 + bytes(R) * 5
+	assert frames[-1] == (1, bytes(B) * 20)
+	assert strips["right"].show_count == 0
+	assert strips[None].show_count == 0
+
+def test_show_strips_in_parallel(strips):
+	"""
+	Tests that showing strips pushes only those changed, through each strip's own output thread
+	"""
+	for name in ("left", "right"):
+		controller.start_output_thread(strip=name)
+	controller.show_strips()
+	controller.fill_color(R, strip="left")
+	controller.fill_color(B, strip="right")
+
+	assert controller.show_strips() == ["left", "right"]
+	for name in ("left", "right"):
+		controller.stop_output_thread(strip=name)
+
+	assert strips["left"].shown == bytes(R) * 10
+	assert strips["right"].shown == bytes(B) * 20
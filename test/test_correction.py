@@ -0,0 +1,94 @@
+"""
+test_correction.py
+
+Unit tests for color correction
+
+This module verifies that the lookup tables combine brightness,
+gamma and white point, are only rebuilt when one of them changes,
+and correct frames channel by channel.
+"""
+import pytest
+from led import controller
+from led.backends import SimulatedBackend
+from led.correction import ColorCorrection, IDENTITY, white_point_from_kelvin
+
+def test_identity_tables():
+	"""
+	Tests that full brightness, a linear gamma and a full white point leave colors as they are
+	"""
+	correction = ColorCorrection(brightness=1, gamma=1, white_point=(255, 255, 255))
+
+	assert correction.is_identity()
+	assert correction.apply(bytearray(b"\x00\x7f\xff")) == bytearray(b"\x00\x7f\xff")
+
+def test_tables_combine_corrections():
+	"""
+	Tests that gamma darkens mid values, brightness scales them, and each channel is scaled by the white point
+	"""
+	red, green, blue = ColorCorrection(brightness=0.5, gamma=2, white_point=(255, 128, 0)).get_tables()
+
+	assert red[255] == 128 and red[128] == 32 and red[0] == 0
+	assert green[255] == 64
+	assert blue == bytes(256)
+
+def test_tables_rebuilt_only_on_change():
+	"""
+	Tests that the tables are kept until a parameter changes, and channels with the same white point share a table
+	"""
+	correction = ColorCorrection(brightness=0.5, gamma=2.2, white_point=(255, 255, 200))
+	tables = correction.get_tables()
+
+	correction.set_brightness(0.5)
+	correction.set_white_point((255, 255, 200))
+	assert correction.get_tables() is tables
+	assert tables[0] is tables[1]
+
+	correction.set_gamma(2.8)
+	assert correction.get_tables() is not tables
+
+def test_apply_per_channel():
+	"""
+	Tests that a frame is corrected by the table of each pixel's channel
+	"""
+	correction = ColorCorrection(brightness=1, gamma=1, white_point=(255, 0, 255))
+	frame = bytearray(b"\xff\xff\xff\x10\x20\x30")
+
+	assert correction.apply(frame) == bytearray(b"\xff\x00\xff\x10\x00\x30")
+	assert frame == bytearray(b"\xff\xff\xff\x10\x20\x30")
+
+@pytest.mark.parametrize("kwargs", [
+	({"brightness": 1.5}),
+	({"gamma": 0}),
+	({"white_point": (255, 255)}),
+	({"white_point": (255, 255, 256)})
+])
+def test_invalid_correction(kwargs):
+	"""
+	Tests that a brightness outside 0 to 1, a gamma of 0 or less, or an invalid white point throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		ColorCorrection(**kwargs)
+
+def test_white_point_from_kelvin():
+	"""
+	Tests that 6600 K is full white, warmer temperatures lower blue, and cooler temperatures lower red
+	"""
+	assert white_point_from_kelvin(6600) == (255, 255, 255)
+	assert white_point_from_kelvin(3000)[2] < white_point_from_kelvin(5000)[2] < 255
+	assert white_point_from_kelvin(10000)[0] < 255
+	with pytest.raises(ValueError):
+		white_point_from_kelvin(500)
+
+def test_controller_sets_correction():
+	"""
+	Tests that the controller sets a strip's gamma and white point alongside its brightness
+	"""
+	backend = SimulatedBackend(count=1, gamma=1)
+	with controller.using_backend(backend):
+		controller.set_brightness(1)
+		assert backend.correction.get_tables()[0] == IDENTITY
+
+		controller.set_color_correction(gamma=2.2, white_point=(255, 200, 150))
+
+	assert backend.correction.gamma == 2.2
+	assert backend.correction.white_point == (255, 200, 150)
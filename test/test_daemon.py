@@ -0,0 +1,226 @@
+"""
+test_daemon.py
+
+Unit tests for the resident LED daemon
+
+This module runs the daemon against a simulated backend and
+verifies that commands sent by the client return right away,
+that a new effect preempts the running effect while a change of
+settings does not, that statistics reach the client asking for
+them, and that stream sources are read on the daemon's event loop.
+"""
+import os
+import socket
+import threading
+import time
+import pytest
+from cli import client
+from cli.commands import run_commands
+from cli.daemon import LedDaemon
+from cli.exit_codes import ExitCode
+from cli.parser import build_parser
+from led import controller
+from led.backends import SimulatedBackend
+from led.colors import COLORS
+from led.config import DEFAULT_STRIP, LED_COUNT
+from led.recording import FrameRecorder
+
+@pytest.fixture
+def daemon(tmp_path):
+	"""
+	Provides a daemon listening on a temporary socket and drawing to a simulated backend
+	"""
+	controller.set_backend(SimulatedBackend(count=LED_COUNT))
+	d = LedDaemon(path=str(tmp_path / "led.sock"))
+	thread = threading.Thread(target=d.serve_forever, daemon=True)
+	thread.start()
+	while d.server is None:
+		time.sleep(0.01)
+	yield d
+	d.shutdown()
+	thread.join(timeout=5)
+	controller.set_backend(None)
+
+def send(daemon, *flags):
+	"""
+	Parses flags as the CLI would and sends them to the daemon
+	"""
+	return client.send_command(build_parser().parse_args(list(flags)), path=daemon.path)
+
+def wait_for(task, timeout=5):
+	"""
+	Waits for the task of an effect run by the daemon to finish, and returns it
+	"""
+	deadline = time.monotonic() + timeout
+	while not task.done() and time.monotonic() < deadline:
+		time.sleep(0.01)
+	return task
+
+def test_send_command_without_daemon(tmp_path):
+	"""
+	Tests that sending a command returns None when no daemon is listening
+	"""
+	args = build_parser().parse_args(["--off"])
+
+	assert client.send_command(args, path=str(tmp_path / "missing.sock")) is None
+
+def test_send_command_daemon_not_replying(tmp_path, monkeypatch, capsys):
+	"""
+	Tests that a daemon which accepts the connection but never replies gives an error rather than a traceback
+	"""
+	monkeypatch.setattr(client, "TIMEOUT", 0.1)
+	path = str(tmp_path / "hung.sock")
+	args = build_parser().parse_args(["--off"])
+
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as hung:
+		hung.bind(path)
+		hung.listen()
+		assert client.send_command(args, path=path) == ExitCode.INVALID_INPUT
+
+	assert "[ERROR] Could not reach the LED daemon" in capsys.readouterr().out
+
+def test_daemon_returns_before_effect_finishes(daemon, capsys):
+	"""
+	Tests that a long effect is started in the background and the client gets its output right away
+	"""
+	started = time.monotonic()
+
+	assert send(daemon, "--blink", "--color", "r", "--duration", "60") == ExitCode.SUCCESS
+	assert time.monotonic() - started < 1
+	assert not daemon.engine.tasks[DEFAULT_STRIP].done()
+	assert "Blinking" in capsys.readouterr().out
+
+def test_daemon_preempts_running_effect(daemon):
+	"""
+	Tests that a new command stops the running effect and runs in its place
+	"""
+	send(daemon, "--blink", "--color", "r", "--interval", "10", "--duration", "60")
+	blink = daemon.engine.tasks[DEFAULT_STRIP]
+	started = time.monotonic()
+
+	assert send(daemon, "--fill", "--color", "b", "--fade", "0.1") == ExitCode.SUCCESS
+	wait_for(daemon.engine.tasks[DEFAULT_STRIP])
+	controller.stop_output_thread()
+
+	assert time.monotonic() - started < 1
+	assert wait_for(blink).cancelled()
+	assert controller.get_backend().shown == bytes(COLORS["blue"]) * LED_COUNT
+
+def test_daemon_preempts_default_strip_by_name(daemon):
+	"""
+	Tests that a command naming the default strip preempts an effect started without naming a strip
+	"""
+	send(daemon, "--blink", "--color", "r", "--interval", "10", "--duration", "60")
+	blink = daemon.engine.tasks[DEFAULT_STRIP]
+
+	assert send(daemon, "--chase", "--color", "b", "--strip", DEFAULT_STRIP) == ExitCode.SUCCESS
+
+	assert wait_for(blink).cancelled()
+	assert list(daemon.engine.tasks) == [DEFAULT_STRIP]
+
+def test_daemon_invalid_command_keeps_effect(daemon, capsys):
+	"""
+	Tests that an invalid command is rejected without stopping the running effect
+	"""
+	send(daemon, "--blink", "--color", "r", "--duration", "60")
+	blink = daemon.engine.tasks[DEFAULT_STRIP]
+
+	assert send(daemon, "--fill", "--color", "invalid") == ExitCode.INVALID_INPUT
+	assert "[ERROR]" in capsys.readouterr().out
+	assert daemon.engine.tasks[DEFAULT_STRIP] is blink and not blink.done()
+
+def test_daemon_settings_keep_effect(daemon):
+	"""
+	Tests that a command which only changes settings applies them without stopping the running effect
+	"""
+	send(daemon, "--blink", "--color", "r", "--duration", "60")
+	blink = daemon.engine.tasks[DEFAULT_STRIP]
+
+	assert send(daemon, "--brightness", "0.2") == ExitCode.SUCCESS
+	assert send(daemon, "--gamma", "2.2", "--power-limit", "5000") == ExitCode.SUCCESS
+
+	assert daemon.engine.tasks[DEFAULT_STRIP] is blink and not blink.done()
+	assert controller.get_backend().brightness == 0.2
+
+def test_daemon_off_stops_effect(daemon):
+	"""
+	Tests that '--off' stops the running effect, so it cannot light the strip again
+	"""
+	send(daemon, "--blink", "--color", "r", "--duration", "60")
+	blink = daemon.engine.tasks[DEFAULT_STRIP]
+
+	assert send(daemon, "--off") == ExitCode.SUCCESS
+
+	assert wait_for(blink).cancelled()
+	assert DEFAULT_STRIP not in daemon.engine.tasks
+
+def test_daemon_sends_stats_to_their_client(daemon, capsys):
+	"""
+	Tests that the statistics of an effect reach the client which asked for them once the effect finishes
+	"""
+	assert send(daemon, "--chase", "--color", "r", "--duration", "0.2", "--stats") == ExitCode.SUCCESS
+	out = capsys.readouterr().out
+
+	assert out.index("Chase") < out.index("Frames:") < out.index("Estimated draw")
+	assert daemon.engine.tasks[DEFAULT_STRIP].done()
+
+def test_daemon_keeps_effects_on_other_strips(daemon):
+	"""
+	Tests that a command on one strip does not stop the effect running on another strip
+	"""
+	controller.set_backend(SimulatedBackend(count=10), strip="left")
+	send(daemon, "--blink", "--color", "r", "--duration", "60")
+	blink = daemon.engine.tasks[DEFAULT_STRIP]
+
+	assert send(daemon, "--fill", "--color", "b", "--strip", "left", "--fade", "0.1") == ExitCode.SUCCESS
+	wait_for(daemon.engine.tasks["left"])
+
+	assert not blink.done()
+	assert controller.get_backend("left").shown == bytes(COLORS["blue"]) * 10
+	controller.set_backend(None, strip="left")
+
+def test_daemon_reads_stream_on_loop(daemon, tmp_path):
+	"""
+	Tests that a FIFO streamed by the daemon is read on its event loop, and ends when the writer closes it
+	"""
+	path = str(tmp_path / "frames")
+	os.mkfifo(path)
+
+	assert send(daemon, "--stream", path) == ExitCode.SUCCESS
+	with open(path, "wb") as fifo:
+		fifo.write(bytes(COLORS["green"]) * LED_COUNT)
+	stream = wait_for(daemon.engine.tasks[DEFAULT_STRIP])
+	controller.stop_output_thread()
+
+	assert stream.done() and not stream.cancelled()
+	assert controller.get_backend().shown == bytes(COLORS["green"]) * LED_COUNT
+
+def test_daemon_resolves_relative_paths(daemon, tmp_path, monkeypatch):
+	"""
+	Tests that a relative path is resolved in the client's working directory before it is sent to the daemon
+	"""
+	received = []
+	handle = daemon.handle
+	monkeypatch.setattr(daemon, "handle", lambda request, **kwargs: (received.append(request["args"]), handle(request, **kwargs))[1])
+	monkeypatch.chdir(tmp_path)
+	with FrameRecorder(str(tmp_path / "show.rec"), count=LED_COUNT) as recorder:
+		recorder.write(0, bytes(COLORS["red"]) * LED_COUNT)
+
+	assert send(daemon, "--play", "show.rec") == ExitCode.SUCCESS
+	wait_for(daemon.engine.tasks[DEFAULT_STRIP])
+	controller.stop_output_thread()
+
+	assert received[0]["play"] == str(tmp_path / "show.rec")
+	assert controller.get_backend().shown == bytes(COLORS["red"]) * LED_COUNT
+
+def test_record_runs_locally(tmp_path, monkeypatch):
+	"""
+	Tests that a recording is rendered in the calling process rather than sent to the daemon
+	"""
+	sent = []
+	monkeypatch.setattr(client, "send_command", lambda args: sent.append(args))
+	args = build_parser().parse_args(["--blink", "--color", "r", "--duration", "1", "--record", str(tmp_path / "out.rec")])
+
+	assert run_commands(args) == ExitCode.SUCCESS
+	assert sent == []
+	assert (tmp_path / "out.rec").exists()
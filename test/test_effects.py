@@ -0,0 +1,169 @@
+"""
+test_effects.py
+
+Unit tests for the LED effects
+
+This module runs effects against a simulated backend
+and verifies the frames that they leave on the strip.
+"""
+import itertools
+import time
+import pytest
+from led import controller, effects, render
+from led.backends import SimulatedBackend
+from led.colors import COLORS, OFF, resolve_color
+from led.color_palette import ColorPalette
+from led.config import LED_COUNT
+from led.offline import render_offline
+from led.pixel_range import PixelRange
+
+R = COLORS["red"]
+G = COLORS["green"]
+B = COLORS["blue"]
+
+@pytest.fixture
+def backend():
+	"""
+	Provides a fresh simulated backend installed on the controller
+	"""
+	b = SimulatedBackend(count=LED_COUNT)
+	controller.set_backend(b)
+	yield b
+	controller.set_backend(None)
+
+def shown_pixels(backend):
+	"""
+	Returns the last shown frame of a simulated backend as a list of RGB tuples
+	"""
+	return [tuple(backend.shown[i:i + 3]) for i in range(0, len(backend.shown), 3)]
+
+def test_apply_fill_default_range(backend):
+	"""
+	Tests that a default fill colors the entire strip and shows it once
+	"""
+	effects.apply_fill(palette=ColorPalette(span_primary=R))
+
+	assert shown_pixels(backend) == [R] * LED_COUNT
+	assert backend.show_count == 1
+
+def test_apply_fill_range(backend):
+	"""
+	Tests that a fill over a range leaves pixels outside of it untouched
+	"""
+	effects.apply_fill(palette=ColorPalette(span_primary=R), sel=PixelRange(start=10, end=20))
+
+	assert shown_pixels(backend) == [OFF] * 10 + [R] * 10 + [OFF] * (LED_COUNT - 20)
+
+@pytest.mark.parametrize("invert, expected", [
+	(False, [R, R, B, R, R, B, R]),
+	(True, [R, B, R, R, B, R, R]),
+])
+def test_apply_fill_span_spacing(backend, invert, expected):
+	"""
+	Tests that span and spacing colors are laid out from the start, or the end when inverted
+	"""
+	palette = ColorPalette(span_primary=R, spacing_primary=B)
+
+	effects.apply_fill(palette=palette, sel=PixelRange(start=3, end=10, span=2, spacing=1, invert=invert))
+
+	assert shown_pixels(backend)[3:10] == expected
+	assert shown_pixels(backend)[:3] == [OFF] * 3
+
+def lit_pattern(frame, color=R):
+	"""
+	Returns a string marking each pixel of a frame that holds a color with a 1
+	"""
+	data = bytes(memoryview(frame).cast("B"))
+	return "".join("1" if data[i:i + 3] == bytes(color) else "0" for i in range(0, len(data), 3))
+
+@pytest.mark.parametrize("mode, invert, expected", [
+	(effects.BOUNCE, False, ["110000", "011000", "001100", "000110", "000011", "000110", "001100", "011000", "110000"]),
+	(effects.WRAP, False, ["110000", "011000", "001100", "000110", "000011", "100001", "110000"]),
+	(effects.BOUNCE, True, ["000011", "000110", "001100", "011000", "110000", "011000", "001100"]),
+	(effects.WRAP, True, ["000011", "000110", "001100", "011000", "110000", "100001", "000011"]),
+])
+def test_chase_frames_bar(mode, invert, expected):
+	"""
+	Tests that a bar of span length bounces or wraps across the selection, from the end when inverted
+	"""
+	frames = effects.chase_frames(palette=ColorPalette(span_primary=R), sel=PixelRange(start=0, end=6, span=2, invert=invert), mode=mode, base=render.new_frame(count=6))
+
+	assert [lit_pattern(f) for f in itertools.islice(frames, len(expected))] == expected
+
+def test_chase_frames_spacing_pattern():
+	"""
+	Tests that with spacing, the span and spacing pattern rotates inside the selection only
+	"""
+	palette = ColorPalette(span_primary=R, spacing_primary=B)
+	sel = PixelRange(start=2, end=8, span=2, spacing=1)
+	base = render.new_frame(count=10)
+	render.fill(base, G)
+
+	frames = [(lit_pattern(f), lit_pattern(f, G)) for f in itertools.islice(effects.chase_frames(palette=palette, sel=sel, mode=effects.WRAP, base=base), 7)]
+
+	assert [span for span, outside in frames[:3]] == ["0011011000", "0001101100", "0010110100"]
+	assert frames[6] == frames[0]
+	assert all(outside == "11" + "0" * 6 + "11" for span, outside in frames)
+
+@pytest.mark.parametrize("off", [tuple([0, 0, 0]), 0, resolve_color(["black"])])
+def test_lit_indices_off_by_value(off):
+	"""
+	Tests that a primary color equal to off is never lit, however the off color was built
+	"""
+	sel = PixelRange(start=0, end=6, span=2, spacing=1)
+
+	assert effects.lit_indices(ColorPalette(span_primary=R, spacing_primary=off), sel) == [0, 1, 3, 4]
+	assert effects.lit_indices(ColorPalette(span_primary=off, spacing_primary=off), sel) == []
+
+@pytest.mark.parametrize("spacing", [None, 1])
+def test_chase_frames_packed_colors(spacing):
+	"""
+	Tests that a chase of packed colors renders the same frames as one of RGB tuples
+	"""
+	sel = PixelRange(start=0, end=6, span=2, spacing=spacing)
+	packed = effects.chase_frames(palette=ColorPalette(span_primary=0xFF0000, span_secondary=0x0000FF, spacing_primary=0x00FF00), sel=sel, base=render.new_frame(count=6))
+	tuples = effects.chase_frames(palette=ColorPalette(span_primary=R, span_secondary=B, spacing_primary=G), sel=sel, base=render.new_frame(count=6))
+
+	for _ in range(4):
+		assert bytes(next(packed)) == bytes(next(tuples))
+
+@pytest.mark.parametrize("start, end", [(6, 6), (5, 1)])
+def test_chase_frames_empty_selection(start, end):
+	"""
+	Tests that a chase over an empty or reversed selection yields the base frame once instead of spinning
+	"""
+	base = render.new_frame(count=6)
+	render.fill(base, G)
+
+	frames = list(effects.chase_frames(palette=ColorPalette(span_primary=R), sel=PixelRange(start=start, end=end), base=base))
+
+	assert [bytes(f) for f in frames] == [bytes(base)]
+
+def test_chase_frames_invalid_mode():
+	"""
+	Tests that an unknown chase mode throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		next(effects.chase_frames(mode="invalid"))
+
+def test_chase_fill_honors_interval_and_duration():
+	"""
+	Tests that a chase steps once per interval for the duration
+	"""
+	frames = render_offline(effects.chase_fill, palette=ColorPalette(span_primary=R), sel=PixelRange(span=5), interval=0.5, duration=3)
+
+	assert [timestamp for timestamp, frame in frames] == [0, 0.5, 1, 1.5, 2, 2.5, 3]
+	assert lit_pattern(frames[2][1]) == "00" + "1" * 5 + "0" * (LED_COUNT - 7)
+
+def test_chase_fill_long_strip():
+	"""
+	Tests that a chase on a 1000 LED strip renders a step well inside a 60 fps frame budget
+	"""
+	count = 1000
+	frames = effects.chase_frames(palette=ColorPalette(span_primary=R), sel=PixelRange(end=count, span=50), base=render.new_frame(count=count))
+	started = time.perf_counter()
+
+	for frame in itertools.islice(frames, 1000):
+		pass
+
+	assert (time.perf_counter() - started) / 1000 < 1 / 600
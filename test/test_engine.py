@@ -0,0 +1,192 @@
+"""
+test_engine.py
+
+Unit tests for the asyncio effect engine
+
+This module runs effects on simulated strips against a virtual
+clock and verifies that concurrent effects share one tick clock,
+that starting an effect cancels the one on its strip within a
+frame, that control inputs are read on the same event loop, and
+that effects and streams given an engine run as its tasks.
+"""
+import asyncio
+import socket
+import pytest
+from led import controller, effects, engine, render, stream
+from led.backends import FrameSinkBackend
+from led.clock import VirtualClock
+from led.colors import COLORS, OFF
+from led.color_palette import ColorPalette
+from led.pixel_range import PixelRange
+
+COUNT = 2
+R = COLORS["red"]
+G = COLORS["green"]
+B = COLORS["blue"]
+
+def solid(color):
+	"""
+	Returns a frame of a single color
+	"""
+	return render.new_frame(source=bytes(color) * COUNT)
+
+@pytest.fixture
+def clock():
+	"""
+	Provides a virtual clock
+	"""
+	return VirtualClock()
+
+@pytest.fixture
+def strips(clock):
+	"""
+	Provides two strips whose pushed frames are collected, timestamped by the virtual clock
+	"""
+	backends = {"left": FrameSinkBackend(count=COUNT, clock=clock), "right": FrameSinkBackend(count=COUNT, clock=clock)}
+	for name, backend in backends.items():
+		controller.set_backend(backend, strip=name)
+	yield backends
+	for name in backends:
+		controller.set_backend(None, strip=name)
+
+def test_effects_share_tick_clock(clock, strips):
+	"""
+	Tests that effects on different strips are shown at the same ticks, each at its own fps
+	"""
+	eng = engine.Engine(fps=2, clock=clock)
+
+	async def main():
+		eng.start([solid(R), solid(G), solid(B)], strip="left")
+		eng.start([solid(G), solid(B)], strip="right", fps=1)
+		return await eng.run()
+
+	stats = asyncio.run(main())
+
+	assert strips["left"].frames == [(0, bytes(R * 2)), (0.5, bytes(G * 2)), (1, bytes(B * 2))]
+	assert strips["right"].frames == [(0, bytes(G * 2)), (1, bytes(B * 2))]
+	assert stats.frames == 4
+
+def test_start_preempts_within_a_frame(clock, strips):
+	"""
+	Tests that starting an effect on a strip cancels the effect running on it before its next frame
+	"""
+	eng = engine.Engine(fps=1, clock=clock)
+
+	def forever(color):
+		while True:
+			yield solid(color)
+			yield solid(OFF)
+
+	async def control():
+		await eng.next_tick()
+		await eng.next_tick()
+		eng.start(forever(B), strip="left", duration=1)
+
+	async def main():
+		eng.start(forever(R), strip="left")
+		eng.start(control(), strip="right")
+		await eng.run()
+
+	asyncio.run(main())
+
+	assert strips["left"].frames == [(0, bytes(R * 2)), (1, bytes(OFF * 2)), (2, bytes(R * 2)), (3, bytes(B * 2)), (4, bytes(OFF * 2))]
+
+def test_coroutine_effect(clock, strips):
+	"""
+	Tests that a coroutine effect writes its own frames and finishes when it returns
+	"""
+	eng = engine.Engine(fps=10, clock=clock)
+
+	async def pulse():
+		for color in (R, OFF, R):
+			eng.write(bytes(color), start=1, strip="right")
+			await eng.next_tick()
+
+	async def main():
+		eng.start(pulse(), strip="right")
+		await eng.run(duration=5)
+
+	asyncio.run(main())
+
+	assert [frame for _, frame in strips["right"].frames] == [bytes(OFF + R), bytes(OFF * 2), bytes(OFF + R)]
+	assert clock.now() == pytest.approx(0.3)
+
+def test_async_generator_cancelled(clock, strips):
+	"""
+	Tests that an async generator is closed when the engine stops
+	"""
+	eng = engine.Engine(fps=1, clock=clock)
+	closed = []
+
+	async def frames():
+		try:
+			while True:
+				yield solid(G)
+				yield solid(B)
+		finally:
+			closed.append(True)
+
+	async def main():
+		eng.start(frames(), strip="left")
+		await eng.run(duration=2)
+
+	asyncio.run(main())
+
+	assert len(strips["left"].frames) == 3
+	assert closed == [True]
+
+def test_control_input_on_loop(strips):
+	"""
+	Tests that a command read from a socket on the engine's loop starts an effect, without a thread
+	"""
+	eng = engine.Engine(fps=100)
+	commands, sender = socket.socketpair()
+	commands.setblocking(False)
+	colors = {b"r": R, b"b": B}
+
+	def read_command():
+		for key in commands.recv(16):
+			eng.start([solid(colors[bytes([key])])], strip="left")
+
+	async def main():
+		eng.add_reader(commands, read_command)
+		sender.send(b"b")
+		await eng.run(duration=0.1, forever=True)
+
+	with commands, sender:
+		asyncio.run(main())
+
+	assert eng.readers == []
+	assert strips["left"].frames[-1][1] == bytes(B * 2)
+
+def test_effect_runs_on_engine(clock, strips):
+	"""
+	Tests that an effect given an engine returns a coroutine which plays its frames at the effect's own fps, for its duration
+	"""
+	eng = engine.Engine(fps=4, clock=clock)
+	sel = PixelRange(strip="left")
+
+	async def main():
+		eng.start(effects.blink_color(palette=ColorPalette(span_primary=R), interval=1, duration=2, sel=sel, engine=eng), strip="left")
+		await eng.run()
+
+	asyncio.run(main())
+
+	assert strips["left"].frames == [(0, bytes(OFF * 2)), (1, bytes(R * 2)), (2, bytes(OFF * 2))]
+
+def test_stream_file_on_engine(clock, strips, tmp_path):
+	"""
+	Tests that a regular file, which cannot be waited on, is streamed one frame per frame shown
+	"""
+	path = tmp_path / "frames"
+	path.write_bytes(bytes(R * 2) + bytes(G * 2) + bytes(B))
+	eng = engine.Engine(fps=2, clock=clock)
+
+	async def main():
+		eng.start(stream.stream_frames(str(path), fps=2, strip="left", engine=eng), strip="left")
+		await eng.run()
+
+	asyncio.run(main())
+
+	assert strips["left"].frames == [(0, bytes(R * 2)), (0.5, bytes(G * 2))]
+	assert eng.readers == []
@@ -0,0 +1,97 @@
+"""
+test_gradient.py
+
+Unit tests for gradient palettes
+
+This module verifies that gradients are baked into tables which
+hold their stop colors and interpolate between them, that both
+render paths look pixels up in a table identically, and that a
+gradient effect scrolls along its selection.
+"""
+import itertools
+import pytest
+from led import effects, gradient, render
+from led.colors import COLORS, OFF
+from led.pixel_range import PixelRange
+from conftest import to_bytes
+
+R = COLORS["red"]
+B = COLORS["blue"]
+
+PATHS = [
+	False,
+	pytest.param(True, marks=pytest.mark.skipif(not render.HAS_NUMPY, reason="NumPy is not installed"))
+]
+
+@pytest.mark.parametrize("space", gradient.SPACES)
+def test_gradient_holds_stop_colors(space):
+	"""
+	Tests that a baked gradient starts, ends and passes through its stops on their colors
+	"""
+	palette = gradient.GradientPalette(((0.0, R), (0.6, (0, 255, 0)), (1.0, 0x0000FF)), space=space)
+
+	assert len(palette.get_table()) == gradient.LUT_SIZE * 3
+	assert palette.get_color(0) == R
+	assert palette.get_color(153) == (0, 255, 0)
+	assert palette.get_color(255) == B
+
+def test_gradient_interpolates_rgb():
+	"""
+	Tests that an RGB gradient blends the channels of its stops evenly, holding the end colors beyond its stops
+	"""
+	palette = gradient.GradientPalette(((0.2, OFF), (0.8, (200, 100, 0))))
+
+	assert palette.get_color(0) == OFF
+	assert palette.get_color(51) == OFF
+	assert palette.get_color(128) == (101, 50, 0)
+	assert palette.get_color(255) == (200, 100, 0)
+
+def test_oklab_round_trip():
+	"""
+	Tests that converting to OKLab and back returns the same color
+	"""
+	for color in [(12, 200, 77), R, B, (255, 255, 255), OFF, (1, 2, 3)]:
+		assert gradient.from_oklab(gradient.to_oklab(color)) == color
+
+@pytest.mark.parametrize("stops, space", [
+	((), gradient.RGB),
+	(((0.5, R), (0.2, B)), gradient.RGB),
+	(((0, R), (1.5, B)), gradient.RGB),
+	(((0, (256, 0, 0)),), gradient.RGB),
+	(((0, R),), "hsv")
+])
+def test_invalid_gradient(stops, space):
+	"""
+	Tests that a gradient with no stops, stops out of order or range, an invalid color or an unknown space throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		gradient.GradientPalette(stops, space=space)
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+def test_lookup(use_numpy):
+	"""
+	Tests that each pixel is colored by its index into the table, clamped to the end of the frame
+	"""
+	palette = gradient.GRADIENTS["heatmap"]
+	frame = render.new_frame(count=5, use_numpy=use_numpy)
+
+	render.lookup(frame, bytes([0, 255, 128, 7]), palette.get_table(), start=2)
+
+	colors = [palette.get_color(i) for i in (0, 255, 128)]
+	assert to_bytes(frame) == bytes(OFF * 2 + colors[0] + colors[1] + colors[2])
+
+def test_gradient_frames_scroll():
+	"""
+	Tests that a gradient is spread over the selection and scrolled along it each frame
+	"""
+	palette = gradient.GradientPalette(gradient.even_stops((R, B)))
+	frames = effects.gradient_frames(palette=palette, sel=PixelRange(start=1, end=5), step=64, base=render.new_frame(count=6))
+
+	shown = [to_bytes(frame) for frame in itertools.islice(frames, 5)]
+
+	def expected(indices):
+		return bytes(OFF) + b"".join(bytes(palette.get_color(i)) for i in indices) + bytes(OFF)
+
+	assert shown[0] == expected([0, 64, 128, 192])
+	assert shown[1] == expected([64, 128, 192, 0])
+	assert shown[4] == shown[0]
@@ -0,0 +1,87 @@
+"""
+test_offline.py
+
+Unit tests for the virtual clock and offline rendering
+
+This module verifies that timed effects run against a
+virtual clock without blocking, and that the frames they
+push are collected with their virtual timestamps.
+"""
+import time
+from led import effects
+from led.clock import VirtualClock
+from led.colors import COLORS, OFF
+from led.color_palette import ColorPalette
+from led.config import LED_COUNT
+from led.offline import render_offline
+from led.pixel_range import PixelRange
+from led.timer import FrameScheduler
+
+COUNT = LED_COUNT
+R = COLORS["red"]
+B = COLORS["blue"]
+
+def test_virtual_clock_advances_without_blocking():
+	"""
+	Tests that sleeping and waiting on a virtual clock moves it forward instantly
+	"""
+	clock = VirtualClock()
+	started = time.monotonic()
+
+	clock.sleep(3600)
+	clock.wait_until(7200)
+	clock.wait_until(10)
+	clock.advance(-5)
+
+	assert clock.now() == 7200
+	assert time.monotonic() - started < 1
+
+def test_scheduler_on_virtual_clock():
+	"""
+	Tests that a frame scheduler waits on its clock and keeps perfect time on a virtual clock
+	"""
+	clock = VirtualClock()
+	t = FrameScheduler(interval=0.5, action=lambda: None, clock=clock)
+
+	for i in range(4):
+		t.update()
+
+	assert clock.now() == 2
+	assert t.get_runtime() == 2
+	assert t.get_stats().max_lateness == 0
+
+def test_render_offline_blink():
+	"""
+	Tests that a ten minute blink renders instantly and alternates colors every interval
+	"""
+	started = time.monotonic()
+
+	frames = render_offline(effects.blink_color, count=COUNT, palette=ColorPalette(span_primary=R, span_secondary=B), interval=1, duration=600)
+
+	assert time.monotonic() - started < 5
+	assert len(frames) == 601
+	assert [timestamp for timestamp, frame in frames[:3]] == [0, 1, 2]
+	assert frames[0][1] == bytes(B) * COUNT
+	assert frames[1][1] == bytes(R) * COUNT
+
+def test_render_offline_progressive_fill():
+	"""
+	Tests that a progressive fill pushes a frame of secondary colors, then one frame per lit pixel spread over the duration
+	"""
+	sel = PixelRange(start=0, end=4)
+
+	frames = render_offline(effects.progressive_fill, count=COUNT, palette=ColorPalette(span_primary=R), duration=2, sel=sel)
+
+	assert len(frames) == 5
+	assert frames[-1] == (2, bytes(R) * 4 + bytes(OFF) * (COUNT - 4))
+
+def test_render_offline_sink():
+	"""
+	Tests that frames are handed to a provided sink rather than collected
+	"""
+	received = []
+
+	frames = render_offline(effects.blink_color, count=COUNT, sink=lambda t, f: received.append(t), interval=1, duration=3, palette=ColorPalette(span_primary=R))
+
+	assert frames == []
+	assert received == [0, 1, 2, 3]
@@ -0,0 +1,107 @@
+"""
+test_output.py
+
+Unit tests for the background output thread
+
+This module verifies that frames shown through an output thread
+reach the strip, and that the overrun policies drop or wait on
+frames shown faster than they can be pushed.
+"""
+import threading
+import pytest
+from led import controller
+from led.backends import SimulatedBackend
+from led.colors import COLORS
+from led.output import OutputThread, DROP, WAIT
+
+COUNT = 10
+
+class GatedBackend(SimulatedBackend):
+	"""
+	A simulated backend whose pushes block until released by the test
+	"""
+	def __init__(self, count=COUNT):
+		super().__init__(count=count)
+		self.gate = threading.Event()
+		self.started = threading.Event()
+
+	def push(self, frame, stop):
+		self.started.set()
+		self.gate.wait()
+		super().push(frame, stop)
+
+@pytest.fixture
+def backend():
+	"""
+	Provides a gated backend installed on the controller
+	"""
+	b = GatedBackend()
+	controller.set_backend(b)
+	yield b
+	b.gate.set()
+	controller.stop_output_thread()
+	controller.set_backend(None)
+
+def test_output_thread_invalid_policy(backend):
+	"""
+	Tests that an unknown overrun policy throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		OutputThread(backend, policy="invalid")
+
+def test_output_thread_drops_stale_frames(backend):
+	"""
+	Tests that with the drop policy, frames shown while the thread is busy are replaced by the newest frame
+	"""
+	controller.start_output_thread(policy=DROP)
+
+	controller.fill_color(COLORS["red"])
+	controller.show_pixels()
+	assert backend.started.wait(timeout=5)
+
+	for color in ("green", "blue", "white"):
+		controller.fill_color(COLORS[color])
+		controller.show_pixels()
+
+	backend.gate.set()
+	controller.stop_output_thread()
+
+	assert backend.shown == bytes(COLORS["white"]) * COUNT
+	assert controller.get_show_stats().pushed == 2
+	assert controller.get_show_stats().dropped == 2
+
+def test_output_thread_keeps_dropped_dirty_span(backend):
+	"""
+	Tests that the pixels changed by a dropped frame are still sent with the frame that replaced it
+	"""
+	controller.start_output_thread(policy=DROP)
+	controller.show_pixels()
+	assert backend.started.wait(timeout=5)
+
+	controller.fill_single(index=8, color=COLORS["red"])
+	controller.show_pixels()
+	controller.fill_single(index=1, color=COLORS["red"])
+	controller.show_pixels()
+
+	backend.gate.set()
+	controller.stop_output_thread()
+
+	assert backend.shown[8 * 3:9 * 3] == bytes(COLORS["red"])
+	assert backend.shown[1 * 3:2 * 3] == bytes(COLORS["red"])
+
+def test_output_thread_wait_policy(backend):
+	"""
+	Tests that with the wait policy, every shown frame is pushed
+	"""
+	backend.gate.set()
+	controller.start_output_thread(policy=WAIT)
+
+	for color in ("red", "green", "blue"):
+		controller.fill_color(COLORS[color])
+		controller.show_pixels()
+
+	controller.stop_output_thread()
+
+	assert backend.shown == bytes(COLORS["blue"]) * COUNT
+	assert controller.get_show_stats().pushed == 3
+	assert controller.get_show_stats().dropped == 0
@@ -0,0 +1,121 @@
+"""
+test_pipeline.py
+
+Unit tests for the composable frame pipeline
+
+This module verifies that each pipeline stage transforms
+frames without changing the frames it was given, and that
+the runner shows a pipeline one frame per tick.
+"""
+import itertools
+import pytest
+from led import pipeline, render
+from led.backends import FrameSinkBackend
+from led.clock import VirtualClock
+from led.colors import COLORS, OFF
+from led.controller import using_backend
+from led.pixel_range import PixelRange
+from conftest import to_bytes
+
+COUNT = 6
+R = COLORS["red"]
+G = COLORS["green"]
+B = COLORS["blue"]
+
+def frame_of(*colors):
+	"""
+	Returns a frame holding one pixel of each color provided
+	"""
+	return render.new_frame(source=bytes(c for color in colors for c in color))
+
+def test_scale_brightness_copies_frames():
+	"""
+	Tests that scaling yields scaled frames and leaves the source frames unchanged
+	"""
+	source = frame_of(R, G)
+
+	out = next(pipeline.scale_brightness([source], 0.5))
+
+	assert to_bytes(out) == bytes((127, 0, 0, 0, 127, 0))
+	assert to_bytes(source) == bytes(R + G)
+
+def test_reverse_and_mirror():
+	"""
+	Tests that reversing and mirroring rearrange the pixels of each frame
+	"""
+	source = frame_of(R, G, B, OFF)
+
+	assert to_bytes(next(pipeline.reverse([source]))) == bytes(OFF + B + G + R)
+	assert to_bytes(next(pipeline.mirror([source]))) == bytes(R + G + G + R)
+
+def test_mask():
+	"""
+	Tests that masking keeps only the pixels of the range, taking the rest from the base frame
+	"""
+	base = frame_of(B, B, B, B)
+
+	out = next(pipeline.mask([frame_of(R, R, R, R)], PixelRange(start=1, end=3), base))
+
+	assert to_bytes(out) == bytes(B + R + R + B)
+
+@pytest.mark.parametrize("factor, expected", [
+	(1, [0, 1, 2, 3]),
+	(2, [0, 0, 1, 1, 2, 2, 3, 3]),
+	(0.5, [1, 3]),
+	(1.5, [0, 1, 1, 2, 3, 3])
+])
+def test_time_stretch(factor, expected):
+	"""
+	Tests that time stretching repeats or drops frames by the factor
+	"""
+	assert list(pipeline.time_stretch(range(4), factor)) == expected
+
+def test_time_stretch_invalid_factor():
+	"""
+	Tests that a factor of 0 or less throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		list(pipeline.time_stretch(range(4), 0))
+
+def test_concat_and_loop():
+	"""
+	Tests that pipelines play back to back, and loops replay their frames
+	"""
+	frames = [frame_of(color) for color in (R, G, B)]
+
+	assert list(pipeline.concat(range(2), range(5, 7))) == [0, 1, 5, 6]
+	assert [to_bytes(f) for f in pipeline.loop(iter(frames), times=2)] == [bytes(R), bytes(G), bytes(B)] * 2
+	assert [to_bytes(f) for f in itertools.islice(pipeline.loop(iter(frames[:2])), 5)] == [bytes(R), bytes(G)] * 2 + [bytes(R)]
+
+def test_loop_keeps_copies_of_reused_frames():
+	"""
+	Tests that a loop replays each frame as it was, even if the source reused the frame object
+	"""
+	frame = frame_of(OFF)
+
+	def counting():
+		for color in (R, G):
+			render.fill(frame, color)
+			yield frame
+
+	assert [to_bytes(f) for f in pipeline.loop(counting(), times=2)] == [bytes(R), bytes(G), bytes(R), bytes(G)]
+
+@pytest.mark.parametrize("frames, duration, expected", [
+	(5, None, 5),
+	(100, 1, 11),
+	(None, 2, 21)
+])
+def test_run(frames, duration, expected):
+	"""
+	Tests that the runner shows one frame per tick until the frames run out or the duration ends
+	"""
+	clock = VirtualClock()
+	backend = FrameSinkBackend(count=COUNT, clock=clock)
+	source = (frame_of(*[(i, 0, 0)] * COUNT) for i in (range(frames) if frames else itertools.count()))
+
+	with using_backend(backend):
+		stats = pipeline.run(source, fps=10, duration=duration, clock=clock)
+
+	assert len(backend.frames) == expected
+	assert stats.frames == expected
+	assert backend.frames[1] == (0.1, bytes((1, 0, 0)) * COUNT)
@@ -142,3 +142,57 @@ def test_pixel_range_spacing_is_clamped(start, end, span, spacing, expected):
 	has_original_spacing = r.get_spacing() == spacing
 
 	assert has_original_spacing == expected
+
+@pytest.mark.parametrize("start, end, span, spacing, invert", [
+	(MIN_RANGE, MAX_RANGE, 1, 0, False),
+	(MIN_RANGE, MAX_RANGE, 3, 2, False),
+	(MIN_RANGE, MAX_RANGE, 3, 2, True),
+	(7, 31, 4, 3, False),
+	(7, 31, 4, 3, True),
+	(10, 13, 2, 1, True),
+])
+def test_pixel_range_compiled_mask(start, end, span, spacing, invert):
+	"""
+	Tests that the compiled mask and runs agree with the span arithmetic for every index in the range
+	"""
+	r = PixelRange(start=start, end=end, span=span, spacing=spacing, invert=invert)
+	compiled = r.compile()
+
+	offset = lambda i: (i - start) if not invert else (end - 1) - i
+	expected = [offset(i) % (span + spacing) < span for i in range(start, end)]
+
+	assert [bool(x) for x in compiled.mask] == expected
+	assert compiled.indices == tuple(r.get_range())
+	assert sorted(i for a, b in compiled.span_runs for i in range(a, b)) == [i for i in range(start, end) if expected[i - start]]
+	assert sorted(i for a, b in compiled.space_runs for i in range(a, b)) == [i for i in range(start, end) if not expected[i - start]]
+
+def test_pixel_range_compiled_template():
+	"""
+	Tests that a two-color template is laid out by the mask and is cached
+	"""
+	r = PixelRange(start=0, end=5, span=2, spacing=1)
+	a, b = (1, 2, 3), (4, 5, 6)
+
+	template = r.compile().template(a, b)
+
+	assert template == bytes(a * 2 + b + a * 2)
+	assert r.compile().template(a, b) is template
+
+@pytest.mark.parametrize("property, value", [
+	("start", 5),
+	("end", 30),
+	("span", 4),
+	("spacing", 2),
+	("invert", True)
+])
+def test_pixel_range_setter_invalidates_compiled(property, value):
+	"""
+	Tests that running a setter rebuilds the compiled layout
+	"""
+	r = PixelRange(span=2, spacing=1)
+	compiled = r.compile()
+
+	getattr(r, f"set_{property}")(value)
+
+	assert r.compile() is not compiled
+	assert r.compile() == PixelRange(**{f: getattr(r, f) for f in ("start", "end", "span", "spacing", "invert")}).compile()
@@ -0,0 +1,94 @@
+"""
+test_power.py
+
+Unit tests for the power budget limiter
+
+This module verifies that a frame's current draw is estimated
+from the values it is sent as, that frames over the limit are
+dimmed to fit, that a limited strip is only brightened again
+outside the hysteresis band, and that backends send frames
+through the limited correction tables.
+"""
+import pytest
+from led import controller
+from led.backends import SimulatedBackend
+from led.colors import COLORS, OFF
+from led.correction import IDENTITY
+from led.power import PowerLimiter
+
+COUNT = 10
+LINEAR = (IDENTITY, IDENTITY, IDENTITY)
+W = COLORS["white"]
+
+def solid(color, count=COUNT) -> bytearray:
+	"""
+	Returns a frame of a single color
+	"""
+	return bytearray(bytes(color) * count)
+
+def test_estimate():
+	"""
+	Tests that a frame draws the idle current plus each channel's current in proportion to its value
+	"""
+	limiter = PowerLimiter(COUNT, channel_ma=(20, 20, 20), idle_ma=1)
+	uneven = PowerLimiter(COUNT, channel_ma=(10, 20, 30), idle_ma=1)
+
+	assert limiter.estimate(solid(OFF), LINEAR) == 10
+	assert limiter.estimate(solid(W), LINEAR) == 10 + 600
+	assert limiter.estimate(solid(W), (bytes(256),) * 3) == 10
+	assert uneven.estimate(solid(COLORS["blue"]), LINEAR) == 10 + 300
+
+def test_update_limits_and_recovers_with_hysteresis():
+	"""
+	Tests that a frame over the limit is dimmed at once, and the strip is only brightened once its draw leaves the hysteresis band
+	"""
+	limiter = PowerLimiter(COUNT, limit=310, channel_ma=(20, 20, 20), idle_ma=1, hysteresis=0.1)
+
+	assert limiter.update(solid(W), LINEAR) == pytest.approx(0.5)
+	assert limiter.stats.estimated_ma == pytest.approx(610)
+	assert limiter.stats.limited_ma == pytest.approx(310)
+
+	# Within the band below the limit, the scale holds
+	assert limiter.update(solid((240, 240, 240)), LINEAR) == pytest.approx(0.5)
+	# Below the band, the strip is brightened into the middle of it
+	assert limiter.update(solid((128, 128, 128)), LINEAR) == pytest.approx(0.95 * 300 / (600 * 128 / 255))
+	assert limiter.update(solid(OFF), LINEAR) == 1.0
+
+	assert limiter.stats.peak_ma == pytest.approx(610)
+	assert limiter.stats.limited == 3
+
+def test_invalid_limit():
+	"""
+	Tests that a limit the strip draws while dark throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		PowerLimiter(COUNT, limit=COUNT, idle_ma=1)
+
+def test_backend_sends_limited_frames():
+	"""
+	Tests that a backend over its power limit sends frames through dimmed correction tables, without touching the colors drawn
+	"""
+	backend = SimulatedBackend(count=COUNT, brightness=1, gamma=1)
+
+	with controller.using_backend(backend):
+		controller.set_power_limit(310)
+		controller.fill_color(W)
+		controller.show_pixels()
+		stats = controller.get_power_stats()
+
+	assert backend.shown == bytes(solid(W))
+	assert stats.scale < 1
+	assert backend.power.estimate(backend.correction.apply(backend.buf), LINEAR) <= 310
+	assert stats.limited_ma == pytest.approx(310)
+
+def test_set_power_limit_marks_dirty():
+	"""
+	Tests that changing the power limit sends the frame again at the next show, and an unchanged limit does not
+	"""
+	backend = SimulatedBackend(count=COUNT)
+	backend.show()
+
+	backend.set_power_limit(None)
+	assert not backend.is_dirty()
+	backend.set_power_limit(500)
+	assert backend.dirty == (0, COUNT)
@@ -0,0 +1,182 @@
+"""
+test_receiver.py
+
+Unit tests for the network frame receivers
+
+This module feeds packets built by the test senders to each
+receiver and verifies that universes are mapped onto the strip,
+that late packets are dropped, and that frames are only shown
+once complete or latched by a sync packet.
+"""
+import threading
+import time
+import pytest
+from led import receiver
+from led.backends import SimulatedBackend
+from led.clock import VirtualClock
+from led.controller import using_backend
+
+COUNT = 200	# Two universes of pixels
+SIZE = COUNT * 3
+UNIVERSE = receiver.PIXELS_PER_UNIVERSE * 3
+
+@pytest.fixture
+def backend():
+	"""
+	Provides a simulated backend long enough to span two universes
+	"""
+	with using_backend(SimulatedBackend(count=COUNT)) as b:
+		yield b
+
+def feed(rx, packet):
+	"""
+	Hands a packet to a receiver as if it was received from the network
+	"""
+	rx.buffer[:len(packet)] = packet
+	return rx.handle(len(packet))
+
+def universes(value):
+	"""
+	Returns the channel data for each of the two universes of a frame with every channel set to a value
+	"""
+	return bytes([value]) * UNIVERSE, bytes([value]) * (SIZE - UNIVERSE)
+
+@pytest.mark.parametrize("sequence, last, expected", [
+	(5, None, False),
+	(6, 5, False),
+	(5, 5, True),
+	(4, 5, True),
+	(0, 255, False),
+	(250, 5, True),
+	(200, 5, False)
+])
+def test_is_late(sequence, last, expected):
+	"""
+	Tests that packets in the window before the last sequence number are late, wrapping around
+	"""
+	assert receiver.is_late(sequence, last) == expected
+
+def test_e131_shows_complete_frame(backend):
+	"""
+	Tests that an E1.31 frame is shown once both universes have arrived, mapped one after another
+	"""
+	rx = receiver.UniverseReceiver(receiver.E131)
+	first = bytes(range(255)) * 2
+
+	assert not feed(rx, receiver.e131_packet(1, first, sequence=1))
+	assert backend.show_count == 0
+	assert feed(rx, receiver.e131_packet(2, bytes([7]) * (SIZE - UNIVERSE), sequence=1))
+	assert backend.shown == first + bytes([7]) * (SIZE - UNIVERSE)
+
+def test_e131_drops_late_packets(backend):
+	"""
+	Tests that a packet older than the last one from its universe is dropped
+	"""
+	rx = receiver.UniverseReceiver(receiver.E131)
+	for value, sequence in ((1, 10), (2, 9)):
+		for universe, data in enumerate(universes(value), start=1):
+			feed(rx, receiver.e131_packet(universe, data, sequence=sequence))
+
+	assert rx.stats.late == 2
+	assert rx.stats.frames == 1
+	assert backend.shown == bytes([1]) * SIZE
+
+def test_e131_sync_latches_complete_frame(backend):
+	"""
+	Tests that universes waiting on a sync address are only shown by a sync packet once all have arrived
+	"""
+	rx = receiver.UniverseReceiver(receiver.E131)
+	first, second = universes(3)
+
+	feed(rx, receiver.e131_packet(1, first, sync_address=999))
+	assert not feed(rx, receiver.e131_sync_packet(999))
+	assert rx.stats.incomplete == 1
+
+	feed(rx, receiver.e131_packet(2, second, sync_address=999))
+	assert backend.show_count == 0
+	assert not feed(rx, receiver.e131_sync_packet(998))
+	assert feed(rx, receiver.e131_sync_packet(999, sequence=1))
+	assert backend.shown == bytes([3]) * SIZE
+
+def test_e131_ignores_other_universes(backend):
+	"""
+	Tests that universes outside of the strip are ignored
+	"""
+	rx = receiver.UniverseReceiver(receiver.E131, universe=10)
+
+	feed(rx, receiver.e131_packet(9, bytes(UNIVERSE)))
+	feed(rx, receiver.e131_packet(12, bytes(UNIVERSE)))
+
+	assert rx.stats.ignored == 2
+	assert rx.received == set()
+
+def test_artnet_sync_mode(backend):
+	"""
+	Tests that Art-Net frames are shown when complete, until an ArtSync switches the receiver to latch on syncs
+	"""
+	clock = VirtualClock()
+	rx = receiver.UniverseReceiver(receiver.ARTNET, clock=clock)
+	first, second = universes(4)
+
+	feed(rx, receiver.artnet_packet(0, first))
+	assert feed(rx, receiver.artnet_packet(1, second))
+
+	feed(rx, receiver.artnet_sync_packet())
+	feed(rx, receiver.artnet_packet(0, first))
+	assert not feed(rx, receiver.artnet_packet(1, second))
+	assert feed(rx, receiver.artnet_sync_packet())
+
+	clock.advance(receiver.ARTNET_SYNC_TIMEOUT + 1)
+	feed(rx, receiver.artnet_packet(0, first))
+	assert feed(rx, receiver.artnet_packet(1, second))
+	assert rx.stats.frames == 3
+
+def test_ddp_push(backend):
+	"""
+	Tests that DDP data is written at its byte offset and shown on the packet with the push flag
+	"""
+	rx = receiver.UniverseReceiver(receiver.DDP)
+
+	assert not feed(rx, receiver.ddp_packet(0, bytes([5]) * 300, sequence=1, push=False))
+	assert feed(rx, receiver.ddp_packet(300, bytes([6]) * (SIZE - 300), sequence=2))
+	assert not feed(rx, receiver.ddp_packet(0, bytes(SIZE), sequence=1))
+	assert backend.shown == bytes([5]) * 300 + bytes([6]) * (SIZE - 300)
+	assert rx.stats.late == 1
+
+def test_ignores_invalid_packets(backend):
+	"""
+	Tests that packets of other protocols are ignored
+	"""
+	rx = receiver.UniverseReceiver(receiver.E131)
+
+	assert not feed(rx, receiver.artnet_packet(1, bytes(UNIVERSE)))
+	assert not feed(rx, b"not a packet")
+	assert rx.stats.ignored == 2
+
+def test_invalid_protocol():
+	"""
+	Tests that an unknown protocol throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		receiver.UniverseReceiver("dmx")
+
+def test_receives_over_udp(backend):
+	"""
+	Tests that a receiver listening on localhost shows a frame sent to it by the test sender
+	"""
+	rx = receiver.UniverseReceiver(receiver.E131, host="127.0.0.1", port=0)
+	host, port = rx.bind()
+	cancel = threading.Event()
+	thread = threading.Thread(target=rx.serve, kwargs={"cancel": cancel})
+	thread.start()
+
+	for universe, data in enumerate(universes(9), start=1):
+		receiver.send(receiver.e131_packet(universe, data), host=host, port=port)
+	for _ in range(50):
+		if backend.show_count:
+			break
+		time.sleep(0.02)
+	cancel.set()
+	thread.join(timeout=5)
+
+	assert backend.shown == bytes([9]) * SIZE
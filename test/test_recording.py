@@ -0,0 +1,147 @@
+"""
+test_recording.py
+
+Unit tests for frame recording and playback
+
+This module verifies that frames survive each encoding,
+that recorded effects are played back frame for frame at
+their timestamps, and that seeking decodes from keyframes.
+"""
+import pytest
+from led import effects, recording
+from led.backends import FrameSinkBackend
+from led.clock import VirtualClock
+from led.colors import COLORS, OFF
+from led.color_palette import ColorPalette
+from led.config import LED_COUNT
+from led.controller import using_backend
+from led.offline import render_offline
+from led.pixel_range import PixelRange
+
+COUNT = 8
+R = COLORS["red"]
+G = COLORS["green"]
+
+def frame_of(*colors) -> bytes:
+	"""
+	Returns a frame holding one pixel of each color provided
+	"""
+	return bytes(c for color in colors for c in color)
+
+FRAMES = [
+	frame_of(*[R] * COUNT),
+	frame_of(*[R] * 3, G, *[R] * 4),
+	frame_of(*[R] * 3, G, R, G, *[R] * 2),
+	frame_of(*[(i, i, i) for i in range(COUNT)]),
+	frame_of(*[(i, i, i) for i in range(COUNT - 1)], G)
+]
+
+@pytest.mark.parametrize("frame", FRAMES)
+def test_rle_round_trip(frame):
+	"""
+	Tests that a run-length encoded frame decodes to the same frame
+	"""
+	out = bytearray(len(frame))
+
+	recording.decode_rle(recording.encode_rle(frame), out)
+
+	assert out == frame
+
+@pytest.mark.parametrize("previous, frame", list(zip(FRAMES, FRAMES[1:])))
+def test_delta_round_trip(previous, frame):
+	"""
+	Tests that a delta encoded frame applied to the previous frame decodes to the same frame
+	"""
+	out = bytearray(previous)
+
+	recording.decode_delta(recording.encode_delta(frame, previous), out)
+
+	assert out == frame
+
+def test_delta_merges_close_spans():
+	"""
+	Tests that changed spans separated by one unchanged pixel are stored as one patch
+	"""
+	payload = recording.encode_delta(FRAMES[2], FRAMES[0])
+
+	assert len(payload) == recording.PATCH.size + 3 * 3
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_recording_round_trip(tmp_path, compress):
+	"""
+	Tests that every recorded frame is read back with its timestamp, compressed or not
+	"""
+	path = tmp_path / "show.led"
+	with recording.FrameRecorder(path, count=COUNT, compress=compress, keyframe_interval=2) as recorder:
+		for i, frame in enumerate(FRAMES):
+			recorder.write(i * 0.5, frame)
+
+	with recording.Recording(path) as rec:
+		assert len(rec) == len(FRAMES)
+		assert rec.get_duration() == 2.0
+		assert [(t, bytes(f)) for t, f in rec.frames()] == [(i * 0.5, f) for i, f in enumerate(FRAMES)]
+
+	raw_size = recording.HEADER.size + len(FRAMES) * (recording.RECORD.size + COUNT * 3 + recording.INDEX_ENTRY_SIZE)
+	if compress:
+		assert path.stat().st_size < raw_size
+
+def test_recording_seek(tmp_path):
+	"""
+	Tests that seeking to a time finds the frame on the strip at that time, decoding from its keyframe
+	"""
+	path = tmp_path / "show.led"
+	with recording.FrameRecorder(path, count=COUNT, keyframe_interval=2) as recorder:
+		for i, frame in enumerate(FRAMES):
+			recorder.write(i * 0.5, frame)
+
+	with recording.Recording(path) as rec:
+		assert rec.seek(-1) == 0
+		assert rec.seek(1.2) == 2
+		assert rec.seek(100) == len(FRAMES) - 1
+		for number in (4, 2, 1, 3, 0):
+			assert bytes(rec.get_frame(number)) == FRAMES[number]
+
+def test_invalid_recording(tmp_path):
+	"""
+	Tests that opening a file which is not a recording throws a ValueError
+	"""
+	path = tmp_path / "show.led"
+	path.write_bytes(bytes(64))
+
+	with pytest.raises(ValueError):
+		recording.Recording(path)
+
+def test_record_and_play_effect(tmp_path):
+	"""
+	Tests that a recorded effect is played back with the same frames at the same times
+	"""
+	path = tmp_path / "chase.led"
+	palette = ColorPalette(span_primary=R, spacing_primary=OFF)
+	kwargs = {"palette": palette, "interval": 0.1, "duration": 2, "sel": PixelRange(span=4, spacing=4)}
+	expected = render_offline(effects.chase_fill, **kwargs)
+
+	assert recording.record(effects.chase_fill, path, **kwargs) == len(expected)
+
+	clock = VirtualClock()
+	backend = FrameSinkBackend(count=LED_COUNT, clock=clock)
+	with using_backend(backend):
+		stats = recording.play(path, clock=clock)
+
+	assert backend.frames == expected
+	assert stats.frames == len(expected)
+
+def test_play_from_time(tmp_path):
+	"""
+	Tests that playback started partway through shows the frame on the strip at that time first
+	"""
+	path = tmp_path / "show.led"
+	with recording.FrameRecorder(path, count=COUNT) as recorder:
+		for i, frame in enumerate(FRAMES):
+			recorder.write(i * 0.5, frame)
+
+	clock = VirtualClock()
+	backend = FrameSinkBackend(count=COUNT, clock=clock)
+	with using_backend(backend):
+		recording.play(path, start=1.2, clock=clock)
+
+	assert [(pytest.approx(t), f) for t, f in backend.frames] == [(0.0, FRAMES[2]), (0.3, FRAMES[3]), (0.8, FRAMES[4])]
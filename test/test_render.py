@@ -0,0 +1,181 @@
+"""
+test_render.py
+
+Unit tests for the frame rendering operations
+
+This module verifies that each render operation produces the
+expected frame, and that the NumPy and pure Python paths
+produce bit-identical frames.
+"""
+import pytest
+from led import render
+from led.colors import COLORS, OFF
+from led.pixel_range import PixelRange
+from conftest import to_bytes
+
+COUNT = 12
+R = COLORS["red"]
+G = COLORS["green"]
+B = COLORS["blue"]
+
+PATHS = [
+	False,
+	pytest.param(True, marks=pytest.mark.skipif(not render.HAS_NUMPY, reason="NumPy is not installed"))
+]
+
+def seeded_frame(use_numpy):
+	"""
+	Returns a frame with a distinct color for every pixel
+	"""
+	return render.new_frame(source=bytes(range(COUNT * 3)), use_numpy=use_numpy)
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+def test_new_frame(use_numpy):
+	"""
+	Tests that new frames are blank or hold a copy of their source
+	"""
+	source = bytes(range(COUNT * 3))
+	frame = render.new_frame(source=source, use_numpy=use_numpy)
+
+	assert to_bytes(render.new_frame(count=COUNT, use_numpy=use_numpy)) == bytes(COUNT * 3)
+	assert to_bytes(frame) == source
+	assert render.pixel_count(frame) == COUNT
+
+def test_new_frame_needs_count():
+	"""
+	Tests that a blank frame is not given a length when no count is provided
+	"""
+	with pytest.raises(TypeError):
+		render.new_frame()
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+def test_fill(use_numpy):
+	"""
+	Tests that filling a block only colors the pixels in that block
+	"""
+	frame = render.new_frame(count=COUNT, use_numpy=use_numpy)
+
+	render.fill(frame, R, start=2, stop=5)
+
+	assert to_bytes(frame) == bytes(OFF * 2 + R * 3 + OFF * (COUNT - 5))
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+def test_fill_packed_colors(use_numpy):
+	"""
+	Tests that packed colors fill a block and a pattern just as RGB int tuples do
+	"""
+	frame = render.new_frame(count=COUNT, use_numpy=use_numpy)
+
+	render.fill(frame, 0xFF0000, start=2, stop=5)
+	render.fill_pattern(frame, PixelRange(start=6, end=9, span=1, spacing=1).compile(), 0x0000FF, 0x00FF00)
+
+	assert to_bytes(frame) == bytes(OFF * 2 + R * 3 + OFF + B + G + B + OFF * (COUNT - 9))
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+def test_packed_pixels(use_numpy):
+	"""
+	Tests that a frame is turned into one packed int per pixel
+	"""
+	frame = render.new_frame(source=bytes(R + (1, 2, 3) + B), use_numpy=use_numpy)
+
+	assert list(render.packed_pixels(frame)) == [0xFF0000, 0x010203, 0x0000FF]
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+@pytest.mark.parametrize("space_col, expected", [
+	(B, bytes(OFF + R * 2 + B + R * 2 + B + R + OFF * 4)),
+	(None, bytes(OFF + R * 2 + OFF + R * 2 + OFF + R + OFF * 4))
+])
+def test_fill_pattern(use_numpy, space_col, expected):
+	"""
+	Tests that a span and spacing pattern is laid over only the range's pixels
+	"""
+	frame = render.new_frame(count=COUNT, use_numpy=use_numpy)
+	sel = PixelRange(start=1, end=8, span=2, spacing=1)
+
+	render.fill_pattern(frame, sel.compile(), span_col=R, space_col=space_col)
+
+	assert to_bytes(frame) == expected
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+def test_reverse(use_numpy):
+	"""
+	Tests that reversing a block keeps each pixel's channels in order
+	"""
+	frame = render.new_frame(count=COUNT, use_numpy=use_numpy)
+	render.fill(frame, R, start=0, stop=1)
+	render.fill(frame, G, start=1, stop=2)
+
+	render.reverse(frame, start=0, stop=3)
+
+	assert to_bytes(frame)[:9] == bytes(OFF + G + R)
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+def test_swap_colors(use_numpy):
+	"""
+	Tests that swapping colors exchanges them without chaining
+	"""
+	frame = render.new_frame(source=bytes(R + G + B + R), use_numpy=use_numpy)
+
+	render.swap_colors(frame, {R: G, G: R})
+
+	assert to_bytes(frame) == bytes(G + R + B + G)
+
+def layer_for(frame):
+	"""
+	Returns a layer of the same type as a frame, with bright distinct colors
+	"""
+	return render.new_frame(source=bytes(range(255, 255 - COUNT * 3, -1)), use_numpy=render.is_array(frame))
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+@pytest.mark.parametrize("mode, opacity, expected", [
+	(render.REPLACE, 0.5, (200, 100, 0)),
+	(render.ADD, 1, (255, 150, 50)),
+	(render.MULTIPLY, 1, (78, 19, 0)),
+	(render.MAX, 1, (200, 100, 50)),
+	(render.ALPHA, 1, (200, 100, 0)),
+	(render.ALPHA, 0.5, (150, 75, 25)),
+	(render.ADD, 0, (100, 50, 50))
+])
+def test_blend(use_numpy, mode, opacity, expected):
+	"""
+	Tests that each blend mode combines the layer with the pixels beneath it, mixed by opacity, only within its block
+	"""
+	frame = render.new_frame(source=bytes((100, 50, 50)) * 3, use_numpy=use_numpy)
+	layer = render.new_frame(source=bytes((200, 100, 0)) * 3, use_numpy=use_numpy)
+
+	render.blend(frame, layer, mode=mode, opacity=opacity, start=1, stop=2)
+
+	assert to_bytes(frame) == bytes((100, 50, 50)) + bytes(expected) + bytes((100, 50, 50))
+
+def test_blend_invalid_mode():
+	"""
+	Tests that an unknown blend mode throws a ValueError
+	"""
+	frame = render.new_frame(count=COUNT, use_numpy=False)
+
+	with pytest.raises(ValueError):
+		render.blend(frame, frame, mode="screen")
+
+@pytest.mark.skipif(not render.HAS_NUMPY, reason="NumPy is not installed")
+@pytest.mark.parametrize("operation", [
+	lambda f: render.fill(f, (7, 130, 255), start=3, stop=9),
+	lambda f: render.fill_pattern(f, PixelRange(start=2, end=11, span=2, spacing=3, invert=True).compile(), R, B),
+	lambda f: render.fill_pattern(f, PixelRange(start=0, end=COUNT, span=3, spacing=1).compile(), G),
+	lambda f: render.reverse(f, start=1, stop=10),
+	lambda f: render.scale(f, 0.37),
+	lambda f: render.scale(f, 1),
+	lambda f: render.swap_colors(f, {(0, 1, 2): R, (3, 4, 5): (0, 1, 2)}),
+	*[lambda f, mode=mode: render.blend(f, layer_for(f), mode=mode, opacity=0.4, start=2, stop=10) for mode in render.BLEND_MODES],
+	*[lambda f, mode=mode: render.blend(f, layer_for(f), mode=mode) for mode in render.BLEND_MODES],
+])
+def test_paths_are_bit_identical(operation):
+	"""
+	Tests that every operation produces the same bytes on the NumPy and pure Python paths
+	"""
+	python_frame = seeded_frame(use_numpy=False)
+	numpy_frame = seeded_frame(use_numpy=True)
+
+	operation(python_frame)
+	operation(numpy_frame)
+
+	assert to_bytes(numpy_frame) == to_bytes(python_frame)
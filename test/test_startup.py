@@ -0,0 +1,76 @@
+"""
+test_startup.py
+
+Import-time benchmarks for the command line interface
+
+This module runs the CLI in a subprocess with '-X importtime' and
+verifies that '--help' loads nothing past the parser, and that a one-off
+'--fill' does not load NumPy before it is needed. The hardware libraries
+are only loaded once a frame is first shown.
+
+Wall clock import budgets depend on the machine and its load, so by default
+each command is held to BUDGET_MARGIN times its budget, which still catches
+an eager import of a heavy module on a loaded runner or a Raspberry Pi. The
+strict budgets are checked when the LED_IMPORT_BUDGET environment variable
+is set.
+"""
+import os
+import pathlib
+import subprocess
+import sys
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+HELP_BUDGET = 0.1
+"""The time in seconds '--help' may spend importing modules"""
+
+FILL_BUDGET = 0.2
+"""The time in seconds a one-off '--fill' may spend importing modules"""
+
+BUDGET_MARGIN = 1 if os.environ.get("LED_IMPORT_BUDGET") else 10
+"""The factor the budgets are stretched by, 1 when LED_IMPORT_BUDGET asks for the strict budgets"""
+
+def import_times(*flags) -> dict:
+	"""
+	Runs the CLI with '-X importtime' and returns the cumulative import time in seconds of each imported module
+
+	Nested imports keep the indentation importtime reports them with
+	"""
+	result = subprocess.run(
+		[sys.executable, "-X", "importtime", "-m", "cli", *flags],
+		cwd=ROOT, capture_output=True, text=True, timeout=30
+	)
+	times = {}
+	for line in result.stderr.splitlines():
+		if not line.startswith("import time:") or "cumulative" in line:
+			continue
+		_, cumulative, name = line.split("|")
+		times[name[1:].rstrip()] = int(cumulative) / 1_000_000
+	return times
+
+@pytest.mark.parametrize("flags, modules", [
+	(["--help"], ["led.controller", "led.backends", "led.effects", "numpy", "board", "neopixel"]),
+	(["--local", "--fill", "--color", "r"], ["numpy"])
+])
+def test_deferred_imports(flags, modules):
+	"""
+	Tests that a command does not load modules it does not need
+	"""
+	imported = {name.strip() for name in import_times(*flags)}
+
+	assert "cli.parser" in imported
+	for module in modules:
+		assert module not in imported
+
+@pytest.mark.parametrize("flags, budget", [
+	(["--help"], HELP_BUDGET),
+	(["--local", "--fill", "--color", "r"], FILL_BUDGET)
+])
+def test_import_budget(flags, budget):
+	"""
+	Tests that a command stays within its import budget
+	"""
+	times = import_times(*flags)
+
+	assert sum(t for name, t in times.items() if not name.startswith(" ")) < budget * BUDGET_MARGIN
@@ -0,0 +1,133 @@
+"""
+test_stream.py
+
+Unit tests for raw frame streaming
+
+This module verifies that streamed frames are reordered to RGB,
+that a fast producer only leaves its newest frame to be shown,
+and that a stream is shown on the strip until it ends.
+"""
+import io
+import os
+import threading
+import pytest
+from led import stream
+from led.backends import FrameSinkBackend
+from led.clock import VirtualClock
+from led.controller import using_backend
+
+COUNT = 4
+SIZE = COUNT * 3
+
+def frame_of(value) -> bytes:
+	"""
+	Returns a frame with every channel of every pixel set to a value
+	"""
+	return bytes([value]) * SIZE
+
+@pytest.mark.parametrize("order, expected", [
+	("RGB", bytes((1, 2, 3, 4, 5, 6))),
+	("GRB", bytes((2, 1, 3, 5, 4, 6))),
+	("BGR", bytes((3, 2, 1, 6, 5, 4))),
+	("BRG", bytes((2, 3, 1, 5, 6, 4)))
+])
+def test_reorder(order, expected):
+	"""
+	Tests that pixels packed in a channel order are rearranged to RGB
+	"""
+	assert stream.reorder(bytes((1, 2, 3, 4, 5, 6)), order) == expected
+
+def test_reorder_invalid_order():
+	"""
+	Tests that an unknown channel order throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		stream.reorder(bytes(3), "RGBW")
+
+def test_reader_coalesces_frames():
+	"""
+	Tests that frames read before the last one was taken are replaced by the newest frame
+	"""
+	reader = stream.FrameReader(io.BytesIO(frame_of(1) + frame_of(2) + frame_of(3)), SIZE)
+
+	reader.run()
+
+	assert bytes(reader.take()) == frame_of(3)
+	assert reader.frames_read == 3
+	assert reader.coalesced == 2
+	assert reader.take() is None
+	assert reader.is_finished()
+
+def test_reader_discards_partial_frame():
+	"""
+	Tests that a partial frame at the end of the stream is never shown
+	"""
+	reader = stream.FrameReader(io.BytesIO(frame_of(1) + bytes(SIZE - 1)), SIZE)
+
+	reader.run()
+
+	assert bytes(reader.take()) == frame_of(1)
+	assert reader.take() is None
+
+def test_stream_frames_from_fifo(tmp_path):
+	"""
+	Tests that each frame written to a FIFO is shown in RGB order once the writer keeps up with the fps cap
+	"""
+	path = str(tmp_path / "led.fifo")
+	os.mkfifo(path)
+	clock = VirtualClock()
+	backend = FrameSinkBackend(count=COUNT, clock=clock)
+	shown = threading.Event()
+	backend.sink = lambda time, frame: (backend.frames.append(frame), shown.set())
+
+	def produce():
+		with open(path, "wb", buffering=0) as fifo:
+			for value in (1, 2):
+				shown.clear()
+				fifo.write(bytes((value, 0, 0)) * COUNT)
+				shown.wait(timeout=5)
+
+	producer = threading.Thread(target=produce)
+	producer.start()
+	with using_backend(backend):
+		stream.stream_frames(path, fps=30, pixel_order="GRB", clock=clock)
+	producer.join()
+
+	assert backend.frames == [bytes((0, 1, 0)) * COUNT, bytes((0, 2, 0)) * COUNT]
+
+def test_stream_frames_cancelled(tmp_path):
+	"""
+	Tests that a stream waiting on its producer stops once cancelled
+	"""
+	path = str(tmp_path / "led.fifo")
+	os.mkfifo(path)
+	cancel = threading.Event()
+	cancel.set()
+
+	with using_backend(FrameSinkBackend(count=COUNT)) as backend:
+		stream.stream_frames(path, cancel=cancel)
+	os.close(os.open(path, os.O_WRONLY))	# Lets the reader waiting on a writer see the end of the stream
+
+	assert backend.frames == []
+
+def test_stream_frames_stalled_producer_stops_at_duration(tmp_path):
+	"""
+	Tests that a stream waiting on a producer which has stopped writing ends once its duration has passed
+	"""
+	path = str(tmp_path / "led.fifo")
+	os.mkfifo(path)
+	hold = os.open(path, os.O_RDONLY | os.O_NONBLOCK)	# Lets the writer open the FIFO before the stream does
+	stalled = os.open(path, os.O_WRONLY)	# A writer which never writes, so the stream neither gets a frame nor ends
+
+	try:
+		with using_backend(FrameSinkBackend(count=COUNT)) as backend:
+			result = []
+			runner = threading.Thread(target=lambda: result.append(stream.stream_frames(path, duration=0.2)))
+			runner.start()
+			runner.join(timeout=5)
+			assert not runner.is_alive()
+	finally:
+		os.close(stalled)
+		os.close(hold)
+
+	assert backend.frames == []
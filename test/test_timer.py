@@ -6,7 +6,9 @@ and ensures input is valid and that its methods
 are providing expected output
 """
 import pytest
-from led.timer import RepeatingTimer
+import time
+from led.timer import RepeatingTimer, FrameScheduler, CATCH_UP, SKIP, JITTER_BUCKETS, wait_until
+from led.clock import VirtualClock
 
 
 @pytest.mark.parametrize("valid_time", [
@@ -65,3 +67,63 @@ def test_timer_update_no_action():
 
 	with pytest.raises(RuntimeError):
 		t.update()
+
+def test_timer_epochs_are_per_instance():
+	"""
+	Tests that a timer created later does not start behind an earlier timer's epoch
+	"""
+	first = FrameScheduler(interval=0.01)
+	time.sleep(0.02)
+	second = FrameScheduler(interval=0.01)
+
+	assert second.start_time > first.start_time
+	assert second.get_runtime() < first.get_runtime()
+
+def test_timer_invalid_policy():
+	"""
+	Tests that an unknown overrun policy throws a ValueError
+	"""
+	with pytest.raises(ValueError):
+		FrameScheduler(policy="invalid")
+
+@pytest.mark.parametrize("policy, skipped", [
+	(SKIP, True),
+	(CATCH_UP, False)
+])
+def test_timer_overrun_policy(policy, skipped):
+	"""
+	Tests that an action overrunning its interval is counted as missed, and skipped only by the skip policy
+	"""
+	t = FrameScheduler(interval=0.005, action=lambda: time.sleep(0.012), policy=policy)
+
+	t.update()
+	t.update()
+
+	assert t.get_stats().missed == 2
+	assert (t.get_stats().skipped > 0) == skipped
+	assert (t.next_update > t.start_time + 2 * t.get_interval() + 1e-9) == skipped	# Catching up keeps every deadline
+
+def test_timer_stats_histogram():
+	"""
+	Tests that every frame is counted once in the lateness histogram
+	"""
+	t = FrameScheduler(interval=0.002, action=lambda: None, clock=VirtualClock())
+
+	for i in range(5):
+		t.update()
+
+	stats = t.get_stats()
+	assert stats.frames == 5
+	assert sum(stats.jitter) == 5
+	assert len(stats.jitter) == len(JITTER_BUCKETS) + 1
+	assert stats.missed == 0
+
+def test_wait_until_reaches_deadline():
+	"""
+	Tests that waiting does not return before the deadline
+	"""
+	deadline = time.monotonic() + 0.003
+
+	wait_until(deadline)
+
+	assert time.monotonic() >= deadline
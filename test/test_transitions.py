@@ -0,0 +1,116 @@
+"""
+test_transitions.py
+
+Unit tests for crossfade transitions
+
+This module verifies that easing levels are fixed-point and end
+on the target, that both mixing paths match the fixed-point
+formula bit for bit, and that fills, blinks and pipelines fade
+on the strip rather than snapping.
+"""
+import random
+import pytest
+from led import effects, pipeline, render, transitions
+from led.backends import FrameSinkBackend
+from led.clock import VirtualClock
+from led.colors import COLORS
+from led.color_palette import ColorPalette
+from led.controller import using_backend, fill_color
+from led.pixel_range import PixelRange
+from conftest import to_bytes
+
+COUNT = 4
+R = COLORS["red"]
+B = COLORS["blue"]
+
+@pytest.mark.parametrize("easing", list(transitions.EASINGS))
+def test_ease_levels(easing):
+	"""
+	Tests that every easing rises from 0 to exactly LEVELS
+	"""
+	levels = transitions.ease_levels(10, easing)
+
+	assert len(levels) == 10
+	assert levels[-1] == transitions.LEVELS
+	assert levels == sorted(levels)
+	assert 0 <= levels[0]
+
+def test_easing_shapes():
+	"""
+	Tests that ease-in lags and ease-out leads a linear fade halfway through
+	"""
+	linear = transitions.ease_levels(4)[1]
+
+	assert transitions.ease_levels(4, transitions.EASE_IN)[1] < linear < transitions.ease_levels(4, transitions.EASE_OUT)[1]
+	with pytest.raises(ValueError):
+		transitions.ease_levels(4, "bounce")
+
+@pytest.mark.parametrize("use_numpy", [
+	False,
+	pytest.param(True, marks=pytest.mark.skipif(not render.HAS_NUMPY, reason="NumPy is not installed"))
+])
+def test_mix_matches_fixed_point(use_numpy):
+	"""
+	Tests that mixing matches (a * (256 - level) + b * level + 128) >> 8 for every channel and level
+	"""
+	rng = random.Random(7)
+	a = bytes(rng.randrange(256) for _ in range(300))
+	b = bytes(rng.randrange(256) for _ in range(300))
+	mixer = transitions.Mixer(render.new_frame(source=a, use_numpy=use_numpy), render.new_frame(source=b, use_numpy=use_numpy))
+
+	for level in (0, 1, 77, 128, 255, 256):
+		expected = bytes((x * (256 - level) + y * level + 128) >> 8 for x, y in zip(a, b))
+		assert to_bytes(mixer.mix(level)) == expected
+
+def test_crossfade_ends_on_target():
+	"""
+	Tests that a crossfade steps away from the source and ends exactly on the target
+	"""
+	source = render.new_frame(source=bytes(R) * COUNT)
+	target = render.new_frame(source=bytes(B) * COUNT)
+
+	frames = [to_bytes(f) for f in transitions.crossfade(source, target, 4)]
+
+	assert frames[0] == bytes((191, 0, 64)) * COUNT
+	assert frames[-1] == bytes(B) * COUNT
+	assert len(frames) == 4
+
+def test_fill_fades_in():
+	"""
+	Tests that a fill with a transition fades from the strip's current colors at transitions.DEFAULT_FPS
+	"""
+	clock = VirtualClock()
+	backend = FrameSinkBackend(count=COUNT, clock=clock)
+
+	with using_backend(backend):
+		fill_color(R)
+		effects.apply_fill(palette=ColorPalette(span_primary=B), sel=PixelRange(start=2), clock=clock, transition=0.05)
+
+	times = [t for t, _ in backend.frames]
+	assert len(backend.frames) == 3
+	assert times[-1] == pytest.approx(2 / transitions.DEFAULT_FPS)
+	assert backend.frames[0][1] == bytes(R) * 2 + bytes((170, 0, 85)) * 2
+	assert backend.frames[-1][1] == bytes(R) * 2 + bytes(B) * 2
+
+def test_blink_crossfades_colors():
+	"""
+	Tests that a blink with a fade holds each color, then crossfades into the next
+	"""
+	frames = effects.blink_frames(ColorPalette(span_primary=B, span_secondary=R), PixelRange(end=1), base=render.new_frame(count=1), hold=2, fade=2)
+
+	shown = [to_bytes(next(frames)) for _ in range(8)]
+
+	assert shown == [bytes(R), bytes(R), bytes((128, 0, 128)), bytes(B), bytes(B), bytes(B), bytes((128, 0, 128)), bytes(R)]
+
+def test_run_with_transition():
+	"""
+	Tests that a pipeline run with a transition fades into its first frame before its frames start
+	"""
+	clock = VirtualClock()
+	backend = FrameSinkBackend(count=1, clock=clock)
+
+	with using_backend(backend):
+		pipeline.run([bytearray(B), bytearray(R)], fps=1, clock=clock, transition=2 / transitions.DEFAULT_FPS)
+
+	assert [frame for _, frame in backend.frames] == [bytes((0, 0, 128)), bytes(B), bytes(R)]
+	assert backend.frames[-1][0] == pytest.approx(1 + 2 / transitions.DEFAULT_FPS)